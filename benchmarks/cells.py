@@ -0,0 +1,81 @@
+"""
+Compares the set and dict throughput of grid cells stored as Point2, as Cell and as packed y * width + x keys,
+and Ramp.upper / Ramp.lower to the previous implementation, which looked up the height of every point of the
+ramp with PixelMap[p] on every access.
+
+Usage, from the repository root:
+    python -m benchmarks.cells [saved ResponseGameInfo files]
+"""
+import sys
+import timeit
+from typing import Set
+
+import numpy as np
+
+from sc2.position import Cell, Point2
+
+from .map_data import game_infos
+
+
+def upper_reference(ramp) -> Set[Point2]:
+    max_height = max([ramp.height_at(p) for p in ramp._points])
+    return {p for p in ramp._points if ramp.height_at(p) == max_height}
+
+
+def lower_reference(ramp) -> Set[Point2]:
+    min_height = min([ramp.height_at(p) for p in ramp._points])
+    return {p for p in ramp._points if ramp.height_at(p) == min_height}
+
+
+def containers(width: int = 200, height: int = 176, amount: int = 20000, seed: int = 0):
+    rng = np.random.RandomState(seed)
+    cells = rng.randint(0, (width, height), size=(amount, 2)).tolist()
+    lookups = rng.randint(0, (width, height), size=(amount, 2)).tolist()
+    print(f"{'key type':<12} {'build set (ms)':>15} {'lookups (ms)':>13} {'build dict (ms)':>16}")
+    for name, make in (
+        ("Point2", lambda x, y: Point2((x, y))),
+        ("Cell", lambda x, y: Cell((x, y))),
+        ("packed int", lambda x, y: y * width + x),
+    ):
+        keys = [make(x, y) for x, y in cells]
+        queries = [make(x, y) for x, y in lookups]
+        build_set = min(timeit.repeat(lambda: set(keys), number=1, repeat=5))
+        keys_set = set(keys)
+        lookup = min(timeit.repeat(lambda: sum(q in keys_set for q in queries), number=1, repeat=5))
+        build_dict = min(timeit.repeat(lambda: {k: i for i, k in enumerate(keys)}, number=1, repeat=5))
+        print(f"{name:<12} {build_set * 1000:>15.2f} {lookup * 1000:>13.2f} {build_dict * 1000:>16.2f}")
+
+
+def ramps(paths):
+    print(f"\n{'map':<30} {'ramps':>6} {'reference (ms)':>15} {'current (ms)':>13} {'speedup':>8}")
+    for game_info in game_infos(paths):
+        map_ramps = game_info._find_ramps()
+        for ramp in map_ramps:
+            assert ramp.upper == upper_reference(ramp) and ramp.lower == lower_reference(ramp), game_info.map_name
+
+        def reference():
+            for ramp in map_ramps:
+                upper_reference(ramp)
+                lower_reference(ramp)
+
+        def current():
+            # Fresh ramps, so that the cached results are not measured
+            for ramp in game_info._find_ramps():
+                ramp.upper
+                ramp.lower
+
+        reference_time = min(timeit.repeat(reference, number=1, repeat=5))
+        current_time = min(timeit.repeat(current, number=1, repeat=5))
+        print(
+            f"{game_info.map_name:<30} {len(map_ramps):>6} {reference_time * 1000:>15.1f} "
+            f"{current_time * 1000:>13.1f} {reference_time / current_time:>7.1f}x"
+        )
+
+
+def main(paths):
+    containers()
+    ramps(paths)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
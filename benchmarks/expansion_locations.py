@@ -0,0 +1,88 @@
+"""
+Compares sc2.expansions.find_expansion_locations to the previous implementation of
+BotAI.expansion_locations, which compared every resource to the first resource of every group with
+get_terrain_height and scored the candidate points with distance_to one resource at a time.
+
+Usage, from the repository root:
+    python -m benchmarks.expansion_locations [bases per map]
+"""
+import sys
+import timeit
+from typing import Dict
+
+from sc2.expansions import find_expansion_locations
+from sc2.game_data import GameData
+from sc2.game_info import GameInfo
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.position import Point2
+from sc2.unit import Unit
+from sc2.units import Units
+
+from .map_data import synthetic_game_data_proto, synthetic_game_info_proto, synthetic_resources
+
+
+def expansion_locations_reference(resources: Units, geysers: Units, game_info: GameInfo) -> Dict[Point2, list]:
+    def get_terrain_height(pos):
+        return game_info.terrain_height[pos.position.to2.rounded]
+
+    RESOURCE_SPREAD_THRESHOLD = 225
+    resource_groups = []
+    for mf in resources:
+        mf_height = get_terrain_height(mf.position)
+        for cluster in resource_groups:
+            if len(cluster) == 10:
+                continue
+            if mf.position._distance_squared(
+                cluster[0].position
+            ) < RESOURCE_SPREAD_THRESHOLD and mf_height == get_terrain_height(cluster[0].position):
+                cluster.append(mf)
+                break
+        else:
+            resource_groups.append([mf])
+    resource_groups = [cluster for cluster in resource_groups if len(cluster) > 1]
+    offsets = [(x, y) for x in range(-9, 10) for y in range(-9, 10) if 75 >= x ** 2 + y ** 2 >= 49]
+    centers = {}
+    for resources in resource_groups:
+        possible_points = (
+            Point2((offset[0] + resources[-1].position.x, offset[1] + resources[-1].position.y))
+            for offset in offsets
+        )
+        possible_points = [
+            point
+            for point in possible_points
+            if all(point.distance_to(resource) >= (7 if resource in geysers else 6) for resource in resources)
+        ]
+        result = min(possible_points, key=lambda p: sum(p.distance_to(resource) for resource in resources))
+        centers[result] = resources
+    return centers
+
+
+def main(bases: int):
+    game_data = GameData(synthetic_game_data_proto())
+    print(f"{'map':<30} {'bases':>6} {'reference (ms)':>15} {'current (ms)':>13} {'speedup':>8}")
+    for seed in range(4):
+        proto = synthetic_game_info_proto(seed=seed)
+        game_info = GameInfo(proto)
+        resources = Units([Unit(unit, game_data) for unit in synthetic_resources(proto, bases, seed)], game_data)
+        geysers = resources.of_type(UnitTypeId.VESPENEGEYSER)
+
+        def current():
+            return find_expansion_locations(resources, geysers.tags, game_info.terrain_height)
+
+        def reference():
+            return expansion_locations_reference(resources, geysers, game_info)
+
+        expected, result = reference(), current()
+        assert list(result) == list(expected), game_info.map_name
+        assert [[r.tag for r in rs] for rs in result.values()] == [[r.tag for r in rs] for rs in expected.values()]
+
+        reference_time = min(timeit.repeat(reference, number=1, repeat=3))
+        current_time = min(timeit.repeat(current, number=1, repeat=10))
+        print(
+            f"{game_info.map_name:<30} {len(result):>6} {reference_time * 1000:>15.1f} "
+            f"{current_time * 1000:>13.1f} {reference_time / current_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 16)
@@ -0,0 +1,91 @@
+"""
+Compares GameInfo._find_ramps to the previous implementation, which built a dict of Point2 for every
+cell of the map and grouped the ramp points with a flood fill over nested lists.
+
+Usage, from the repository root:
+    python -m benchmarks.find_ramps [saved ResponseGameInfo files]
+"""
+import sys
+import timeit
+from collections import deque
+from typing import List, Set
+
+from sc2.position import Point2
+
+from .map_data import game_infos
+
+
+def find_ramps_reference(game_info) -> List[Set[Point2]]:
+    rampDict = {
+        Point2((x, y)): game_info.pathing_grid[(x, y)] == 0 and game_info.placement_grid[(x, y)] == 0
+        for x in range(game_info.pathing_grid.width)
+        for y in range(game_info.pathing_grid.height)
+    }
+    rampPoints = {p for p in rampDict if rampDict[p]}
+    return find_groups_reference(game_info, rampPoints)
+
+
+def find_groups_reference(game_info, points, minimum_points_per_group=8, max_distance_between_points=2):
+    NOT_INTERESTED = -2
+    NOT_COLORED_YET = -1
+    currentColor = NOT_COLORED_YET
+    picture = [[NOT_INTERESTED for j in range(game_info.pathing_grid.width)] for i in range(game_info.pathing_grid.height)]
+
+    def paint(pt):
+        picture[pt.y][pt.x] = currentColor
+
+    nearby = set()
+    for dx in range(-max_distance_between_points, max_distance_between_points + 1):
+        for dy in range(-max_distance_between_points, max_distance_between_points + 1):
+            if abs(dx) + abs(dy) <= max_distance_between_points:
+                nearby.add(Point2((dx, dy)))
+
+    for point in points:
+        paint(point)
+
+    remaining = set(points)
+    queue = deque()
+    foundGroups = []
+    while remaining:
+        currentGroup = set()
+        if not queue:
+            currentColor += 1
+            start = remaining.pop()
+            paint(start)
+            queue.append(start)
+            currentGroup.add(start)
+        while queue:
+            base = queue.popleft()
+            for offset in nearby:
+                px, py = base.x + offset.x, base.y + offset.y
+                if px < 0 or py < 0 or px >= game_info.pathing_grid.width or py >= game_info.pathing_grid.height:
+                    continue
+                if picture[py][px] != NOT_COLORED_YET:
+                    continue
+                point = Point2((px, py))
+                remaining.remove(point)
+                paint(point)
+                queue.append(point)
+                currentGroup.add(point)
+        if len(currentGroup) >= minimum_points_per_group:
+            foundGroups.append(currentGroup)
+    return foundGroups
+
+
+def main(paths):
+    print(f"{'map':<30} {'ramps':>6} {'reference (ms)':>15} {'current (ms)':>13} {'speedup':>8}")
+    for game_info in game_infos(paths):
+        ramps = game_info._find_ramps()
+        reference = find_ramps_reference(game_info)
+        assert {frozenset(r.points) for r in ramps} == {frozenset(g) for g in reference}, game_info.map_name
+
+        reference_time = min(timeit.repeat(lambda: find_ramps_reference(game_info), number=1, repeat=3))
+        current_time = min(timeit.repeat(game_info._find_ramps, number=1, repeat=10))
+        print(
+            f"{game_info.map_name:<30} {len(ramps):>6} {reference_time * 1000:>15.1f} "
+            f"{current_time * 1000:>13.1f} {reference_time / current_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,72 @@
+"""
+Measures the game loop end to end without SC2: a bot plays a game served by sc2.fake_sc2 over a local
+websocket, so the time includes the protocol, GameState construction and issuing actions. Every step the
+bot moves all of its units and makes one pathing query.
+
+Usage, from the repository root:
+    python -m benchmarks.game_loop [-v] [files saved with run_game(..., save_observations_as=path)]
+Without files a synthetic game is generated for a few unit counts. With -v the time of every
+phase of the step is printed too, see sc2.step_metrics.
+"""
+import asyncio
+import sys
+import time
+
+from sc2.bot_ai import BotAI
+from sc2.client import Client
+from sc2.data import Race
+from sc2.fake_sc2 import FakeSC2Process
+from sc2.main import _play_game
+from sc2.observation_recorder import RecordedGame
+from sc2.player import Bot
+
+from .map_data import synthetic_game_responses
+
+
+class BenchmarkBot(BotAI):
+    buffer_actions = True
+
+    def __init__(self):
+        self.step_times = []
+
+    async def on_step(self, iteration):
+        start = time.perf_counter()
+        target = self.game_info.map_center
+        for unit in self.units:
+            await self.do(unit.move(target))
+        await self._client.query_pathing(self.units.first.position, target)
+        self.step_times.append(time.perf_counter() - start)
+
+
+async def play(game: RecordedGame):
+    bot = BenchmarkBot()
+    process = FakeSC2Process(game)
+    async with process as controller:
+        client = Client(controller._ws)
+        start = time.perf_counter()
+        await _play_game(Bot(Race.Terran, bot), client, False, None)
+        total = time.perf_counter() - start
+        await client.quit()
+    return total, bot, process.server
+
+
+def main(paths, verbose=False):
+    games = [(path, RecordedGame.from_file(path)) for path in paths]
+    if not games:
+        games = [(f"synthetic, {units} units", RecordedGame(synthetic_game_responses(units))) for units in (50, 200, 800)]
+
+    print(f"{'game':<28} {'steps':>6} {'step (ms)':>10} {'on_step (ms)':>13} {'requests/s':>11} {'actions/s':>10}")
+    for name, game in games:
+        total, bot, server = asyncio.get_event_loop().run_until_complete(play(game))
+        steps = len(bot.step_times)
+        on_step = sum(bot.step_times)
+        print(
+            f"{name:<28} {steps:>6} {total / steps * 1000:>10.2f} {on_step / steps * 1000:>13.2f} "
+            f"{sum(server.requests.values()) / total:>11.0f} {server.actions / total:>10.0f}"
+        )
+        if verbose:
+            print(bot.metrics.summary(), end="\n\n")
+
+
+if __name__ == "__main__":
+    main([arg for arg in sys.argv[1:] if arg != "-v"], verbose="-v" in sys.argv[1:])
@@ -0,0 +1,195 @@
+"""
+Map data for the benchmarks in this folder.
+
+No map files are shipped with the library, so the benchmarks run on randomly generated maps
+that have plateaus, cliffs and ramps like the ladder maps. The game info of a real map can be
+saved with
+    open("MapName.gameinfo", "wb").write((await self._client._execute(game_info=sc_pb.RequestGameInfo())).SerializeToString())
+and passed to the benchmarks as command line arguments instead.
+"""
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from s2clientprotocol import common_pb2 as common_pb, data_pb2, raw_pb2 as raw_pb, sc2api_pb2 as sc_pb
+
+from sc2.data import Alliance, Attribute, Race, Status, TargetType
+from sc2.game_info import GameInfo
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+
+PATHABLE = 0
+NOT_PATHABLE = 255
+
+
+def _image(grid: np.ndarray) -> common_pb.ImageData:
+    """ Converts a grid[y, x] to the row order used by PixelMap. """
+    height, width = grid.shape
+    raw = grid[-np.arange(height) % height]
+    return common_pb.ImageData(
+        bits_per_pixel=8, size=common_pb.Size2DI(x=width, y=height), data=raw.astype(np.uint8).tobytes()
+    )
+
+
+def synthetic_game_info_proto(width: int = 200, height: int = 176, plateaus: int = 16, seed: int = 0) -> sc_pb.ResponseGameInfo:
+    rng = np.random.RandomState(seed)
+    terrain = np.full((height, width), 100, dtype=np.int32)
+    for _ in range(plateaus):
+        w, h = rng.randint(20, 50, size=2)
+        x, y = rng.randint(4, width - w - 4), rng.randint(4, height - h - 4)
+        terrain[y : y + h, x : x + w] = rng.choice([116, 132, 148])
+
+    # Cliffs are where the height changes, they block pathing and placement
+    cliff = np.zeros_like(terrain, dtype=bool)
+    cliff[:, 1:] |= terrain[:, 1:] != terrain[:, :-1]
+    cliff[1:, :] |= terrain[1:, :] != terrain[:-1, :]
+    pathing = np.where(cliff, NOT_PATHABLE, PATHABLE)
+    placement = np.where(cliff, 0, 255)
+
+    # Ramps are pathable but not placeable cliff segments
+    ys, xs = np.nonzero(cliff[4:-4, 4:-4])
+    for i in rng.choice(len(xs), size=min(len(xs), plateaus * 2), replace=False):
+        x, y = xs[i] + 4, ys[i] + 4
+        pathing[y - 2 : y + 3, x - 2 : x + 3] = PATHABLE
+        placement[y - 2 : y + 3, x - 2 : x + 3] = 0
+
+    # Map border
+    for grid in (pathing, placement):
+        grid[:2, :] = grid[-2:, :] = grid[:, :2] = grid[:, -2:] = NOT_PATHABLE if grid is pathing else 0
+
+    proto = sc_pb.ResponseGameInfo(map_name=f"Synthetic {width}x{height} #{seed}")
+    proto.start_raw.map_size.x, proto.start_raw.map_size.y = width, height
+    proto.start_raw.pathing_grid.CopyFrom(_image(pathing))
+    proto.start_raw.placement_grid.CopyFrom(_image(placement))
+    proto.start_raw.terrain_height.CopyFrom(_image(terrain))
+    proto.start_raw.playable_area.p0.x, proto.start_raw.playable_area.p0.y = 2, 2
+    proto.start_raw.playable_area.p1.x, proto.start_raw.playable_area.p1.y = width - 2, height - 2
+    return proto
+
+
+def game_infos(paths: List[str], synthetic: int = 4) -> List[GameInfo]:
+    """ Loads saved game info responses from paths, or generates maps if no paths are given. """
+    if paths:
+        return [GameInfo(sc_pb.ResponseGameInfo.FromString(Path(path).read_bytes())) for path in paths]
+    return [GameInfo(synthetic_game_info_proto(seed=seed)) for seed in range(synthetic)]
+
+
+def synthetic_game_data_proto() -> sc_pb.ResponseData:
+    """ Type data of the units in synthetic_game_responses """
+    return sc_pb.ResponseData(
+        units=[
+            data_pb2.UnitTypeData(
+                unit_id=UnitTypeId.MARINE.value,
+                name="Marine",
+                available=True,
+                attributes=[Attribute.Light.value, Attribute.Biological.value],
+                weapons=[data_pb2.Weapon(type=TargetType.Any.value, damage=6, attacks=1, range=5, speed=0.61)],
+            ),
+            data_pb2.UnitTypeData(
+                unit_id=UnitTypeId.SCV.value,
+                name="SCV",
+                available=True,
+                attributes=[Attribute.Light.value, Attribute.Biological.value, Attribute.Mechanical.value],
+                weapons=[data_pb2.Weapon(type=TargetType.Ground.value, damage=5, attacks=1, range=0.1, speed=1.07)],
+            ),
+            data_pb2.UnitTypeData(
+                unit_id=UnitTypeId.COMMANDCENTER.value,
+                name="CommandCenter",
+                available=True,
+                attributes=[Attribute.Armored.value, Attribute.Mechanical.value, Attribute.Structure.value],
+            ),
+            data_pb2.UnitTypeData(
+                unit_id=UnitTypeId.MINERALFIELD.value,
+                name="MineralField",
+                available=True,
+                has_minerals=True,
+                attributes=[Attribute.Structure.value],
+            ),
+            data_pb2.UnitTypeData(
+                unit_id=UnitTypeId.VESPENEGEYSER.value,
+                name="VespeneGeyser",
+                available=True,
+                has_vespene=True,
+                attributes=[Attribute.Structure.value],
+            ),
+        ],
+        abilities=[
+            data_pb2.AbilityData(ability_id=AbilityId.MOVE.value, link_name="move", button_name="Move", available=True)
+        ],
+    )
+
+
+def synthetic_resources(game_info: sc_pb.ResponseGameInfo, bases: int = 16, seed: int = 0) -> List[raw_pb.Unit]:
+    """ Mineral fields and geysers of bases placed randomly on the map, like the ones of the ladder maps:
+    8 mineral fields in an arc around the townhall and a geyser on both ends. Mineral fields come first,
+    like in GameState.resources. """
+    rng = np.random.RandomState(seed)
+    width, height = game_info.start_raw.map_size.x, game_info.start_raw.map_size.y
+    centers = []
+    while len(centers) < bases:
+        center = rng.randint(16, (width - 16, height - 16)) + 0.5
+        if all(np.hypot(*(center - other)) > 30 for other in centers):
+            centers.append(center)
+    minerals, geysers = [], []
+    for cx, cy in centers:
+        facing = rng.uniform(0, 2 * np.pi)
+        for angle in np.linspace(facing - 1, facing + 1, 8):
+            x, y = cx + 7 * np.cos(angle), cy + 7 * np.sin(angle)
+            minerals.append((UnitTypeId.MINERALFIELD, float(round(x)), float(np.floor(y)) + 0.5))
+        for angle in (facing - 1.7, facing + 1.7):
+            x, y = cx + 7 * np.cos(angle), cy + 7 * np.sin(angle)
+            geysers.append((UnitTypeId.VESPENEGEYSER, float(np.floor(x)) + 0.5, float(np.floor(y)) + 0.5))
+    return [
+        raw_pb.Unit(
+            tag=tag,
+            unit_type=unit_type.value,
+            alliance=Alliance.Neutral.value,
+            display_type=1,
+            pos=common_pb.Point(x=x, y=y, z=10),
+            radius=1.125 if unit_type == UnitTypeId.MINERALFIELD else 1.75,
+            build_progress=1,
+        )
+        for tag, (unit_type, x, y) in enumerate(minerals + geysers, start=1)
+    ]
+
+
+def synthetic_game_responses(units: int = 200, steps: int = 200, seed: int = 0) -> List[sc_pb.Response]:
+    """ Responses of a game on a synthetic map where units of both players walk around randomly,
+    for playing back with sc2.observation_recorder.RecordedGame. Half of the units are enemies. """
+    rng = np.random.RandomState(seed)
+    game_info = synthetic_game_info_proto(seed=seed)
+    game_info.player_info.add(player_id=1, race_requested=Race.Terran.value)
+    game_info.player_info.add(player_id=2, race_requested=Race.Terran.value)
+    width, height = game_info.start_raw.map_size.x, game_info.start_raw.map_size.y
+    responses = [
+        sc_pb.Response(join_game=sc_pb.ResponseJoinGame(player_id=1), status=Status.init_game.value),
+        sc_pb.Response(data=synthetic_game_data_proto(), status=Status.in_game.value),
+        sc_pb.Response(game_info=game_info, status=Status.in_game.value),
+    ]
+
+    unit_types = [UnitTypeId.COMMANDCENTER] + [rng.choice([UnitTypeId.MARINE, UnitTypeId.SCV]) for _ in range(units - 1)]
+    positions = rng.uniform((10, 10), (width - 10, height - 10), size=(units, 2))
+    for step in range(steps):
+        positions = np.clip(positions + rng.uniform(-0.5, 0.5, size=positions.shape), 2, (width - 2, height - 2))
+        response = sc_pb.Response(status=Status.in_game.value)
+        observation = response.observation.observation
+        observation.game_loop = step * 8
+        raw_data = observation.raw_data
+        for tag, (unit_type, (x, y)) in enumerate(zip(unit_types, positions.tolist()), start=1):
+            raw_data.units.add(
+                tag=tag,
+                unit_type=unit_type.value,
+                alliance=(Alliance.Self if tag % 2 else Alliance.Enemy).value,
+                display_type=1,
+                pos=common_pb.Point(x=x, y=y, z=10),
+                radius=0.375,
+                health=45,
+                health_max=45,
+                build_progress=1,
+            )
+        for image, bits_per_pixel in ((raw_data.map_state.visibility, 8), (raw_data.map_state.creep, 1)):
+            image.bits_per_pixel = bits_per_pixel
+            image.size.x, image.size.y = width, height
+            image.data = bytes(width * height * bits_per_pixel // 8)
+        responses.append(response)
+    return responses
@@ -0,0 +1,153 @@
+"""
+Microbenchmarks of the Point2 arithmetic in sc2/position.py, compared to the previous implementation, which
+went through itertools.zip_longest and generator-built tuples for every operation.
+
+Every operation is checked to give exactly the same result as before. With --check the script exits with an
+error when an operation is slower than min-speedup times the previous implementation, so it can guard against
+regressions.
+
+Usage, from the repository root:
+    python -m benchmarks.position [--check] [--min-speedup 1.0]
+"""
+import argparse
+import itertools
+import random
+import sys
+import timeit
+
+from sc2.position import EPSILON, FLOAT_DIGITS, Point2, Point3, _sign
+
+
+class ReferencePoint2(Point2):
+    """ Point2 with the previous implementation of the benchmarked operations """
+
+    def distance_to(self, p):
+        p = p.position
+        if self == p:
+            return 0
+        return (sum(self.__class__((b - a) ** 2 for a, b in itertools.zip_longest(self, p, fillvalue=0)))) ** 0.5
+
+    def offset(self, p):
+        return self.__class__(a + b for a, b in itertools.zip_longest(self, p[: len(self)], fillvalue=0))
+
+    def unit_axes_towards(self, p):
+        return self.__class__(_sign(b - a) for a, b in itertools.zip_longest(self, p[: len(self)], fillvalue=0))
+
+    def towards(self, p, distance=1, limit=False):
+        p = p.position
+        if self == p:
+            return self
+        d = self.distance_to(p)
+        if limit:
+            distance = min(d, distance)
+        return self.__class__(
+            a + (b - a) / d * distance for a, b in itertools.zip_longest(self, p[: len(self)], fillvalue=0)
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, tuple):
+            return False
+        return all(abs(a - b) < EPSILON for a, b in itertools.zip_longest(self, other, fillvalue=0))
+
+    def __hash__(self):
+        return hash(tuple(round(c, FLOAT_DIGITS) for c in self))
+
+    def negative_offset(self, other):
+        return self.__class__((self.x - other.x, self.y - other.y))
+
+    def __add__(self, other):
+        return self.offset(other)
+
+    def __sub__(self, other):
+        return self.negative_offset(other)
+
+    def __neg__(self):
+        return self.__class__(-a for a in self)
+
+    def __mul__(self, other):
+        if isinstance(other, self.__class__):
+            return self.__class__((self.x * other.x, self.y * other.y))
+        return self.__class__((self.x * other, self.y * other))
+
+
+class ReferencePoint3(ReferencePoint2, Point3):
+    pass
+
+
+OPERATIONS = {
+    "distance_to": lambda a, b: a.distance_to(b),
+    "towards": lambda a, b: a.towards(b, 3),
+    "towards limit": lambda a, b: a.towards(b, 30, limit=True),
+    "offset": lambda a, b: a.offset(b),
+    "unit_axes_towards": lambda a, b: a.unit_axes_towards(b),
+    "a + b": lambda a, b: a + b,
+    "a - b": lambda a, b: a - b,
+    "-a": lambda a, b: -a,
+    "a * 2": lambda a, b: a * 2,
+    "a == b": lambda a, b: a == b,
+    "hash(a)": lambda a, b: hash(a),
+}
+
+
+def as_reference(p):
+    return (ReferencePoint3 if isinstance(p, Point3) else ReferencePoint2)(p)
+
+
+def point_pairs(amount=1000, seed=0):
+    rng = random.Random(seed)
+    pairs = []
+    for i in range(amount):
+        a = Point2((rng.uniform(0, 200), rng.uniform(0, 200)))
+        # Some equal and integer points, which take other branches
+        if i % 10 == 0:
+            b = Point2(a)
+        elif i % 10 == 1:
+            a, b = Point2((rng.randint(0, 200), rng.randint(0, 200))), Point2((rng.randint(0, 200), 5))
+        else:
+            b = Point2((rng.uniform(0, 200), rng.uniform(0, 200)))
+        pairs.append((a, b))
+    return pairs
+
+
+def check_results(pairs, reference_pairs):
+    """ The new code has to give exactly the same results, also for Point3, which takes the generic path """
+    rng = random.Random(1)
+    mixed = [(Point3((*a, rng.uniform(0, 20))), b) for a, b in pairs[:100]]
+    mixed += [(a, Point3((*b, rng.uniform(0, 20)))) for a, b in pairs[:100]]
+    reference_mixed = [(as_reference(a), as_reference(b)) for a, b in mixed]
+    for name, operation in OPERATIONS.items():
+        for (a, b), (reference_a, reference_b) in zip(pairs + mixed, reference_pairs + reference_mixed):
+            result, expected = operation(a, b), operation(reference_a, reference_b)
+            if isinstance(expected, tuple):
+                expected_type = {ReferencePoint2: Point2, ReferencePoint3: Point3}[type(expected)]
+                assert type(result) is expected_type, (name, a, b, result, expected)
+                assert tuple(result) == tuple(expected), (name, a, b, result, expected)
+            else:
+                assert type(result) is type(expected) and result == expected, (name, a, b, result, expected)
+
+
+def main(check: bool, min_speedup: float):
+    pairs = point_pairs()
+    reference_pairs = [(as_reference(a), as_reference(b)) for a, b in pairs]
+    check_results(pairs, reference_pairs)
+    print(f"{'operation':<20} {'reference (us)':>15} {'current (us)':>13} {'speedup':>8}")
+    too_slow = []
+    for name, operation in OPERATIONS.items():
+        reference_time = min(timeit.repeat(lambda: [operation(a, b) for a, b in reference_pairs], number=5, repeat=5))
+        current_time = min(timeit.repeat(lambda: [operation(a, b) for a, b in pairs], number=5, repeat=5))
+        scale = 1e6 / (5 * len(pairs))
+        speedup = reference_time / current_time
+        print(f"{name:<20} {reference_time * scale:>15.3f} {current_time * scale:>13.3f} {speedup:>7.1f}x")
+        if speedup < min_speedup:
+            too_slow.append(name)
+    if check and too_slow:
+        print(f"Slower than {min_speedup}x the previous implementation: {', '.join(too_slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="exit with an error if an operation got slower")
+    parser.add_argument("--min-speedup", type=float, default=1.0)
+    args = parser.parse_args()
+    main(args.check, args.min_speedup)
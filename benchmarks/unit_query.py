@@ -0,0 +1,100 @@
+"""
+Compares typical selector chains on Units, which create a Units for every selector, to the same chains as a
+UnitQuery, which computes them in one pass. Both are measured on units with a columnar snapshot, like the units
+of a GameState, and on plain units. With --check the script exits with an error when a query is slower than
+min-speedup times the chain, so it can guard against regressions.
+
+Usage, from the repository root:
+    python -m benchmarks.unit_query [--units 500] [--check] [--min-speedup 1.0]
+"""
+import argparse
+import random
+import sys
+import timeit
+
+from s2clientprotocol import common_pb2 as common_pb, raw_pb2 as raw_pb
+
+from sc2.data import Alliance
+from sc2.game_data import GameData
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.position import Point2
+from sc2.unit_columns import UnitColumns
+from sc2.units import Units
+
+from .map_data import synthetic_game_data_proto
+
+UNIT_TYPES = (UnitTypeId.MARINE, UnitTypeId.SCV, UnitTypeId.COMMANDCENTER)
+P = Point2((100, 100))
+
+CHAINS = {
+    "type.ready.idle.closer_than": (
+        lambda u: u(UnitTypeId.MARINE).ready.idle.closer_than(40, P),
+        lambda u: u.query(UnitTypeId.MARINE).ready.idle.closer_than(40, P),
+    ),
+    "owned.not_flying.filter.sorted_by_distance": (
+        lambda u: u.owned.not_flying.filter(lambda unit: unit.health > 20).sorted_by_distance_to(P),
+        lambda u: u.query().owned.not_flying.filter(lambda unit: unit.health > 20).sorted_by_distance_to(P),
+    ),
+    "enemy.exclude_type.ready.visible": (
+        lambda u: u.enemy.exclude_type({UnitTypeId.SCV}).ready.visible,
+        lambda u: u.query().enemy.exclude_type({UnitTypeId.SCV}).ready.visible,
+    ),
+}
+
+
+def random_protos(amount, seed=0):
+    rng = random.Random(seed)
+    return [
+        raw_pb.Unit(
+            tag=i + 1,
+            unit_type=rng.choice(UNIT_TYPES).value,
+            alliance=rng.choice([Alliance.Self, Alliance.Enemy]).value,
+            display_type=1,
+            pos=common_pb.Point(x=rng.random() * 200, y=rng.random() * 200, z=10),
+            radius=0.375,
+            build_progress=rng.choice([1, 1, 0.5]),
+            is_flying=rng.random() < 0.3,
+            health=rng.choice([10, 45]),
+            health_max=45,
+        )
+        for i in range(amount)
+    ]
+
+
+def main(amount: int, check: bool, min_speedup: float):
+    game_data = GameData(synthetic_game_data_proto())
+    protos = random_protos(amount)
+    columns = UnitColumns(protos, game_data)
+    print(f"{'chain':<45} {'units':<8} {'chained (us)':>13} {'query (us)':>11} {'speedup':>8}")
+    too_slow = []
+    for name, (chained, query) in CHAINS.items():
+        for kind in ("columns", "plain"):
+            if kind == "columns":
+                make = lambda: Units.from_columns(columns, list(range(amount)), game_data)
+            else:
+                make = lambda: Units.from_proto(protos, game_data)
+            units = make()
+            assert [u.tag for u in chained(units)] == [u.tag for u in query(units)], name
+            # Measured alternately, so that noise of the machine affects both the same way.
+            # The query is iterated, so that its result is computed.
+            chained_times, query_times = [], []
+            for _ in range(15):
+                chained_times.append(timeit.timeit(lambda: list(chained(units)), number=20))
+                query_times.append(timeit.timeit(lambda: list(query(units)), number=20))
+            chained_time, query_time = min(chained_times) / 20, min(query_times) / 20
+            speedup = chained_time / query_time
+            print(f"{name:<45} {kind:<8} {chained_time * 1e6:>13.1f} {query_time * 1e6:>11.1f} {speedup:>7.2f}x")
+            if speedup < min_speedup:
+                too_slow.append(f"{name} ({kind})")
+    if check and too_slow:
+        print(f"Slower than {min_speedup}x the chained selectors: {', '.join(too_slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--units", type=int, default=500)
+    parser.add_argument("--check", action="store_true", help="exit with an error if a query is slower")
+    parser.add_argument("--min-speedup", type=float, default=1.0)
+    args = parser.parse_args()
+    main(args.units, args.check, args.min_speedup)
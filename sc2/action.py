@@ -1,34 +1,75 @@
-from itertools import groupby
+from typing import Dict, List
+
 from s2clientprotocol import raw_pb2 as raw_pb, common_pb2 as common_pb
 
 from .position import Point2
 from .unit import Unit
 
+def _target_key(target):
+    """ Exact key of a command target. Point2 equality has a tolerance and its hash is coarse,
+    and units compare by identity, so neither can be used to group commands directly. """
+    if target is None:
+        return None
+    if isinstance(target, Point2):
+        return ("point", float(target.x), float(target.y))
+    return ("unit", target.tag)
+
+def compile_actions(action_iter) -> List[list]:
+    """ Groups unit commands into as few actions as possible, so that every unit gets the same orders as
+    it would if the commands were sent one by one:
+    - Every command is kept in order, as many abilities, e.g. stim, siege or burrow, don't replace the orders.
+    - A command that repeats the unit's previous command has no effect, so it is dropped. The same command
+      later on is kept, e.g. it is another waypoint.
+    - Structures keep all their commands, training the same unit twice queues two of them.
+    - Commands with the same ability, target and queue are combined no matter where they are in the input,
+      while the commands of each unit stay in their order.
+    Returns the groups of commands that become one action each. """
+    commands_by_unit: Dict[int, list] = {}
+    for action in action_iter:
+        commands = commands_by_unit.setdefault(action.unit.tag, [])
+        key = (action.ability, _target_key(action.target), action.queue)
+        if not action.unit.is_structure and commands and commands[-1][0] == key:
+            continue
+        commands.append((key, action))
+
+    # The n-th command of a unit is only combined with the n-th commands of other units, which keeps the order
+    groups: Dict[tuple, list] = {}
+    for commands in commands_by_unit.values():
+        for rank, (key, action) in enumerate(commands):
+            groups.setdefault((rank, *key), []).append(action)
+    return [group for key, group in sorted(groups.items(), key=lambda item: item[0][0])]
+
+
+def combined_action(items) -> raw_pb.ActionRaw:
+    """ One action for a group of unit commands with the same ability, target and queue """
+    ability, target, queue = items[0].ability, items[0].target, items[0].queue
+    unit_tags = list(dict.fromkeys(u.unit.tag for u in items))
+
+    if target is None:
+        cmd = raw_pb.ActionRawUnitCommand(
+            ability_id=ability.value,
+            unit_tags=unit_tags,
+            queue_command=queue
+        )
+    elif isinstance(target, Point2):
+        cmd = raw_pb.ActionRawUnitCommand(
+            ability_id=ability.value,
+            unit_tags=unit_tags,
+            queue_command=queue,
+            target_world_space_pos=common_pb.Point2D(x=target.x, y=target.y)
+        )
+    elif isinstance(target, Unit):
+        cmd = raw_pb.ActionRawUnitCommand(
+            ability_id=ability.value,
+            unit_tags=unit_tags,
+            queue_command=queue,
+            target_unit_tag=target.tag
+        )
+    else:
+        raise RuntimeError(f"Must target an unit or a point or None, found '{target !r}'")
+
+    return raw_pb.ActionRaw(unit_command=cmd)
+
 def combine_actions(action_iter):
-    for key, items in groupby(action_iter, key=lambda a: a.combining_tuple):
-        ability, target, queue = key
-
-        if target is None:
-            cmd = raw_pb.ActionRawUnitCommand(
-                ability_id=ability.value,
-                unit_tags=list({u.unit.tag for u in items}),
-                queue_command=queue
-            )
-        elif isinstance(target, Point2):
-            cmd = raw_pb.ActionRawUnitCommand(
-                ability_id=ability.value,
-                unit_tags=list({u.unit.tag for u in items}),
-                queue_command=queue,
-                target_world_space_pos=common_pb.Point2D(x=target.x, y=target.y)
-            )
-        elif isinstance(target, Unit):
-            cmd = raw_pb.ActionRawUnitCommand(
-                ability_id=ability.value,
-                unit_tags=[u.unit.tag for u in items],
-                queue_command=queue,
-                target_unit_tag=target.tag
-            )
-        else:
-            raise RuntimeError(f"Must target an unit or a point or None, found '{target !r}'")
-
-        yield raw_pb.ActionRaw(unit_command=cmd)
+    for items in compile_actions(action_iter):
+        yield combined_action(items)
@@ -4,6 +4,8 @@ import random
 import logging
 from typing import List, Dict, Set, Tuple, Any, Optional, Union # mypy type checking
 
+import numpy as np
+
 # imports for mypy and pycharm autocomplete
 from .game_state import GameState
 from .game_data import GameData
@@ -13,18 +15,31 @@ logger = logging.getLogger(__name__)
 from .position import Point2, Point3
 from .data import Race, ActionResult, Attribute, race_worker, race_townhalls, race_gas, Target, Result
 from .unit import Unit
-from .cache import property_cache_forever, property_cache_once_per_frame
+from .cache import property_cache_once_per_frame
 from .game_data import AbilityData
 from .ids.unit_typeid import UnitTypeId
 from .ids.ability_id import AbilityId
 from .ids.upgrade_id import UpgradeId
 from .units import Units
+from .step_metrics import StepMetrics
+from .building_placement import BuildingPlacement
+from .distance_fields import DistanceFields
+from .expansions import find_expansion_locations
+from .map_cache import MapCache
+from .worker_distribution import WorkerDistribution
 
 
 class BotAI:
     """Base class for bots."""
 
     EXPANSION_GAP_THRESHOLD = 15
+    # Set to True to collect the commands given with do and do_actions and send them in one request at the end of
+    # the step, instead of sending a request for each call. do and do_actions then return None, the results are in
+    # self.action_results in the next step.
+    buffer_actions = False
+    # Directory where results of the map analysis are saved, so that the next game on the same map can load them.
+    # None to always compute them.
+    map_cache_directory: Optional[str] = None
 
     def __init__(self):
         # Specific opponent bot ID used in sc2ai ladder games http://sc2ai.net/
@@ -81,53 +96,61 @@ class BotAI:
         )
         return self.cached_main_base_ramp
 
-    @property_cache_forever
+    @property
+    def base_distances(self) -> DistanceFields:
+        """ Ground distances from every cell to the start locations and expansion locations, see DistanceFields.
+        Computed on first use, which runs Dijkstra for every base and can take a second on large maps. When
+        map_cache_directory is set they are loaded from the map cache, or computed before the first step and saved. """
+        if hasattr(self, "cached_base_distances"):
+            return self.cached_base_distances
+        locations = [self.start_location, *self.enemy_start_locations, *self.expansion_locations]
+        # The start location is unknown in games without a townhall
+        locations = list(dict.fromkeys(location for location in locations if location is not None))
+        self.cached_base_distances = DistanceFields.load_or_compute(
+            self._game_info.pathing, locations, self.map_cache
+        )
+        return self.cached_base_distances
+
+    @property
     def expansion_locations(self) -> Dict[Point2, Units]:
         """List of possible expansion locations."""
-        # RESOURCE_SPREAD_THRESHOLD = 144
-        RESOURCE_SPREAD_THRESHOLD = 225
-        geysers = self.state.vespene_geyser
-        all_resources = self.state.resources
-
-        # Group nearby minerals together to form expansion locations
-        resource_groups = []
-        for mf in all_resources:
-            mf_height = self.get_terrain_height(mf.position)
-            for cluster in resource_groups:
-                # bases on standard maps dont have more than 10 resources
-                if len(cluster) == 10:
-                    continue
-                if mf.position._distance_squared(
-                    cluster[0].position
-                ) < RESOURCE_SPREAD_THRESHOLD and mf_height == self.get_terrain_height(cluster[0].position):
-                    cluster.append(mf)
-                    break
-            else:  # not found
-                resource_groups.append([mf])
-        # Filter out bases with only one mineral field
-        resource_groups = [cluster for cluster in resource_groups if len(cluster) > 1]
-        # distance offsets from a gas geysir
-        offsets = [(x, y) for x in range(-9, 10) for y in range(-9, 10) if 75 >= x ** 2 + y ** 2 >= 49]
-        centers = {}
-        # for every resource group:
-        for resources in resource_groups:
-            # possible expansion points
-            # resources[-1] is a gas geysir which always has (x.5, y.5) coordinates, just like an expansion
-            possible_points = (
-                Point2((offset[0] + resources[-1].position.x, offset[1] + resources[-1].position.y))
-                for offset in offsets
-            )
-            # filter out points that are too near
-            possible_points = [
-                point
-                for point in possible_points
-                if all(point.distance_to(resource) >= (7 if resource in geysers else 6) for resource in resources)
-            ]
-            # choose best fitting point
-            result = min(possible_points, key=lambda p: sum(p.distance_to(resource) for resource in resources))
-            centers[result] = resources
+        if not hasattr(self, "cached_expansion_locations"):
+            self.cached_expansion_locations = self._load_expansion_locations()
+            if self.cached_expansion_locations is None:
+                self.cached_expansion_locations = self._find_expansion_locations()
+                self._save_expansion_locations(self.cached_expansion_locations)
+        return self.cached_expansion_locations
+
+    def _load_expansion_locations(self) -> Optional[Dict[Point2, Units]]:
+        """ Expansion locations from the map cache, with the resources of this game at the saved positions """
+        saved = self.map_cache and self.map_cache.load("expansion_locations")
+        if not saved:
+            return None
+        resources = {resource.position: resource for resource in self.state.resources}
+        positions = [Point2(p) for p in saved["resources"].tolist()]
+        if not all(p in resources for p in positions):
+            return None
+        bounds = np.cumsum(saved["sizes"]).tolist()
+        return {
+            Point2(center): [resources[p] for p in positions[start:end]]
+            for center, start, end in zip(saved["centers"].tolist(), [0] + bounds, bounds)
+        }
+
+    def _save_expansion_locations(self, centers: Dict[Point2, Units]):
+        if not self.map_cache:
+            return
+        self.map_cache.save(
+            "expansion_locations",
+            centers=np.array(list(centers), dtype=float).reshape(-1, 2),
+            resources=np.array([r.position for rs in centers.values() for r in rs], dtype=float).reshape(-1, 2),
+            sizes=np.array([len(resources) for resources in centers.values()], dtype=np.int64),
+        )
+
+    def _find_expansion_locations(self) -> Dict[Point2, Units]:
         """ Returns dict with center of resources as key, resources (mineral field, vespene geyser) as value """
-        return centers
+        return find_expansion_locations(
+            self.state.resources, self.state.vespene_geyser.tags, self._game_info.terrain_height
+        )
 
     async def get_available_abilities(self, units: Union[List[Unit], Units], ignore_resource_requirements=False) -> List[List[AbilityId]]:
         """ Returns available abilities of one or more units. """
@@ -151,11 +174,14 @@ class BotAI:
             await self.build(building, near=location, max_distance=max_distance, random_alternative=False, placement_step=1)
 
     async def get_next_expansion(self) -> Optional[Point2]:
-        """Find next expansion location."""
+        """Find next expansion location. Ground distances are computed locally, see GameInfo.pathing."""
 
         closest = None
         distance = math.inf
-        for el in self.expansion_locations:
+        locations = list(self.expansion_locations)
+        startp = self._game_info.player_start_location
+        distances = self._game_info.pathing.distances(locations, startp).tolist() if locations else []
+        for el, d in zip(locations, distances):
             def is_near_to_expansion(t):
                 return t.position.distance_to(el) < self.EXPANSION_GAP_THRESHOLD
 
@@ -163,11 +189,6 @@ class BotAI:
                 # already taken
                 continue
 
-            startp = self._game_info.player_start_location
-            d = await self._client.query_pathing(startp, el)
-            if d is None:
-                continue
-
             if d < distance:
                 distance = d
                 closest = el
@@ -177,68 +198,11 @@ class BotAI:
     async def distribute_workers(self):
         """
         Distributes workers across all the bases taken.
-        WARNING: This is quite slow when there are lots of workers or multiple bases.
+        The assignments are kept between calls, so only the workers whose resource changes get a command,
+        see WorkerDistribution.
         """
-
-        # TODO:
-        # OPTIMIZE: Assign idle workers smarter
-        # OPTIMIZE: Never use same worker mutltiple times
-        owned_expansions = self.owned_expansions
-        worker_pool = []
-        actions = []
-
-        for idle_worker in self.workers.idle:
-            mf = self.state.mineral_field.closest_to(idle_worker)
-            actions.append(idle_worker.gather(mf))
-
-        for location, townhall in owned_expansions.items():
-            workers = self.workers.closer_than(20, location)
-            actual = townhall.assigned_harvesters
-            ideal = townhall.ideal_harvesters
-            excess = actual - ideal
-            if actual > ideal:
-                worker_pool.extend(workers.random_group_of(min(excess, len(workers))))
-                continue
-        for g in self.geysers:
-            workers = self.workers.closer_than(5, g)
-            actual = g.assigned_harvesters
-            ideal = g.ideal_harvesters
-            excess = actual - ideal
-            if actual > ideal:
-                worker_pool.extend(workers.random_group_of(min(excess, len(workers))))
-                continue
-
-        for g in self.geysers:
-            actual = g.assigned_harvesters
-            ideal = g.ideal_harvesters
-            deficit = ideal - actual
-
-            for _ in range(deficit):
-                if worker_pool:
-                    w = worker_pool.pop()
-                    if len(w.orders) == 1 and w.orders[0].ability.id is AbilityId.HARVEST_RETURN:
-                        actions.append(w.move(g))
-                        actions.append(w.return_resource(queue=True))
-                    else:
-                        actions.append(w.gather(g))
-
-        for location, townhall in owned_expansions.items():
-            actual = townhall.assigned_harvesters
-            ideal = townhall.ideal_harvesters
-
-            deficit = ideal - actual
-            for x in range(0, deficit):
-                if worker_pool:
-                    w = worker_pool.pop()
-                    mf = self.state.mineral_field.closest_to(townhall)
-                    if len(w.orders) == 1 and w.orders[0].ability.id is AbilityId.HARVEST_RETURN:
-                        actions.append(w.move(townhall))
-                        actions.append(w.return_resource(queue=True))
-                        actions.append(w.gather(mf, queue=True))
-                    else:
-                        actions.append(w.gather(mf))
-
-        await self.do_actions(actions)
+        self.worker_distribution.update(self.state, self.workers, self.townhalls, self.geysers)
+        await self.do_actions(self.worker_distribution.distribute())
 
     @property
     def owned_expansions(self):
@@ -316,52 +280,22 @@ class BotAI:
         return workers.random if force else None
 
     async def can_place(self, building: Union[AbilityData, AbilityId, UnitTypeId], position: Point2) -> bool:
-        """Tests if a building can be placed in the given location."""
+        """Tests if a building can be placed in the given location. Answers are cached, see BuildingPlacement."""
 
         assert isinstance(building, (AbilityData, AbilityId, UnitTypeId))
 
-        if isinstance(building, UnitTypeId):
-            building = self._game_data.units[building.value].creation_ability
-        elif isinstance(building, AbilityId):
-            building = self._game_data.abilities[building.value]
-
-        r = await self._client.query_building_placement(building, [position])
-        return r[0] == ActionResult.Success
+        return (await self.building_placement.can_place(building, [position]))[0]
 
     async def find_placement(self, building: UnitTypeId, near: Union[Unit, Point2, Point3], max_distance: int=20, random_alternative: bool=True, placement_step: int=2) -> Optional[Point2]:
-        """Finds a placement location for building."""
+        """Finds a placement location for building. Candidates are checked locally first and only the
+        remaining ones are confirmed with SC2, see BuildingPlacement."""
 
         assert isinstance(building, (AbilityId, UnitTypeId))
         assert isinstance(near, Point2)
 
-        if isinstance(building, UnitTypeId):
-            building = self._game_data.units[building.value].creation_ability
-        else:  # AbilityId
-            building = self._game_data.abilities[building.value]
-
-        if await self.can_place(building, near):
-            return near
-
-        if max_distance == 0:
-            return None
-
-        for distance in range(placement_step, max_distance, placement_step):
-            possible_positions = [Point2(p).offset(near).to2 for p in (
-                    [(dx, -distance) for dx in range(-distance, distance + 1, placement_step)] +
-                    [(dx, distance) for dx in range(-distance, distance + 1, placement_step)] +
-                    [(-distance, dy) for dy in range(-distance, distance + 1, placement_step)] +
-                    [(distance, dy) for dy in range(-distance, distance + 1, placement_step)]
-            )]
-            res = await self._client.query_building_placement(building, possible_positions)
-            possible = [p for r, p in zip(res, possible_positions) if r == ActionResult.Success]
-            if not possible:
-                continue
-
-            if random_alternative:
-                return random.choice(possible)
-            else:
-                return min(possible, key=lambda p: p.distance_to(near))
-        return None
+        return await self.building_placement.find_placement(
+            building, near, max_distance, random_alternative, placement_step
+        )
 
     def already_pending_upgrade(self, upgrade_type: UpgradeId) -> Union[int, float]:
         """ Check if an upgrade is being researched
@@ -376,13 +310,17 @@ class BotAI:
         level = None
         if "LEVEL" in upgrade_type.name:
             level = upgrade_type.name[-1]
-        creationAbilityID = self._game_data.upgrades[upgrade_type.value].research_ability.id
-        for structure in self.units.structure.ready:
-            for order in structure.orders:
-                if order.ability.id is creationAbilityID:
-                    if level and order.ability.button_name[-1] != level:
-                        return 0
-                    return order.progress
+        research_ability = self._game_data.upgrades[upgrade_type.value].research_ability
+        columns = self.state.unit_columns
+        # All levels of an upgrade remap to the same ability
+        orders = columns.orders_of(research_ability.id, remapped=True)
+        rows = columns.order_row[orders]
+        orders = orders[columns.is_mine[rows] & columns.is_structure[rows] & columns.is_ready[rows]]
+        if len(orders):
+            order = orders[0]
+            if level and self._game_data.abilities[int(columns.order_ability[order])].button_name[-1] != level:
+                return 0
+            return float(columns.order_progress[order])
         return 0
 
     def already_pending(self, unit_type: Union[UpgradeId, UnitTypeId], all_units: bool=False) -> int:
@@ -403,12 +341,21 @@ class BotAI:
         ability = self._game_data.units[unit_type.value].creation_ability
 
         amount = len(self.units(unit_type).not_ready)
+        if ability is None:
+            return amount
 
+        columns = self.state.unit_columns
+        orders = columns.orders_of(ability._proto.ability_id)
+        rows = columns.order_row[orders]
+        own = columns.is_mine[rows]
         if all_units:
-            amount += sum([o.ability == ability for u in self.units for o in u.orders])
+            amount += int(np.count_nonzero(own))
         else:
-            amount += sum([o.ability == ability for w in self.workers for o in w.orders])
-            amount += sum([egg.orders[0].ability == ability for egg in self.units(UnitTypeId.EGG)])
+            unit_types = columns.unit_type[rows]
+            amount += int(np.count_nonzero(own & (unit_types == race_worker[self.race].value)))
+            # Only the first order of an egg
+            is_egg = own & (unit_types == UnitTypeId.EGG.value) & (orders == columns.first_order[rows])
+            amount += int(np.count_nonzero(is_egg))
 
         return amount
 
@@ -431,11 +378,34 @@ class BotAI:
             return ActionResult.Error
         return await self.do(unit.build(building, p))
 
+    def _buffer_action(self, action: "UnitCommand"):
+        cost = self._game_data.calculate_ability_cost(action.ability)
+        self.minerals -= cost.minerals
+        self.vespene -= cost.vespene
+        self._action_buffer.append(action)
+
+    async def _flush_actions(self):
+        """ Sends the buffered actions of this step in one request. Run from main.py before the step request. """
+        self.action_results = {}
+        if not self._action_buffer:
+            return
+        actions, self._action_buffer = self._action_buffer, []
+        self.action_results = await self._client.command_results(actions)
+        errors = [(action, result) for action, result in self.action_results.items() if result != ActionResult.Success]
+        for action, result in errors:
+            logger.error(f"Error: {result} (action: {action})")
+
     async def do(self, action):
+        """ Gives a command to a unit. With buffer_actions, the command is sent together with all other commands
+        of the step after on_step, its result is then in self.action_results[action] and this returns None. """
         if not self.can_afford(action):
             logger.warning(f"Cannot afford action {action}")
             return ActionResult.Error
 
+        if self.buffer_actions:
+            self._buffer_action(action)
+            return None
+
         r = await self._client.actions(action, game_data=self._game_data)
 
         if not r:  # success
@@ -451,6 +421,10 @@ class BotAI:
     async def do_actions(self, actions: List["UnitCommand"]):
         if not actions:
             return None
+        if self.buffer_actions:
+            for action in actions:
+                self._buffer_action(action)
+            return None
         for action in actions:
             cost = self._game_data.calculate_ability_cost(action.ability)
             self.minerals -= cost.minerals
@@ -498,6 +472,28 @@ class BotAI:
         pos = pos.position.to2.rounded
         return self.state.creep[pos] != 0
 
+    # Vectorized versions of the functions above, these accept Units, a list of positions or an N x 2 numpy array
+    # and return a numpy array with one entry per position.
+    def get_terrain_height_batch(self, positions: Union[Units, List[Union[Point2, Point3, Unit]], "np.ndarray"]) -> "np.ndarray":
+        """ Same as get_terrain_height, but for many positions at once. """
+        return self._game_info.terrain_height.values_at(positions)
+
+    def in_placement_grid_batch(self, positions: Union[Units, List[Union[Point2, Point3, Unit]], "np.ndarray"]) -> "np.ndarray":
+        """ Same as in_placement_grid, but for many positions at once. """
+        return self._game_info.placement_grid.values_at(positions) != 0
+
+    def in_pathing_grid_batch(self, positions: Union[Units, List[Union[Point2, Point3, Unit]], "np.ndarray"]) -> "np.ndarray":
+        """ Same as in_pathing_grid, but for many positions at once. """
+        return self._game_info.pathing_grid.values_at(positions) == 0
+
+    def is_visible_batch(self, positions: Union[Units, List[Union[Point2, Point3, Unit]], "np.ndarray"]) -> "np.ndarray":
+        """ Same as is_visible, but for many positions at once. """
+        return self.state.visibility.values_at(positions) == 2
+
+    def has_creep_batch(self, positions: Union[Units, List[Union[Point2, Point3, Unit]], "np.ndarray"]) -> "np.ndarray":
+        """ Same as has_creep, but for many positions at once. """
+        return self.state.creep.values_at(positions) != 0
+
     def _prepare_start(self, client, player_id, game_info, game_data):
         """Ran until game start to set game and player data."""
         self._client: "Client" = client
@@ -506,22 +502,38 @@ class BotAI:
 
         self.player_id: int = player_id
         self.race: Race = Race(self._game_info.player_races[self.player_id])
-        self._units_previous_map: dict = dict()
         self.units: Units = Units([], game_data)
+        # Timings of the phases of every step, see StepMetrics
+        self.metrics: StepMetrics = StepMetrics()
+        # Commands given with do and do_actions during the step, see buffer_actions
+        self._action_buffer: List["UnitCommand"] = []
+        # Result of every buffered command sent on the previous step
+        self.action_results: Dict["UnitCommand", ActionResult] = {}
+        self.building_placement: BuildingPlacement = BuildingPlacement(client, game_info, game_data)
+        self.worker_distribution: WorkerDistribution = WorkerDistribution()
+        # Saved results of the map analysis, see map_cache_directory
+        self.map_cache: Optional[MapCache] = None
 
     def _prepare_first_step(self):
         """First step extra preparations. Must not be called before _prepare_step."""
         if self.townhalls:
             self._game_info.player_start_location = self.townhalls.first.position
-        self._game_info.map_ramps = self._game_info._find_ramps()
+        if self.map_cache_directory is not None:
+            self.map_cache = MapCache(self.map_cache_directory, self._game_info)
+        self._game_info.map_ramps = self._game_info._find_ramps(self.map_cache)
+        expansion_locations = self._load_expansion_locations()
+        if expansion_locations is not None:
+            self.cached_expansion_locations = expansion_locations
+        if self.map_cache:
+            # Loaded from the cache, or computed once for the map and saved there for the next games
+            self.base_distances
 
     def _prepare_step(self, state):
         """Set attributes from new state before on_step."""
         self.state: GameState = state
-        # Required for events
-        self._units_previous_map.clear()
-        for unit in self.units:
-            self._units_previous_map[unit.tag] = unit
+        self.building_placement.update(state)
+        # Commands left over from a step that failed are not sent
+        self._action_buffer.clear()
 
         self.units: Units = state.own_units
         self.workers: Units = self.units(race_worker[self.race])
@@ -542,27 +554,21 @@ class BotAI:
         - on_unit_created
         - on_unit_destroyed
         - on_building_construction_complete
+        The events are based on self.state.diff, so only the changed units are looked at.
         """
         await self._issue_unit_dead_events()
         await self._issue_unit_added_events()
-        for unit in self.units.structure:
-            await self._issue_building_complete_event(unit)
+        await self._issue_building_complete_events()
 
     async def _issue_unit_added_events(self):
-        for unit in self.units.not_structure:
-            if unit.tag not in self._units_previous_map:
-                await self.on_unit_created(unit)
-        for unit in self.units.structure:
-            if unit.tag not in self._units_previous_map:
-                await self.on_building_construction_started(unit)
-
-    async def _issue_building_complete_event(self, unit):
-        if unit.build_progress < 1:
-            return
-        if unit.tag not in self._units_previous_map:
-            return
-        unit_prev = self._units_previous_map[unit.tag]
-        if unit_prev.build_progress < 1:
+        appeared = self.units.tags_in(self.state.diff.appeared)
+        for unit in appeared.not_structure:
+            await self.on_unit_created(unit)
+        for unit in appeared.structure:
+            await self.on_building_construction_started(unit)
+
+    async def _issue_building_complete_events(self):
+        for unit in self.units.tags_in(self.state.diff.completed).structure:
             await self.on_building_construction_complete(unit)
 
     async def _issue_unit_dead_events(self):
@@ -0,0 +1,217 @@
+import math
+import random
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .data import ActionResult, Race
+from .game_data import AbilityData, GameData
+from .ids.ability_id import AbilityId
+from .ids.unit_typeid import UnitTypeId
+from .position import Point2
+
+# Buildings of these races need creep or power, except the ones listed here
+NO_CREEP_NEEDED = {UnitTypeId.HATCHERY, UnitTypeId.EXTRACTOR}
+NO_POWER_NEEDED = {UnitTypeId.NEXUS, UnitTypeId.PYLON, UnitTypeId.ASSIMILATOR}
+
+
+def _summed_area(mask: np.ndarray) -> np.ndarray:
+    """ table[y, x] is the amount of set cells in mask[:y, :x] """
+    table = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+    np.cumsum(np.cumsum(mask, axis=0, dtype=np.int32), axis=1, out=table[1:, 1:])
+    return table
+
+
+def _footprint_cells(positions: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Cells that are surely covered by a square footprint centered at each position, as x_min, y_min, x_max, y_max
+    with the maximums exclusive. Cells only partly covered are left out, as SC2 snaps the building to the grid. """
+    x_min = np.ceil(positions[:, 0] - radius).astype(int)
+    y_min = np.ceil(positions[:, 1] - radius).astype(int)
+    x_max = np.floor(positions[:, 0] + radius).astype(int)
+    y_max = np.floor(positions[:, 1] + radius).astype(int)
+    return x_min, y_min, x_max, y_max
+
+
+class BuildingPlacement:
+    """ Finds building locations with as few placement queries as possible.
+
+    Candidates are first checked locally: the placement grid, the footprints of the current structures, creep for
+    zerg buildings and power for protoss buildings. The local check can only rule out positions, the remaining ones
+    are confirmed by SC2, a few at a time. The answers of SC2 are cached per (ability, position) until a structure
+    appears, disappears or finishes, or the creep under the footprint changes. BotAI.can_place and
+    BotAI.find_placement use the instance in self.building_placement. """
+
+    def __init__(self, client, game_info, game_data: GameData):
+        self._client = client
+        self._game_info = game_info
+        self._game_data = game_data
+        self.state = None
+        # How many candidates are sent to SC2 at once
+        self.confirm_amount: int = 4
+        self._answers: Dict[Tuple[AbilityId, float, float], bool] = {}
+        self._structure_tags: Optional[np.ndarray] = None
+        self._creep: Optional[np.ndarray] = None
+        # Summed area tables of blocked cells, the ones of the creep are rebuilt every step
+        self._blocked: Optional[np.ndarray] = None
+        self._no_creep: Optional[np.ndarray] = None
+        self._built_unit_types: Dict[AbilityId, UnitTypeId] = {
+            unit.creation_ability.id: unit.id
+            for unit in game_data.units.values()
+            if unit.creation_ability is not None and unit.creation_ability.is_building
+        }
+
+    def update(self, state):
+        """ Called every step, forgets everything that depends on the structures or the creep when they have changed """
+        self.state = state
+        self._no_creep = None
+        columns = state.unit_columns
+        tags = np.sort(columns.tag[columns.is_structure])
+        # A finished pylon powers new positions, finishing units other than structures is rare enough to not check
+        if self._structure_tags is None or not np.array_equal(tags, self._structure_tags) or state.diff.completed:
+            self._structure_tags = tags
+            self._answers.clear()
+            self._blocked = None
+        # Creep makes positions placeable for zerg and unplaceable for the others
+        creep = state.creep.grid != 0
+        if self._answers and self._creep is not None and not np.array_equal(creep, self._creep):
+            self._forget_answers_on(creep != self._creep)
+        self._creep = creep
+
+    def _forget_answers_on(self, changed: np.ndarray):
+        """ Forgets the cached answers of positions where the footprint touches one of the changed cells """
+        keys = list(self._answers)
+        height, width = changed.shape
+        points = np.array([(x, y) for _, x, y in keys], dtype=float)
+        # Without a footprint radius the answer is always forgotten
+        radii = np.array([self._game_data.abilities[key[0].value].footprint_radius or 0 for key in keys], dtype=float)
+        radii[radii == 0] = max(width, height)
+        # Rounded outwards, so that cells partly under the footprint count as well
+        x_min = np.clip(np.floor(points[:, 0] - radii).astype(int), 0, width)
+        y_min = np.clip(np.floor(points[:, 1] - radii).astype(int), 0, height)
+        x_max = np.clip(np.ceil(points[:, 0] + radii).astype(int), 0, width)
+        y_max = np.clip(np.ceil(points[:, 1] + radii).astype(int), 0, height)
+        table = _summed_area(changed)
+        touched = table[y_max, x_max] - table[y_min, x_max] - table[y_max, x_min] + table[y_min, x_min]
+        for key, count in zip(keys, touched.tolist()):
+            if count:
+                del self._answers[key]
+
+    @property
+    def answers(self) -> int:
+        """ Amount of cached answers of SC2 """
+        return len(self._answers)
+
+    def _ability(self, building: Union[AbilityData, AbilityId, UnitTypeId]) -> AbilityData:
+        assert isinstance(building, (AbilityData, AbilityId, UnitTypeId))
+        if isinstance(building, UnitTypeId):
+            return self._game_data.units[building.value].creation_ability
+        if isinstance(building, AbilityId):
+            return self._game_data.abilities[building.value]
+        return building
+
+    def _blocked_table(self) -> np.ndarray:
+        """ Cells that are not placeable or are under a structure on the ground """
+        if self._blocked is None:
+            blocked = self._game_info.placement_grid.grid == 0
+            columns = self.state.unit_columns
+            height, width = blocked.shape
+            for row in np.nonzero(columns.is_structure & ~columns.is_flying)[0].tolist():
+                type_data = self._game_data.units.get(int(columns.unit_type[row]))
+                ability = type_data and type_data.creation_ability
+                radius = ability.footprint_radius if ability is not None and ability.footprint_radius else None
+                if radius is None:
+                    # Minerals, geysers and rocks, the radius is rounded down so no free cell is marked
+                    radius = math.floor(columns.radius[row] * 2) / 2
+                x_min, y_min, x_max, y_max = _footprint_cells(columns.positions[row : row + 1], radius)
+                blocked[max(y_min[0], 0) : min(y_max[0], height), max(x_min[0], 0) : min(x_max[0], width)] = True
+            self._blocked = _summed_area(blocked)
+        return self._blocked
+
+    def _no_creep_table(self) -> np.ndarray:
+        if self._no_creep is None:
+            self._no_creep = _summed_area(self.state.creep.grid == 0)
+        return self._no_creep
+
+    def local_check(self, building: Union[AbilityData, AbilityId, UnitTypeId], positions: List[Point2]) -> np.ndarray:
+        """ False for positions where the building surely can't be placed, True where SC2 has to be asked """
+        ability = self._ability(building)
+        points = np.array([(p.x, p.y) for p in positions], dtype=float).reshape(-1, 2)
+        possible = np.ones(len(points), dtype=bool)
+        radius = ability.footprint_radius
+        if not radius or not len(points):
+            return possible
+
+        x_min, y_min, x_max, y_max = _footprint_cells(points, radius)
+        height, width = self._game_info.placement_grid.grid.shape
+        possible &= (x_min >= 0) & (y_min >= 0) & (x_max <= width) & (y_max <= height)
+        x_min, x_max = np.clip(x_min, 0, width), np.clip(x_max, 0, width)
+        y_min, y_max = np.clip(y_min, 0, height), np.clip(y_max, 0, height)
+
+        def cells_set(table):
+            return table[y_max, x_max] - table[y_min, x_max] - table[y_max, x_min] + table[y_min, x_min]
+
+        possible &= cells_set(self._blocked_table()) == 0
+
+        unit_type = self._built_unit_types.get(ability.id)
+        race = unit_type and self._game_data.units[unit_type.value].race
+        if race == Race.Zerg and unit_type not in NO_CREEP_NEEDED:
+            possible &= cells_set(self._no_creep_table()) == 0
+        elif race == Race.Protoss and unit_type not in NO_POWER_NEEDED:
+            sources = self.state.psionic_matrix.sources
+            powered = np.zeros(len(points), dtype=bool)
+            for source in sources:
+                offsets = points - (source.position.x, source.position.y)
+                powered |= np.einsum("ij,ij->i", offsets, offsets) <= source.radius ** 2
+            possible &= powered
+        return possible
+
+    async def can_place(self, building: Union[AbilityData, AbilityId, UnitTypeId], positions: List[Point2]) -> List[bool]:
+        """ Whether the building can be placed at each position. SC2 is only asked about the positions that
+        pass the local check and have no cached answer. """
+        ability = self._ability(building)
+        keys = [(ability.id, float(p.x), float(p.y)) for p in positions]
+        possible = self.local_check(ability, positions)
+        unknown = {key: p for key, p, ok in zip(keys, positions, possible) if ok and key not in self._answers}
+        if unknown:
+            results = await self._client.query_building_placement(ability, list(unknown.values()))
+            for key, result in zip(unknown, results):
+                self._answers[key] = result == ActionResult.Success
+        return [bool(ok) and self._answers[key] for key, ok in zip(keys, possible)]
+
+    async def find_placement(
+        self,
+        building: Union[AbilityId, UnitTypeId],
+        near: Point2,
+        max_distance: int = 20,
+        random_alternative: bool = True,
+        placement_step: int = 2,
+    ) -> Optional[Point2]:
+        """ Same search as BotAI.find_placement: near itself, then squares of growing size around it. On each square
+        only the candidates that pass the local check are confirmed, self.confirm_amount at a time. """
+        ability = self._ability(building)
+        if (await self.can_place(ability, [near]))[0]:
+            return near
+        if max_distance == 0:
+            return None
+
+        for distance in range(placement_step, max_distance, placement_step):
+            candidates = [
+                Point2(p).offset(near).to2
+                for p in (
+                    [(dx, -distance) for dx in range(-distance, distance + 1, placement_step)]
+                    + [(dx, distance) for dx in range(-distance, distance + 1, placement_step)]
+                    + [(-distance, dy) for dy in range(-distance, distance + 1, placement_step)]
+                    + [(distance, dy) for dy in range(-distance, distance + 1, placement_step)]
+                )
+            ]
+            candidates = [p for p, ok in zip(candidates, self.local_check(ability, candidates)) if ok]
+            if random_alternative:
+                random.shuffle(candidates)
+            else:
+                candidates.sort(key=lambda p: p.distance_to(near))
+            for start in range(0, len(candidates), self.confirm_amount):
+                chunk = candidates[start : start + self.confirm_amount]
+                possible = [p for p, ok in zip(chunk, await self.can_place(ability, chunk)) if ok]
+                if possible:
+                    return possible[0]
+        return None
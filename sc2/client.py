@@ -6,6 +6,7 @@ from s2clientprotocol import (
     raw_pb2 as raw_pb,
 )
 
+import asyncio
 import logging
 
 from sc2.ids.ability_id import AbilityId
@@ -19,7 +20,7 @@ from .game_info import GameInfo
 from .game_data import GameData, AbilityData
 from .data import Status, Result
 from .data import Race, ActionResult, ChatChannel
-from .action import combine_actions
+from .action import combine_actions, combined_action, compile_actions
 from .position import Point2, Point3
 from .unit import Unit
 from .units import Units
@@ -38,6 +39,11 @@ class Client(Protocol):
         self._debug_spheres = []
 
         self._renderer = None
+        # ObservationRecorder that saves the game for playing it back without SC2, see save_observations_as in run_game
+        self._recorder = None
+        # Queries and actions waiting to be sent in one request, see _batched
+        self._batches = {}
+        self._batch_flush = None
 
     @property
     def in_game(self):
@@ -83,6 +89,7 @@ class Client(Protocol):
             req.player_name = name
 
         result = await self._execute(join_game=req)
+        self._record(result)
         self._game_result = None
         self._player_id = result.join_game.player_id
         return result.join_game.player_id
@@ -112,15 +119,21 @@ class Client(Protocol):
             f.write(result.save_replay.data)
         logger.info(f"Saved replay to {path}")
 
+    def _record(self, result):
+        if self._recorder is not None:
+            self._recorder.record(result)
+
     async def observation(self):
         result = await self._execute(observation=sc_pb.RequestObservation())
         assert result.HasField("observation")
+        self._record(result)
 
         if not self.in_game or result.observation.player_result:
             # Sometimes game ends one step before results are available
             if not result.observation.player_result:
                 result = await self._execute(observation=sc_pb.RequestObservation())
                 assert result.observation.player_result
+                self._record(result)
 
             player_id_to_result = {}
             for pr in result.observation.player_result:
@@ -140,12 +153,101 @@ class Client(Protocol):
 
     async def get_game_data(self) -> GameData:
         result = await self._execute(data=sc_pb.RequestData(ability_id=True, unit_type_id=True, upgrade_id=True))
+        self._record(result)
         return GameData(result.data)
 
     async def get_game_info(self) -> GameInfo:
         result = await self._execute(game_info=sc_pb.RequestGameInfo())
+        self._record(result)
         return GameInfo(result.game_info)
 
+    async def _batched(self, key: tuple, request):
+        """ Sends the request combined with all other requests with the same key that are made while the
+        event loop runs the other ready coroutines, e.g. the ones in the same asyncio.gather, and returns
+        this request's part of the combined response. Key is ("query", ignore_resource_requirements) for a
+        RequestQuery, or ("query", None) if it only has pathing queries, and ("action",) for a list of
+        sc_pb.Action, which returns their results. """
+        future = asyncio.get_event_loop().create_future()
+        self._batches.setdefault(key, []).append((request, future))
+        if self._batch_flush is None:
+            self._batch_flush = asyncio.ensure_future(self._flush_batches())
+        return await future
+
+    async def _flush_batches(self):
+        # Only this task sends batches, so the combined requests are never sent concurrently
+        try:
+            while self._batches:
+                # Let the other ready coroutines add their requests first
+                await asyncio.sleep(0)
+                batches, self._batches = self._batches, {}
+                # ignore_resource_requirements does not matter for pathing, so those join any other query
+                pathing_only = batches.pop(("query", None), [])
+                if pathing_only:
+                    query_keys = [key for key in batches if key[0] == "query"] or [("query", False)]
+                    batches.setdefault(query_keys[0], []).extend(pathing_only)
+                for key, requests in batches.items():
+                    try:
+                        if key[0] == "query":
+                            results = await self._send_queries(key[1], [request for request, _ in requests])
+                        else:
+                            results = await self._send_actions([request for request, _ in requests])
+                    except Exception as e:
+                        for _, future in requests:
+                            if not future.done():
+                                future.set_exception(e)
+                        continue
+                    for (_, future), result in zip(requests, results):
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            self._batch_flush = None
+
+    async def _send_queries(
+        self, ignore_resource_requirements: bool, requests: List[query_pb.RequestQuery]
+    ) -> List[query_pb.ResponseQuery]:
+        if len(requests) == 1:
+            return [(await self._execute(query=requests[0])).query]
+        combined = query_pb.RequestQuery(ignore_resource_requirements=ignore_resource_requirements)
+        for request in requests:
+            combined.pathing.extend(request.pathing)
+            combined.placements.extend(request.placements)
+            combined.abilities.extend(request.abilities)
+        response = (await self._execute(query=combined)).query
+        results = []
+        pathing = placements = abilities = 0
+        for request in requests:
+            results.append(
+                query_pb.ResponseQuery(
+                    pathing=response.pathing[pathing : pathing + len(request.pathing)],
+                    placements=response.placements[placements : placements + len(request.placements)],
+                    abilities=response.abilities[abilities : abilities + len(request.abilities)],
+                )
+            )
+            pathing += len(request.pathing)
+            placements += len(request.placements)
+            abilities += len(request.abilities)
+        return results
+
+    async def _send_actions(self, requests: List[List[sc_pb.Action]]) -> List[List[int]]:
+        response = await self._execute(
+            action=sc_pb.RequestAction(actions=[action for actions in requests for action in actions])
+        )
+        results = list(response.action.result)
+        start = 0
+        split = []
+        for actions in requests:
+            split.append(results[start : start + len(actions)])
+            start += len(actions)
+        return split
+
+    async def _query(self, request: query_pb.RequestQuery) -> query_pb.ResponseQuery:
+        if request.placements or request.abilities:
+            return await self._batched(("query", request.ignore_resource_requirements), request)
+        return await self._batched(("query", None), request)
+
+    async def _action(self, actions: List[sc_pb.Action]) -> List[int]:
+        return await self._batched(("action",), actions)
+
     async def actions(self, actions, game_data, return_successes=False):
         if not isinstance(actions, list):
             res = await self.actions([actions], game_data, return_successes)
@@ -156,14 +258,22 @@ class Client(Protocol):
         else:
             actions = combine_actions(actions)
 
-            res = await self._execute(action=sc_pb.RequestAction(actions=[sc_pb.Action(action_raw=a) for a in actions]))
+            res = await self._action([sc_pb.Action(action_raw=a) for a in actions])
 
-            res = [ActionResult(r) for r in res.action.result]
+            res = [ActionResult(r) for r in res]
             if return_successes:
                 return res
             else:
                 return [r for r in res if r != ActionResult.Success]
 
+    async def command_results(self, actions: List["UnitCommand"]) -> Dict["UnitCommand", ActionResult]:
+        """ Sends the unit commands combined like actions does, and returns the result of every command.
+        Commands that were combined into the same action have the same result, commands that repeated the
+        previous command of the same unit were not sent and have no result. """
+        groups = compile_actions(actions)
+        results = await self._action([sc_pb.Action(action_raw=combined_action(group)) for group in groups])
+        return {command: ActionResult(result) for group, result in zip(groups, results) for command in group}
+
     async def query_pathing(
         self, start: Union[Unit, Point2, Point3], end: Union[Point2, Point3]
     ) -> Optional[Union[int, float]]:
@@ -171,8 +281,8 @@ class Client(Protocol):
         assert isinstance(start, (Point2, Unit))
         assert isinstance(end, Point2)
         if isinstance(start, Point2):
-            result = await self._execute(
-                query=query_pb.RequestQuery(
+            result = await self._query(
+                query_pb.RequestQuery(
                     pathing=[
                         query_pb.RequestQueryPathing(
                             start_pos=common_pb.Point2D(x=start.x, y=start.y),
@@ -182,14 +292,14 @@ class Client(Protocol):
                 )
             )
         else:
-            result = await self._execute(
-                query=query_pb.RequestQuery(
+            result = await self._query(
+                query_pb.RequestQuery(
                     pathing=[
                         query_pb.RequestQueryPathing(unit_tag=start.tag, end_pos=common_pb.Point2D(x=end.x, y=end.y))
                     ]
                 )
             )
-        distance = float(result.query.pathing[0].distance)
+        distance = float(result.pathing[0].distance)
         if distance <= 0.0:
             return None
         return distance
@@ -207,8 +317,8 @@ class Client(Protocol):
         assert isinstance(zipped_list[0][0], (Point2, Unit)), f"{type(zipped_list[0][0])}"
         assert isinstance(zipped_list[0][1], Point2), f"{type(zipped_list[0][1])}"
         if isinstance(zipped_list[0][0], Point2):
-            results = await self._execute(
-                query=query_pb.RequestQuery(
+            results = await self._query(
+                query_pb.RequestQuery(
                     pathing=[
                         query_pb.RequestQueryPathing(
                             start_pos=common_pb.Point2D(x=p1.x, y=p1.y), end_pos=common_pb.Point2D(x=p2.x, y=p2.y)
@@ -218,23 +328,23 @@ class Client(Protocol):
                 )
             )
         else:
-            results = await self._execute(
-                query=query_pb.RequestQuery(
+            results = await self._query(
+                query_pb.RequestQuery(
                     pathing=[
                         query_pb.RequestQueryPathing(unit_tag=p1.tag, end_pos=common_pb.Point2D(x=p2.x, y=p2.y))
                         for p1, p2 in zipped_list
                     ]
                 )
             )
-        results = [float(d.distance) for d in results.query.pathing]
+        results = [float(d.distance) for d in results.pathing]
         return results
 
     async def query_building_placement(
         self, ability: AbilityId, positions: List[Union[Unit, Point2, Point3]], ignore_resources: bool = True
     ) -> List[ActionResult]:
         assert isinstance(ability, AbilityData)
-        result = await self._execute(
-            query=query_pb.RequestQuery(
+        result = await self._query(
+            query_pb.RequestQuery(
                 placements=[
                     query_pb.RequestQueryBuildingPlacement(
                         ability_id=ability.id.value, target_pos=common_pb.Point2D(x=position.x, y=position.y)
@@ -244,7 +354,7 @@ class Client(Protocol):
                 ignore_resource_requirements=ignore_resources,
             )
         )
-        return [ActionResult(p.result) for p in result.query.placements]
+        return [ActionResult(p.result) for p in result.placements]
 
     async def query_available_abilities(
         self, units: Union[List[Unit], "Units"], ignore_resource_requirements: bool = False
@@ -258,25 +368,21 @@ class Client(Protocol):
         else:
             input_was_a_list = True
         assert units
-        result = await self._execute(
-            query=query_pb.RequestQuery(
+        result = await self._query(
+            query_pb.RequestQuery(
                 abilities=[query_pb.RequestQueryAvailableAbilities(unit_tag=unit.tag) for unit in units],
                 ignore_resource_requirements=ignore_resource_requirements,
             )
         )
         """ Fix for bots that only query a single unit """
         if not input_was_a_list:
-            return [[AbilityId(a.ability_id) for a in b.abilities] for b in result.query.abilities][0]
-        return [[AbilityId(a.ability_id) for a in b.abilities] for b in result.query.abilities]
+            return [[AbilityId(a.ability_id) for a in b.abilities] for b in result.abilities][0]
+        return [[AbilityId(a.ability_id) for a in b.abilities] for b in result.abilities]
 
     async def chat_send(self, message: str, team_only: bool):
         """ Writes a message to the chat """
         ch = ChatChannel.Team if team_only else ChatChannel.Broadcast
-        await self._execute(
-            action=sc_pb.RequestAction(
-                actions=[sc_pb.Action(action_chat=sc_pb.ActionChat(channel=ch.value, message=message))]
-            )
-        )
+        await self._action([sc_pb.Action(action_chat=sc_pb.ActionChat(channel=ch.value, message=message))])
 
     async def debug_create_unit(self, unit_spawn_commands: List[List[Union[UnitTypeId, int, Point2, Point3]]]):
         """ Usage example (will spawn 1 marine in the center of the map for player ID 1):
@@ -320,18 +426,16 @@ class Client(Protocol):
         assert isinstance(position, (Unit, Point2, Point3))
         if isinstance(position, Unit):
             position = position.position
-        await self._execute(
-            action=sc_pb.RequestAction(
-                actions=[
-                    sc_pb.Action(
-                        action_raw=raw_pb.ActionRaw(
-                            camera_move=raw_pb.ActionRawCameraMove(
-                                center_world_space=common_pb.Point(x=position.x, y=position.y)
-                            )
+        await self._action(
+            [
+                sc_pb.Action(
+                    action_raw=raw_pb.ActionRaw(
+                        camera_move=raw_pb.ActionRawCameraMove(
+                            center_world_space=common_pb.Point(x=position.x, y=position.y)
                         )
                     )
-                ]
-            )
+                )
+            ]
         )
 
     async def move_camera_spatial(self, position: Union[Point2, Point3]):
@@ -345,7 +449,7 @@ class Client(Protocol):
                 )
             )
         )
-        await self._execute(action=sc_pb.RequestAction(actions=[action]))
+        await self._action([action])
 
     async def debug_text(self, texts: Union[str, list], positions: Union[list, set], color=(0, 255, 0), size_px=16):
         """ Deprecated, may be removed soon """
@@ -0,0 +1,88 @@
+from typing import List, Optional, Union
+
+import numpy as np
+
+from .map_cache import MapCache
+from .pathing import Pathing
+from .position import Point2, Point3
+from .spatial_index import points_to_array
+
+
+class DistanceFields:
+    """ Ground distances from every cell of the map to a fixed list of locations, e.g. the bases.
+
+    fields[i, y, x] is the distance from cell (x, y) to locations[i] in units of 1 / SCALE cells, stored as uint16
+    to keep a 200 x 200 map with 20 bases at 1.6 MB. Distances up to about 6500 fit, UNREACHABLE marks cells that
+    can't reach the location. Lookups are O(1) and the fields can be saved in a MapCache, as they only depend on
+    the map.
+    """
+
+    SCALE = 10
+    UNREACHABLE = np.iinfo(np.uint16).max
+
+    def __init__(self, locations: List[Point2], fields: np.ndarray):
+        assert fields.dtype == np.uint16 and fields.ndim == 3 and len(fields) == len(locations)
+        self.locations: List[Point2] = [Point2(location) for location in locations]
+        self.fields: np.ndarray = fields
+        self._index = {location: i for i, location in enumerate(self.locations)}
+
+    @classmethod
+    def compute(cls, pathing: Pathing, locations: List[Point2]) -> "DistanceFields":
+        """ Runs Dijkstra from every location, the fields are not kept in the cache of pathing.
+        Unpathable cells get the distance of the closest pathable cell, like Pathing.distances. """
+        fields = np.empty((len(locations), pathing.height, pathing.width), dtype=np.uint16)
+        for i, location in enumerate(locations):
+            field = pathing.distance_field(location, fill_unpathable=True, cache=False)
+            scaled = np.round(np.minimum(field * cls.SCALE, cls.UNREACHABLE - 1))
+            scaled[np.isinf(field)] = cls.UNREACHABLE
+            fields[i] = scaled.astype(np.uint16)
+        return cls(locations, fields)
+
+    @classmethod
+    def load_or_compute(cls, pathing: Pathing, locations: List[Point2], cache: Optional[MapCache]) -> "DistanceFields":
+        """ Loads the fields from the cache if they were saved for the same locations, otherwise computes them and
+        saves them there. Without a cache the fields are only computed. """
+        saved = cache and cache.load("distances")
+        if saved and [Point2(p) for p in saved["locations"].tolist()] == [Point2(p) for p in locations]:
+            return cls(locations, saved["fields"])
+        result = cls.compute(pathing, locations)
+        if cache:
+            cache.save(
+                "distances", locations=np.array(result.locations, dtype=float).reshape(-1, 2), fields=result.fields
+            )
+        return result
+
+    def _cells(self, points) -> np.ndarray:
+        if isinstance(points, (Point2, Point3)):
+            points = [points]
+        cells = np.floor(points_to_array(points)).astype(int)
+        return np.clip(cells, 0, (self.fields.shape[2] - 1, self.fields.shape[1] - 1))
+
+    def _to_distances(self, raw: np.ndarray) -> np.ndarray:
+        return np.where(raw == self.UNREACHABLE, np.inf, raw / self.SCALE)
+
+    def index_of(self, location: Point2) -> int:
+        return self._index[Point2(location)]
+
+    def distance(self, point: Union[Point2, Point3], location: Point2) -> float:
+        """ Ground distance from point to one of the locations, inf if it can't be reached """
+        x, y = self._cells(point)[0].tolist()
+        return float(self._to_distances(self.fields[self.index_of(location), y, x]))
+
+    def distances_to(self, points, location: Point2) -> np.ndarray:
+        """ Ground distance from each point to one of the locations.
+        Accepts Units, a list of Unit/Point2/Point3 or an N x 2 array. """
+        cells = self._cells(points)
+        return self._to_distances(self.fields[self.index_of(location), cells[:, 1], cells[:, 0]])
+
+    def distances_from(self, point: Union[Point2, Point3]) -> np.ndarray:
+        """ Ground distance from point to every location, in the order of self.locations """
+        x, y = self._cells(point)[0].tolist()
+        return self._to_distances(self.fields[:, y, x])
+
+    def closest(self, point: Union[Point2, Point3]) -> Optional[Point2]:
+        """ The location that is closest to point by ground, None if none can be reached """
+        distances = self.distances_from(point)
+        if not len(distances) or np.isinf(distances.min()):
+            return None
+        return self.locations[int(distances.argmin())]
@@ -0,0 +1,84 @@
+from typing import Dict, List
+
+import numpy as np
+
+from .pixel_map import PixelMap
+from .position import Point2
+from .spatial_index import points_to_array
+
+# Resources closer than this to the first resource of a group, squared, join the group
+RESOURCE_SPREAD_THRESHOLD = 225
+# Bases on standard maps dont have more than 10 resources
+MAX_GROUP_SIZE = 10
+# Distance offsets from a gas geyser where a townhall can be
+CENTER_OFFSETS = [(x, y) for x in range(-9, 10) for y in range(-9, 10) if 75 >= x ** 2 + y ** 2 >= 49]
+
+
+def group_resources(positions: np.ndarray, heights: np.ndarray) -> List[List[int]]:
+    """ Groups resources that are near each other and on the same height, returns the groups as lists of indices.
+
+    Resources are added in order to the first group, in the order the groups were created, that has room and whose
+    first resource is near enough. Only the groups whose first resource is in the neighbouring cells of a grid with
+    the spread as cell size can be near enough, so the other groups aren't looked at. """
+    cell_size = RESOURCE_SPREAD_THRESHOLD ** 0.5
+    groups: List[List[int]] = []
+    heads = []
+    buckets: Dict[tuple, List[int]] = {}
+    points = positions.tolist()
+    heights = heights.tolist()
+    for i, (x, y) in enumerate(points):
+        cx, cy = int(x // cell_size), int(y // cell_size)
+        nearby = sorted(
+            group for dx in (-1, 0, 1) for dy in (-1, 0, 1) for group in buckets.get((cx + dx, cy + dy), ())
+        )
+        for group in nearby:
+            head_x, head_y = heads[group]
+            if (
+                len(groups[group]) < MAX_GROUP_SIZE
+                and (x - head_x) ** 2 + (y - head_y) ** 2 < RESOURCE_SPREAD_THRESHOLD
+                and heights[i] == heights[groups[group][0]]
+            ):
+                groups[group].append(i)
+                break
+        else:
+            buckets.setdefault((cx, cy), []).append(len(groups))
+            groups.append([i])
+            heads.append((x, y))
+    return groups
+
+
+def expansion_center(positions: np.ndarray, is_geyser: np.ndarray) -> Point2:
+    """ The point at CENTER_OFFSETS from the last resource that is at least 7 from the geysers and 6 from the
+    minerals and has the smallest sum of distances to the resources. The last resource is a geyser, which always
+    has (x.5, y.5) coordinates, just like an expansion. """
+    last_x, last_y = positions[-1].tolist()
+    offsets = np.array(CENTER_OFFSETS, dtype=float)
+    candidates = offsets + (last_x, last_y)
+    differences = positions[None, :, :] - candidates[:, None, :]
+    distances = np.sqrt(differences[:, :, 0] ** 2 + differences[:, :, 1] ** 2)
+    far_enough = (distances >= np.where(is_geyser, 7, 6)).all(axis=1)
+    if not far_enough.any():
+        raise ValueError("No possible expansion location near the resources")
+    # Summed one resource at a time like sum() does, so that ties are broken the same way
+    totals = np.zeros(len(candidates))
+    for column in range(distances.shape[1]):
+        totals += distances[:, column]
+    best = np.nonzero(far_enough)[0][np.argmin(totals[far_enough])]
+    offset_x, offset_y = CENTER_OFFSETS[best]
+    return Point2((offset_x + last_x, offset_y + last_y))
+
+
+def find_expansion_locations(resources, geyser_tags, terrain_height: PixelMap) -> Dict[Point2, list]:
+    """ Returns dict with center of resources as key, resources (mineral field, vespene geyser) as value.
+    Groups with only one resource are left out. """
+    resources = list(resources)
+    positions = points_to_array(resources)
+    if not len(positions):
+        return {}
+    heights = terrain_height.values_at(positions)
+    is_geyser = np.array([resource.tag in geyser_tags for resource in resources], dtype=bool)
+    centers = {}
+    for group in group_resources(positions, heights):
+        if len(group) > 1:
+            centers[expansion_center(positions[group], is_geyser[group])] = [resources[i] for i in group]
+    return centers
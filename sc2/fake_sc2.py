@@ -0,0 +1,100 @@
+from collections import Counter
+from typing import Optional
+
+import aiohttp
+import portpicker
+from aiohttp import web
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+from .controller import Controller
+from .observation_recorder import RecordedGame
+
+
+class FakeSC2Server:
+    """ Websocket server that speaks the sc2api protocol like the SC2 process does, but answers every
+    request from a RecordedGame instead of running a game. The game can be a recording or scripted
+    responses, see RecordedGame. The server counts the requests it receives, which together with the
+    time taken gives the protocol overhead and throughput of a bot without the game. """
+
+    def __init__(self, game: RecordedGame, host: str = "127.0.0.1", port: Optional[int] = None):
+        self.game = game
+        self._host = host
+        self._port = portpicker.pick_unused_port() if port is None else port
+        self._runner = None
+        # Amount of requests by kind, e.g. requests["observation"]
+        self.requests: Counter = Counter()
+        # Amount of raw actions received, several can be sent in one action request
+        self.actions = 0
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self._host}:{self._port}/sc2api"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/sc2api", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._host, self._port).start()
+        logger.debug(f"Fake SC2 listening on {self.ws_url}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        async for message in ws:
+            if message.type != aiohttp.WSMsgType.BINARY:
+                break
+            sc2_request = sc_pb.Request()
+            sc2_request.ParseFromString(message.data)
+            kind = sc2_request.WhichOneof("request")
+            self.requests[kind] += 1
+            if kind == "action":
+                self.actions += len(sc2_request.action.actions)
+            response = self.game.respond(sc2_request)
+            response.id = sc2_request.id
+            await ws.send_bytes(response.SerializeToString())
+            if kind == "quit":
+                break
+        return ws
+
+
+class FakeSC2Process:
+    """ Drop-in replacement for SC2Process that starts a FakeSC2Server instead of the game.
+    Usage:
+    async with FakeSC2Process(RecordedGame.from_file("game.sc2obs.gz")) as server:
+        client = Client(server._ws)
+        await _play_game(Bot(Race.Terran, MyBot()), client, False, None)
+    """
+
+    def __init__(self, game: RecordedGame, host: str = "127.0.0.1", port: Optional[int] = None):
+        self.server = FakeSC2Server(game, host, port)
+        self._process = None
+        self._session = None
+        self._ws = None
+
+    async def __aenter__(self):
+        await self.server.start()
+        # Controller.running checks this, there is no real process
+        self._process = self.server
+        self._session = aiohttp.ClientSession()
+        self._ws = await self._session.ws_connect(self.server.ws_url, timeout=120, max_msg_size=0)
+        return Controller(self._ws, self)
+
+    async def __aexit__(self, *args):
+        if self._ws is not None:
+            await self._ws.close()
+        if self._session is not None:
+            await self._session.close()
+        await self.server.stop()
+        self._process = None
+        self._ws = None
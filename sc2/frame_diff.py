@@ -0,0 +1,70 @@
+from typing import Optional, Set
+
+import numpy as np
+
+from .unit_columns import UnitColumns
+
+
+class FrameDiff:
+    """ Changes in the visible units between two consecutive observations, as sets of unit tags.
+
+    Units are matched by tag using the columnar snapshots of both frames, so the whole diff is a few
+    vectorized passes instead of a Python loop over every unit. Blips are not included.
+    Without a previous frame every visible unit has appeared.
+    Usage:
+    diff = self.state.diff
+    for unit in self.units.tags_in(diff.damaged):
+        # retreat damaged units
+    """
+
+    def __init__(self, previous: Optional[UnitColumns], current: UnitColumns):
+        current_rows = np.nonzero(~current.is_blip)[0]
+        current_tags = current.tag[current_rows]
+        if previous is None:
+            previous_rows, previous_tags = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+        else:
+            previous_rows = np.nonzero(~previous.is_blip)[0]
+            previous_tags = previous.tag[previous_rows]
+
+        _, previous_index, current_index = np.intersect1d(
+            previous_tags, current_tags, assume_unique=True, return_indices=True
+        )
+        appeared = np.ones(len(current_tags), dtype=bool)
+        appeared[current_index] = False
+        disappeared = np.ones(len(previous_tags), dtype=bool)
+        disappeared[previous_index] = False
+        self.appeared: Set[int] = set(current_tags[appeared].tolist())
+        self.disappeared: Set[int] = set(previous_tags[disappeared].tolist())
+
+        # Rows of the units that are in both frames
+        before = previous_rows[previous_index]
+        after = current_rows[current_index]
+        tags = current_tags[current_index]
+        if previous is None:
+            self.moved: Set[int] = set()
+            self.damaged: Set[int] = set()
+            self.type_changed: Set[int] = set()
+            self.completed: Set[int] = set()
+            return
+
+        moved = (previous.x[before] != current.x[after]) | (previous.y[before] != current.y[after])
+        damaged = (current.health[after] < previous.health[before]) | (
+            current.shield[after] < previous.shield[before]
+        )
+        type_changed = previous.unit_type[before] != current.unit_type[after]
+        completed = (previous.build_progress[before] < 1) & (current.build_progress[after] == 1)
+        self.moved: Set[int] = set(tags[moved].tolist())
+        self.damaged: Set[int] = set(tags[damaged].tolist())
+        # Morphs, e.g. sieging a tank or a hatchery turning into a lair
+        self.type_changed: Set[int] = set(tags[type_changed].tolist())
+        # Units whose build progress reached 1 this frame
+        self.completed: Set[int] = set(tags[completed].tolist())
+
+    def __bool__(self) -> bool:
+        return any((self.appeared, self.disappeared, self.moved, self.damaged, self.type_changed, self.completed))
+
+    def __repr__(self) -> str:
+        return (
+            f"FrameDiff(appeared={len(self.appeared)}, disappeared={len(self.disappeared)}, moved={len(self.moved)}, "
+            f"damaged={len(self.damaged)}, type_changed={len(self.type_changed)}, completed={len(self.completed)})"
+        )
@@ -116,6 +116,15 @@ class AbilityData:
         """ For Stimpack this returns 'Research Stimpack' """
         return self._proto.friendly_name
 
+    @property
+    def is_building(self) -> bool:
+        return self._proto.is_building
+
+    @property
+    def footprint_radius(self) -> float:
+        """ Half of the side of the square a building created by this ability covers, 1.5 for a Barracks """
+        return self._proto.footprint_radius
+
     @property
     def is_free_morph(self) -> bool:
         parts = split_camel_case(self._proto.link_name)
@@ -1,15 +1,24 @@
-from collections import deque
 from typing import Any, Dict, FrozenSet, Generator, List, Optional, Sequence, Set, Tuple, Union
 
-from .pixel_map import PixelMap
+import numpy as np
+
+from .map_cache import MapCache
+from .pathing import Pathing
+from .cache import property_immutable_cache, property_mutable_cache
+from .pixel_map import PixelMap, label_clusters
 from .player import Player
-from .position import Point2, Rect, Size
+from .position import Cell, Point2, Rect, Size
 
 
 class Ramp:
-    def __init__(self, points: Set[Point2], game_info: "GameInfo"):
-        self._points: Set[Point2] = points
+    def __init__(self, points: Union[Set[Point2], np.ndarray], game_info: "GameInfo"):
+        """ points are the cells of the ramp, as a set of integer points or an N x 2 integer array """
+        if isinstance(points, (set, frozenset)):
+            points = sorted(points)
+        # The Point2 sets are only built when they are used
+        self._cells: np.ndarray = np.array(points, dtype=int).reshape(-1, 2)
         self.__game_info = game_info
+        self.cache = {}
         # tested by printing actual building locations vs calculated depot positions
         self.x_offset = 0.5  # might be errors with the pixelmap?
         self.y_offset = -0.5
@@ -24,25 +33,44 @@ class Ramp:
 
     @property
     def size(self) -> int:
-        return len(self._points)
+        return len(self._cells)
 
     def height_at(self, p: Point2) -> int:
         return self._height_map[p]
 
+    @property_immutable_cache
+    def _heights(self) -> np.ndarray:
+        return self._height_map.values_at(self._cells)
+
+    @property_immutable_cache
+    def _points(self) -> Set[Point2]:
+        return {Point2(cell) for cell in map(tuple, self._cells.tolist())}
+
     @property
     def points(self) -> Set[Point2]:
         return self._points.copy()
 
-    @property
+    @property_immutable_cache
+    def cells(self) -> FrozenSet[Cell]:
+        return frozenset(Cell(cell) for cell in map(tuple, self._cells.tolist()))
+
+    @property_immutable_cache
+    def _upper_cells(self) -> np.ndarray:
+        return self._cells[self._heights == self._heights.max()]
+
+    @property_immutable_cache
+    def _lower_cells(self) -> np.ndarray:
+        return self._cells[self._heights == self._heights.min()]
+
+    @property_mutable_cache
     def upper(self) -> Set[Point2]:
         """ Returns the upper points of a ramp. """
-        max_height = max([self.height_at(p) for p in self._points])
-        return {p for p in self._points if self.height_at(p) == max_height}
+        return {Point2(cell) for cell in map(tuple, self._upper_cells.tolist())}
 
-    @property
+    @property_mutable_cache
     def upper2_for_ramp_wall(self) -> Set[Point2]:
         """ Returns the 2 upper ramp points of the main base ramp required for the supply depot and barracks placement properties used in this file. """
-        if len(self.upper) > 5:
+        if len(self._upper_cells) > 5:
             # NOTE: this was way too slow on large ramps
             return set()  # HACK: makes this work for now
             # FIXME: please do
@@ -52,24 +80,19 @@ class Ramp:
             upper2.pop()
         return set(upper2)
 
-    @property
+    @property_immutable_cache
     def top_center(self) -> Point2:
-        pos = Point2(
-            (sum([p.x for p in self.upper]) / len(self.upper), sum([p.y for p in self.upper]) / len(self.upper))
-        )
-        return pos
+        x, y = self._upper_cells.sum(axis=0).tolist()
+        return Point2((x / len(self._upper_cells), y / len(self._upper_cells)))
 
-    @property
+    @property_mutable_cache
     def lower(self) -> Set[Point2]:
-        min_height = min([self.height_at(p) for p in self._points])
-        return {p for p in self._points if self.height_at(p) == min_height}
+        return {Point2(cell) for cell in map(tuple, self._lower_cells.tolist())}
 
-    @property
+    @property_immutable_cache
     def bottom_center(self) -> Point2:
-        pos = Point2(
-            (sum([p.x for p in self.lower]) / len(self.lower), sum([p.y for p in self.lower]) / len(self.lower))
-        )
-        return pos
+        x, y = self._lower_cells.sum(axis=0).tolist()
+        return Point2((x / len(self._lower_cells), y / len(self._lower_cells)))
 
     @property
     def barracks_in_middle(self) -> Point2:
@@ -150,75 +173,62 @@ class GameInfo:
         }
         self.start_locations: List[Point2] = [Point2.from_proto(sl) for sl in self._proto.start_raw.start_locations]
         self.player_start_location: Point2 = None  # Filled later by BotAI._prepare_first_step
+        self._pathing: Optional[Pathing] = None
 
     @property
     def map_center(self) -> Point2:
         return self.playable_area.center
 
-    def _find_ramps(self) -> List[Ramp]:
-        """Calculate (self.pathing_grid - self.placement_grid) (for sets) and then find ramps by comparing heights."""
-        rampDict = {
-            Point2((x, y)): self.pathing_grid[(x, y)] == 0 and self.placement_grid[(x, y)] == 0
-            for x in range(self.pathing_grid.width)
-            for y in range(self.pathing_grid.height)
-        }
-
-        rampPoints = {p for p in rampDict if rampDict[p]}  # filter only points part of ramp
-        rampGroups = self._find_groups(rampPoints)
-        return [Ramp(group, self) for group in rampGroups]
+    @property
+    def pathing(self) -> Pathing:
+        """ Local ground distances and paths, built from pathing_grid when first used """
+        if self._pathing is None:
+            self._pathing = Pathing.from_pixel_map(self.pathing_grid)
+        return self._pathing
+
+    def _find_ramps(self, cache: Optional[MapCache] = None) -> List[Ramp]:
+        """Calculate (self.pathing_grid - self.placement_grid) (for sets) and then find ramps by comparing heights.
+        With a cache the ramps are loaded from it, or saved to it after they have been found."""
+        saved = cache and cache.load("ramps")
+        if saved:
+            cells = saved["points"].astype(int)
+            bounds = np.cumsum(saved["sizes"]).tolist()
+            return [Ramp(cells[start:end], self) for start, end in zip([0] + bounds, bounds)]
+
+        ramp_mask = (self.pathing_grid.grid == 0) & (self.placement_grid.grid == 0)
+        ramps = [Ramp(cells, self) for cells in self._find_mask_cell_groups(ramp_mask)]
+        if cache:
+            cache.save(
+                "ramps",
+                points=np.concatenate([ramp._cells for ramp in ramps] or [np.zeros((0, 2))]).astype(float),
+                sizes=np.array([ramp.size for ramp in ramps], dtype=np.int64),
+            )
+        return ramps
 
     def _find_groups(
         self, points: Set[Point2], minimum_points_per_group: int = 8, max_distance_between_points: int = 2
     ) -> List[Set[Point2]]:
         """ From a set/list of points, this function will try to group points together """
-        """ Paint clusters of points in rectangular map using flood fill algorithm. """
-        NOT_INTERESTED = -2
-        NOT_COLORED_YET = -1
-        currentColor: int = NOT_COLORED_YET
-        picture: List[List[int]] = [
-            [NOT_INTERESTED for j in range(self.pathing_grid.width)] for i in range(self.pathing_grid.height)
-        ]
-
-        def paint(pt: Point2) -> None:
-            picture[pt.y][pt.x] = currentColor
-
-        nearby: Set[Point2] = set()
-        for dx in range(-max_distance_between_points, max_distance_between_points + 1):
-            for dy in range(-max_distance_between_points, max_distance_between_points + 1):
-                if abs(dx) + abs(dy) <= max_distance_between_points:
-                    nearby.add(Point2((dx, dy)))
-
-        for point in points:
-            paint(point)
-
-        remaining: Set[Point2] = set(points)
-        queue: Deque[Point2] = deque()
-        foundGroups: List[Set[Point2]] = []
-        while remaining:
-            currentGroup: Set[Point2] = set()
-            if not queue:
-                currentColor += 1
-                start = remaining.pop()
-                paint(start)
-                queue.append(start)
-                currentGroup.add(start)
-            while queue:
-                base: Point2 = queue.popleft()
-                for offset in nearby:
-                    px, py = base.x + offset.x, base.y + offset.y
-                    if px < 0 or py < 0 or px >= self.pathing_grid.width or py >= self.pathing_grid.height:
-                        continue
-                    if picture[py][px] != NOT_COLORED_YET:
-                        continue
-                    point: Point2 = Point2((px, py))
-                    remaining.remove(point)
-                    paint(point)
-                    queue.append(point)
-                    currentGroup.add(point)
-            if len(currentGroup) >= minimum_points_per_group:
-                foundGroups.append(currentGroup)
-
-        """ Returns groups of points as list
+        mask = np.zeros((self.pathing_grid.height, self.pathing_grid.width), dtype=bool)
+        if points:
+            xs, ys = np.array(list(points), dtype=int).T
+            mask[ys, xs] = True
+        return self._find_mask_groups(mask, minimum_points_per_group, max_distance_between_points)
+
+    def _find_mask_groups(
+        self, mask: np.ndarray, minimum_points_per_group: int = 8, max_distance_between_points: int = 2
+    ) -> List[Set[Point2]]:
+        """ Groups the points of a mask[y, x] that are at most max_distance_between_points apart (manhattan distance).
+        Returns groups of points as list
         [{p1, p2, p3}, {p4, p5, p6, p7, p8}]
         """
-        return foundGroups
+        return [
+            {Point2(cell) for cell in map(tuple, cells.tolist())}
+            for cells in self._find_mask_cell_groups(mask, minimum_points_per_group, max_distance_between_points)
+        ]
+
+    def _find_mask_cell_groups(
+        self, mask: np.ndarray, minimum_points_per_group: int = 8, max_distance_between_points: int = 2
+    ) -> List[np.ndarray]:
+        """ Like _find_mask_groups, but returns the cells of each group as N x 2 integer array """
+        return label_clusters(mask, max_distance_between_points).cell_arrays(minimum_points_per_group)
@@ -1,6 +1,10 @@
 from typing import Any, Dict, List, Optional, Set, Tuple, Union  # mypy type checking
 
+import numpy as np
+
+from .cache import property_immutable_cache
 from .data import Alliance, DisplayType
+from .frame_diff import FrameDiff
 from .ids.effect_id import EffectId
 from .ids.upgrade_id import UpgradeId
 from .ids.unit_typeid import UnitTypeId
@@ -8,7 +12,9 @@ from .pixel_map import PixelMap
 from .position import Point2, Point3
 from .power_source import PsionicMatrix
 from .score import ScoreDetails
+from .unit import Unit
 from .units import Units
+from .unit_columns import UnitColumns
 from .constants import geyser_ids, mineral_ids
 
 
@@ -84,7 +90,7 @@ class EffectData:
 
 
 class GameState:
-    def __init__(self, response_observation, game_data):
+    def __init__(self, response_observation, game_data, previous_state: Optional["GameState"] = None):
         self.actions = response_observation.actions  # successful actions since last loop
         self.action_errors = response_observation.action_errors  # error actions since last loop
         # https://github.com/Blizzard/s2client-proto/blob/51662231c0965eba47d5183ed0a6336d5ae6b640/s2clientprotocol/sc2api.proto#L575
@@ -104,42 +110,20 @@ class GameState:
         )  # https://github.com/Blizzard/s2client-proto/blob/33f0ecf615aa06ca845ffe4739ef3133f37265a9/s2clientprotocol/score.proto#L31
         self.abilities = self.observation.abilities  # abilities of selected units
 
-        # Fix for enemy units detected by my sensor tower, as blips have less unit information than normal visible units
-        visibleUnits, hiddenUnits, minerals, geysers, destructables, enemy, own = ([] for _ in range(7))
-
-        for unit in self.observation.raw_data.units:
-            if unit.is_blip:
-                hiddenUnits.append(unit)
-            else:
-                visibleUnits.append(unit)
-                # all destructable rocks except the one below the main base ramps
-                if unit.alliance == Alliance.Neutral.value and unit.radius > 1.5:
-                    destructables.append(unit)
-                elif unit.alliance == Alliance.Neutral.value:
-                    # mineral field enums
-                    if unit.unit_type in mineral_ids:
-                        minerals.append(unit)
-                    # geyser enums
-                    elif unit.unit_type in geyser_ids:
-                        geysers.append(unit)
-                elif unit.alliance == Alliance.Self.value:
-                    own.append(unit)
-                elif unit.alliance == Alliance.Enemy.value:
-                    enemy.append(unit)
-
-        self.own_units: Units = Units.from_proto(own, game_data)
-        self.enemy_units: Units = Units.from_proto(enemy, game_data)
-        self.mineral_field: Units = Units.from_proto(minerals, game_data)
-        self.vespene_geyser: Units = Units.from_proto(geysers, game_data)
-        self.resources: Units = Units.from_proto(minerals + geysers, game_data)
-        self.destructables: Units = Units.from_proto(destructables, game_data)
-        self.units: Units = Units.from_proto(visibleUnits, game_data)
+        self.cache = {}
+        self._game_data = game_data
+        # Columnar snapshot of all raw units. It also holds the Unit objects of this frame, so the Units
+        # collections below share them and each Unit is only created when a collection containing it is used.
+        self.unit_columns: UnitColumns = UnitColumns(self.observation_raw.units, game_data)
+        # Only the snapshot of the previous frame is kept, not the whole state, to not chain all states together
+        self._previous_unit_columns: Optional[UnitColumns] = previous_state and previous_state.unit_columns
+
         self.upgrades: Set[UpgradeId] = {UpgradeId(upgrade) for upgrade in self.observation_raw.player.upgrade_ids}
         self.dead_units: Set[int] = {
             dead_unit_tag for dead_unit_tag in self.observation_raw.event.dead_units
         }  # set of unit tags that died this step - sometimes has multiple entries
 
-        self.blips: Set[Blip] = {Blip(unit) for unit in hiddenUnits}
+        self.blips: Set[Blip] = {Blip(self.observation_raw.units[row]) for row in self._rows("blips")}
         self.visibility: PixelMap = PixelMap(self.observation_raw.map_state.visibility)
         self.creep: PixelMap = PixelMap(self.observation_raw.map_state.creep)
 
@@ -153,3 +137,73 @@ class GameState:
                 # dodge the ravager biles
         """
 
+    @property_immutable_cache
+    def diff(self) -> FrameDiff:
+        """ Units that appeared, disappeared, moved, were damaged, changed type or finished building
+        since the previous state. Everything has appeared if there was no previous state. """
+        return FrameDiff(self._previous_unit_columns, self.unit_columns)
+
+    @property_immutable_cache
+    def _category_rows(self) -> Dict[str, np.ndarray]:
+        """ Rows of the unit snapshot in each of the unit collections, in observation order """
+        columns = self.unit_columns
+        # Fix for enemy units detected by my sensor tower, as blips have less unit information than normal visible units
+        visible = ~columns.is_blip
+        neutral = visible & (columns.alliance == Alliance.Neutral.value)
+        # all destructable rocks except the one below the main base ramps
+        destructables = neutral & (columns.radius > 1.5)
+        neutral &= ~destructables
+        return {
+            "blips": np.nonzero(columns.is_blip)[0],
+            "units": np.nonzero(visible)[0],
+            "own_units": np.nonzero(visible & (columns.alliance == Alliance.Self.value))[0],
+            "enemy_units": np.nonzero(visible & (columns.alliance == Alliance.Enemy.value))[0],
+            "mineral_field": np.nonzero(neutral & np.isin(columns.unit_type, list(mineral_ids)))[0],
+            "vespene_geyser": np.nonzero(neutral & np.isin(columns.unit_type, list(geyser_ids)))[0],
+            "destructables": np.nonzero(destructables)[0],
+        }
+
+    def unit_by_tag(self, tag: int) -> Optional[Unit]:
+        """ The visible unit with the tag, None if there is none. Looked up in the tag index of the unit snapshot,
+        which is built once per observation and shared with all Units of this state. """
+        columns = self.unit_columns
+        row = columns.row_of_tag.get(tag)
+        if row is None or columns.is_blip[row]:
+            return None
+        return columns.unit(row)
+
+    def _rows(self, category: str) -> List[int]:
+        return self._category_rows[category].tolist()
+
+    def _units_of(self, rows: List[int]) -> Units:
+        return Units.from_columns(self.unit_columns, rows, self._game_data)
+
+    @property_immutable_cache
+    def units(self) -> Units:
+        """ All visible units, including neutral ones """
+        return self._units_of(self._rows("units"))
+
+    @property_immutable_cache
+    def own_units(self) -> Units:
+        return self._units_of(self._rows("own_units"))
+
+    @property_immutable_cache
+    def enemy_units(self) -> Units:
+        return self._units_of(self._rows("enemy_units"))
+
+    @property_immutable_cache
+    def mineral_field(self) -> Units:
+        return self._units_of(self._rows("mineral_field"))
+
+    @property_immutable_cache
+    def vespene_geyser(self) -> Units:
+        return self._units_of(self._rows("vespene_geyser"))
+
+    @property_immutable_cache
+    def resources(self) -> Units:
+        """ Mineral fields followed by vespene geysers """
+        return self._units_of(self._rows("mineral_field") + self._rows("vespene_geyser"))
+
+    @property_immutable_cache
+    def destructables(self) -> Units:
+        return self._units_of(self._rows("destructables"))
@@ -6,7 +6,7 @@ class ControlGroup(set):
         return hash(tuple(sorted(list(self))))
 
     def select_units(self, units):
-        return units.filter(lambda unit: unit.tag in self)
+        return units.tags_in(self)
 
     def missing_unit_tags(self, units):
         return {t for t in self if units.find_by_tag(t) is None}
@@ -11,6 +11,7 @@ from .client import Client
 from .player import Human, Bot
 from .data import Race, Difficulty, Result, ActionResult, CreateGameError
 from .game_state import GameState
+from .observation_recorder import ObservationRecorder, RecordedGame, ReplayConnection
 from .protocol import ConnectionAlreadyClosed, ProtocolError
 
 class SlidingTimeWindow:
@@ -100,39 +101,48 @@ async def _play_game_ai(client, player_id, ai, realtime, step_time_limit, game_t
         ai.on_end(Result.Defeat)
         return Result.Defeat
 
+    metrics = ai.metrics
+    client._metrics = metrics
     iteration = 0
+    gs = None
     while True:
-        state = await client.observation()
+        with metrics.phase("observation"):
+            state = await client.observation()
         logger.debug(f"Score: {state.observation.observation.score.score}")
 
         if client._game_result:
             ai.on_end(client._game_result[player_id])
             return client._game_result[player_id]
 
-        gs = GameState(state.observation, game_data)
+        with metrics.phase("game_state"):
+            gs = GameState(state.observation, game_data, gs)
 
         if game_time_limit and (gs.game_loop * 0.725 * (1 / 16)) > game_time_limit:
             ai.on_end(Result.Tie)
             return Result.Tie
 
-        ai._prepare_step(gs)
+        with metrics.phase("prepare_step"):
+            ai._prepare_step(gs)
 
-        if iteration == 0:
-            ai._prepare_first_step()
+            if iteration == 0:
+                ai._prepare_first_step()
 
         logger.debug(f"Running AI step, it={iteration} {gs.game_loop * 0.725 * (1 / 16):.2f}s")
 
         try:
-            await ai.issue_events()
+            with metrics.phase("issue_events"):
+                await ai.issue_events()
             if realtime:
-                await ai.on_step(iteration)
+                with metrics.phase("on_step"):
+                    await ai.on_step(iteration)
             else:
                 if time_penalty_cooldown > 0:
                     time_penalty_cooldown -= 1
                     logger.warning(f"Running AI step: penalty cooldown: {time_penalty_cooldown}")
                     iteration -= 1 # Do not increment the iteration on this round
                 elif time_limit is None:
-                    await ai.on_step(iteration)
+                    with metrics.phase("on_step"):
+                        await ai.on_step(iteration)
                 else:
                     out_of_budget = False
                     budget = time_limit - time_window.available
@@ -148,7 +158,8 @@ async def _play_game_ai(client, player_id, ai, realtime, step_time_limit, game_t
                         step_start = time.monotonic()
                         try:
                             async with async_timeout.timeout(budget):
-                                await ai.on_step(iteration)
+                                with metrics.phase("on_step"):
+                                    await ai.on_step(iteration)
                         except asyncio.TimeoutError:
                             step_time = time.monotonic() - step_start
                             logger.warning(
@@ -167,6 +178,9 @@ async def _play_game_ai(client, player_id, ai, realtime, step_time_limit, game_t
                         else:
                             time_penalty_cooldown = int(time_penalty)
                             time_window.clear()
+
+            with metrics.phase("actions"):
+                await ai._flush_actions()
         except Exception as e:
             if isinstance(e, ProtocolError) and e.is_game_over_error:
                 if realtime:
@@ -190,11 +204,14 @@ async def _play_game_ai(client, player_id, ai, realtime, step_time_limit, game_t
                 ai.on_end(client._game_result[player_id])
                 return client._game_result[player_id]
 
-            await client.step()
+            with metrics.phase("step"):
+                await client.step()
 
+        metrics.end_step(gs.game_loop)
         iteration += 1
 
-async def _play_game(player, client, realtime, portconfig, step_time_limit=None, game_time_limit=None, rgb_render_config=None):
+async def _play_game(player, client, realtime, portconfig, step_time_limit=None, game_time_limit=None, rgb_render_config=None,
+                     save_step_metrics_as=None):
     assert isinstance(realtime, bool), repr(realtime)
 
     player_id = await client.join_game(player.name, player.race, portconfig=portconfig, rgb_render_config=rgb_render_config)
@@ -204,6 +221,9 @@ async def _play_game(player, client, realtime, portconfig, step_time_limit=None,
         result = await _play_game_human(client, player_id, realtime, game_time_limit)
     else:
         result = await _play_game_ai(client, player_id, player.ai, realtime, step_time_limit, game_time_limit)
+        logger.debug(f"Step metrics:\n{player.ai.metrics.summary()}")
+        if save_step_metrics_as is not None:
+            player.ai.metrics.save(save_step_metrics_as)
 
     logging.info(f"Result for player id: {player_id}: {result}")
     return result
@@ -221,7 +241,8 @@ async def _setup_host_game(server, map_settings, players, realtime, random_seed=
 
 
 async def _host_game(map_settings, players, realtime, portconfig=None, save_replay_as=None, step_time_limit=None,
-                     game_time_limit=None, rgb_render_config=None, random_seed=None):
+                     game_time_limit=None, rgb_render_config=None, random_seed=None, save_observations_as=None,
+                     save_step_metrics_as=None):
     assert len(players) > 0, "Can't create a game without players"
 
     assert any(isinstance(p, (Human, Bot)) for p in players)
@@ -230,9 +251,14 @@ async def _host_game(map_settings, players, realtime, portconfig=None, save_repl
         await server.ping()
 
         client = await _setup_host_game(server, map_settings, players, realtime, random_seed)
+        if save_observations_as is not None:
+            client._recorder = ObservationRecorder(save_observations_as)
 
         try:
-            result = await _play_game(players[0], client, realtime, portconfig, step_time_limit, game_time_limit, rgb_render_config)
+            result = await _play_game(
+                players[0], client, realtime, portconfig, step_time_limit, game_time_limit, rgb_render_config,
+                save_step_metrics_as
+            )
             if save_replay_as is not None:
                 await client.save_replay(save_replay_as)
             await client.leave()
@@ -240,6 +266,9 @@ async def _host_game(map_settings, players, realtime, portconfig=None, save_repl
         except ConnectionAlreadyClosed:
             logging.error(f"Connection was closed before the game ended")
             return None
+        finally:
+            if client._recorder is not None:
+                client._recorder.close()
 
         return result
 
@@ -295,7 +324,8 @@ async def _join_game(players, realtime, portconfig, save_replay_as=None, step_ti
 
 def run_game(map_settings, players, **kwargs):
     if sum(isinstance(p, (Human, Bot)) for p in players) > 1:
-        host_only_args = ["save_replay_as", "rgb_render_config", "random_seed"]
+        host_only_args = ["save_replay_as", "rgb_render_config", "random_seed", "save_observations_as",
+                          "save_step_metrics_as"]
         join_kwargs = {k: v for k, v in kwargs.items() if k not in host_only_args}
 
         portconfig = Portconfig()
@@ -308,3 +338,16 @@ def run_game(map_settings, players, **kwargs):
             _host_game(map_settings, players, **kwargs)
         )
     return result
+
+def run_recording(path, ai, step_time_limit=None, game_time_limit=None):
+    """ Plays the bot against the observations saved with run_game(..., save_observations_as=path),
+    without starting SC2. The bot's actions don't change what happens, so this is for benchmarking
+    and profiling the bot and the library deterministically, e.g. on CI machines. """
+    game = RecordedGame.from_file(path)
+    client = Client(ReplayConnection(game))
+    player_id = game.initial["join_game"].join_game.player_id
+    player_info = {p.player_id: p for p in game.initial["game_info"].game_info.player_info}
+    race = Race(player_info[player_id].race_requested)
+    return asyncio.get_event_loop().run_until_complete(
+        _play_game(Bot(race, ai), client, False, None, step_time_limit, game_time_limit)
+    )
@@ -0,0 +1,55 @@
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MapCache:
+    """ Results of the map analysis saved on disk, so that the next game on the same map doesn't redo it.
+
+    Everything of a map is in its own directory, named after the map and a hash of the start_raw grids,
+    so that a changed version of a map with the same name doesn't use the old results. Each entry is an .npz file
+    of numpy arrays. Enabled with BotAI.map_cache_directory, which is used for the ramps, the expansion locations
+    and BotAI.base_distances. """
+
+    def __init__(self, directory: Union[str, Path], game_info):
+        self.key: str = self.map_key(game_info)
+        self.directory: Path = Path(directory) / self.key
+
+    @staticmethod
+    def map_key(game_info) -> str:
+        start_raw = game_info._proto.start_raw
+        digest = hashlib.sha1()
+        digest.update(np.array([start_raw.map_size.x, start_raw.map_size.y], dtype=np.int64).tobytes())
+        for grid in (start_raw.pathing_grid, start_raw.placement_grid, start_raw.terrain_height):
+            digest.update(grid.data)
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", game_info.map_name).strip("_") or "map"
+        return f"{name}-{digest.hexdigest()[:16]}"
+
+    def path(self, name: str) -> Path:
+        return self.directory / f"{name}.npz"
+
+    def load(self, name: str) -> Optional[Dict[str, np.ndarray]]:
+        """ The arrays saved as name, None if there are none or they can't be read """
+        path = self.path(name)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as data:
+                return {key: data[key] for key in data.files}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load {path}: {e}")
+            return None
+
+    def save(self, name: str, **arrays: np.ndarray):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Written to a temporary file first, so that a game running at the same time never reads half a file
+        temporary = self.directory / f"{name}.tmp.npz"
+        with open(temporary, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        temporary.replace(self.path(name))
@@ -0,0 +1,154 @@
+import gzip
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+from .data import ActionResult, Result, Status
+
+# Every record is a serialized sc_pb.Response, prefixed with its length as a little endian uint32
+LENGTH = struct.Struct("<I")
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class ObservationRecorder:
+    """ Writes the responses a Client receives during a game to a file, so that the game can be played
+    back without SC2 by ReplayConnection. The join_game, data and game_info responses are recorded
+    once, followed by every observation. Files ending with .gz are compressed, unless compress is given.
+    Usage:
+    run_game(maps.get("Abyssal Reef LE"), players, save_observations_as="game.sc2obs.gz")
+    """
+
+    def __init__(self, path: Union[str, Path], compress: Optional[bool] = None):
+        self.path = Path(path)
+        if compress is None:
+            compress = self.path.suffix == ".gz"
+        self._file: BinaryIO = gzip.open(self.path, "wb") if compress else open(self.path, "wb")
+        self.records = 0
+
+    def record(self, response: sc_pb.Response):
+        data = response.SerializeToString()
+        self._file.write(LENGTH.pack(len(data)))
+        self._file.write(data)
+        self.records += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"Saved {self.records} responses to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_responses(path: Union[str, Path]) -> Iterator[sc_pb.Response]:
+    """ Reads the responses of a file written by ObservationRecorder, compressed or not. """
+    with open(path, "rb") as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    with (gzip.open(path, "rb") if compressed else open(path, "rb")) as f:
+        while True:
+            header = f.read(LENGTH.size)
+            if not header:
+                return
+            assert len(header) == LENGTH.size, "Truncated record length"
+            (length,) = LENGTH.unpack(header)
+            data = f.read(length)
+            assert len(data) == length, "Truncated record"
+            response = sc_pb.Response()
+            response.ParseFromString(data)
+            yield response
+
+
+class RecordedGame:
+    """ Answers requests with the recorded responses, like SC2 would.
+
+    join_game, data and game_info return the recorded responses, every observation request returns
+    the next recorded observation. Stepping and actions always succeed, queries return default answers:
+    no path, placement succeeded and no available abilities. Any other request gets an empty response.
+    When the observations run out the game ends in a tie. """
+
+    def __init__(self, responses: List[sc_pb.Response]):
+        self.initial = {}
+        self.observations: List[sc_pb.Response] = []
+        for response in responses:
+            kind = response.WhichOneof("response")
+            if kind == "observation":
+                self.observations.append(response)
+            else:
+                self.initial[kind] = response
+        self._next_observation = 0
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "RecordedGame":
+        return cls(list(read_responses(path)))
+
+    @property
+    def player_ids(self) -> List[int]:
+        game_info = self.initial.get("game_info")
+        return [] if game_info is None else [p.player_id for p in game_info.game_info.player_info]
+
+    def respond(self, request: sc_pb.Request) -> sc_pb.Response:
+        kind = request.WhichOneof("request")
+        if kind in self.initial:
+            return self.initial[kind]
+        if kind == "observation":
+            return self._observation()
+
+        response = sc_pb.Response(status=Status.in_game.value)
+        getattr(response, kind).SetInParent()
+        if kind == "action":
+            response.action.result.extend([ActionResult.Success.value] * len(request.action.actions))
+        elif kind == "query":
+            query = response.query
+            for _ in request.query.pathing:
+                query.pathing.add()
+            for _ in request.query.placements:
+                query.placements.add(result=ActionResult.Success.value)
+            for requested in request.query.abilities:
+                query.abilities.add(unit_tag=requested.unit_tag)
+        elif kind in ("leave_game", "quit"):
+            response.status = Status.launched.value if kind == "leave_game" else Status.quit.value
+        return response
+
+    def _observation(self) -> sc_pb.Response:
+        if self._next_observation < len(self.observations):
+            self._next_observation += 1
+            return self.observations[self._next_observation - 1]
+        # Out of recorded observations, end the game
+        response = sc_pb.Response(status=Status.ended.value)
+        if self.observations:
+            response.observation.CopyFrom(self.observations[-1].observation)
+        else:
+            response.observation.SetInParent()
+        if not response.observation.player_result:
+            for player_id in self.player_ids:
+                response.observation.player_result.add(player_id=player_id, result=Result.Tie.value)
+        return response
+
+
+class ReplayConnection:
+    """ Stand-in for the websocket of a Client, answers every request from a RecordedGame. """
+
+    def __init__(self, game: RecordedGame):
+        self.game = game
+        self._responses: List[bytes] = []
+
+    async def send_bytes(self, data: bytes):
+        request = sc_pb.Request()
+        request.ParseFromString(data)
+        self._responses.append(self.game.respond(request).SerializeToString())
+
+    async def receive_bytes(self) -> bytes:
+        return self._responses.pop(0)
+
+    async def close(self):
+        pass
+
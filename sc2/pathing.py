@@ -0,0 +1,231 @@
+import heapq
+import math
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from .position import Point2, Point3
+from .spatial_index import points_to_array
+
+SQRT2 = math.sqrt(2)
+# How far an unpathable start or target, e.g. the center of a townhall, is moved to the closest pathable cell
+SNAP_RADIUS = 8
+
+
+class Pathing:
+    """ Ground distances and paths computed locally from a pathing grid, without asking SC2.
+
+    Units move between cell centers to the 8 neighbouring cells, diagonal moves cost sqrt(2) and can't cut the
+    corner of an unpathable cell. The distances are slightly longer than the ones of query_pathing, which moves
+    in any direction, by at most about 8%. A point is in the cell (int(x), int(y)), points in unpathable cells
+    are moved to the closest pathable cell, and unreachable points have no distance.
+
+    distance_field(target) runs Dijkstra from the target once and caches the result, after which the distance
+    from any point to that target is a lookup. distance(start, end) uses a cached field of either point when there
+    is one and otherwise runs A*. Usage:
+    pathing = self.game_info.pathing
+    distances = pathing.distances(self.workers, self.start_location)
+    """
+
+    def __init__(self, pathable: np.ndarray, max_cached_fields: int = 64):
+        """ pathable[y, x] is True for the cells ground units can move on """
+        self.pathable: np.ndarray = np.asarray(pathable, dtype=bool)
+        self.height, self.width = self.pathable.shape
+        self.max_cached_fields: int = max_cached_fields
+        self._fields: "OrderedDict[Tuple[int, int], np.ndarray]" = OrderedDict()
+        # The unpathable cells with the pathable cells they are moved to, see distance_field(fill_unpathable=True)
+        self._unpathable_snap: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+        # The searches run on a copy with a border of unpathable cells, so that neighbours never leave the grid
+        self._padded_width = self.width + 2
+        padded = np.zeros((self.height + 2, self._padded_width), dtype=bool)
+        padded[1:-1, 1:-1] = self.pathable
+        self._padded: List[bool] = padded.ravel().tolist()
+        w = self._padded_width
+        self._straight = [(1, 1.0), (-1, 1.0), (w, 1.0), (-w, 1.0)]
+        # Diagonal moves with the two straight moves that must be possible too
+        self._diagonal = [(dx + dy, dx, dy, SQRT2) for dx in (1, -1) for dy in (w, -w)]
+
+    @classmethod
+    def from_pixel_map(cls, pathing_grid, **kwargs) -> "Pathing":
+        """ From GameInfo.pathing_grid, where pathable cells are 0 """
+        return cls(pathing_grid.grid == 0, **kwargs)
+
+    @property
+    def cached_fields(self) -> int:
+        return len(self._fields)
+
+    def _cells(self, points) -> np.ndarray:
+        if isinstance(points, (Point2, Point3)):
+            points = [points]
+        cells = np.floor(points_to_array(points)[:, :2]).astype(int)
+        return np.clip(cells, 0, (self.width - 1, self.height - 1))
+
+    def _snap(self, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Moves unpathable cells to the closest pathable cell, returns the cells and how far they moved.
+        Cells without a pathable cell nearby stay where they are and are unreachable. """
+        cells = cells.copy()
+        moved = np.zeros(len(cells))
+        blocked = np.nonzero(~self.pathable[cells[:, 1], cells[:, 0]])[0]
+        if not len(blocked):
+            return cells, moved
+        offsets = [
+            (dx, dy) for dx in range(-SNAP_RADIUS, SNAP_RADIUS + 1) for dy in range(-SNAP_RADIUS, SNAP_RADIUS + 1)
+        ]
+        offsets.sort(key=lambda offset: offset[0] ** 2 + offset[1] ** 2)
+        for dx, dy in offsets[1:]:
+            if not len(blocked):
+                break
+            xs, ys = cells[blocked, 0] + dx, cells[blocked, 1] + dy
+            inside = (0 <= xs) & (xs < self.width) & (0 <= ys) & (ys < self.height)
+            found = inside.copy()
+            found[inside] = self.pathable[ys[inside], xs[inside]]
+            rows = blocked[found]
+            cells[rows] += (dx, dy)
+            moved[rows] = math.hypot(dx, dy)
+            blocked = blocked[~found]
+        return cells, moved
+
+    def _cell(self, point: Union[Point2, Point3, Tuple[float, float]]) -> Tuple[Tuple[int, int], float]:
+        cells, moved = self._snap(self._cells([point]))
+        return tuple(cells[0].tolist()), float(moved[0])
+
+    def _index(self, cell: Tuple[int, int]) -> int:
+        return (cell[1] + 1) * self._padded_width + cell[0] + 1
+
+    def distance_field(
+        self, target: Union[Point2, Point3, Tuple[float, float]], fill_unpathable: bool = False, cache: bool = True
+    ) -> np.ndarray:
+        """ field[y, x] is the ground distance from cell (x, y) to the target, inf if it is unreachable.
+        With fill_unpathable, unpathable cells get the distance of the closest pathable cell plus the distance to
+        it, like the starts of distances. The field is cached per target cell, the least recently used ones are
+        dropped. With cache=False a new field is not stored, for fields that are kept elsewhere. """
+        cell, moved = self._cell(target)
+        field = self._fields.get(cell)
+        if field is None:
+            field = self._dijkstra(cell)
+            if cache:
+                self._fields[cell] = field
+                while len(self._fields) > self.max_cached_fields:
+                    self._fields.popitem(last=False)
+        else:
+            self._fields.move_to_end(cell)
+        if moved or fill_unpathable:
+            # Not in place, the cached field stays as it is
+            field = field + moved
+        if fill_unpathable:
+            if self._unpathable_snap is None:
+                ys, xs = np.nonzero(~self.pathable)
+                snapped, snap_moved = self._snap(np.stack([xs, ys], axis=1))
+                self._unpathable_snap = ys, xs, snapped, snap_moved
+            ys, xs, snapped, snap_moved = self._unpathable_snap
+            field[ys, xs] = field[snapped[:, 1], snapped[:, 0]] + snap_moved
+        return field
+
+    def _dijkstra(self, cell: Tuple[int, int]) -> np.ndarray:
+        padded = self._padded
+        distances = [math.inf] * len(padded)
+        start = self._index(cell)
+        if padded[start]:
+            distances[start] = 0.0
+            heap = [(0.0, start)]
+            straight, diagonal = self._straight, self._diagonal
+            while heap:
+                distance, index = heapq.heappop(heap)
+                if distance > distances[index]:
+                    continue
+                for offset, cost in straight:
+                    neighbour = index + offset
+                    if padded[neighbour] and distance + cost < distances[neighbour]:
+                        distances[neighbour] = distance + cost
+                        heapq.heappush(heap, (distance + cost, neighbour))
+                for offset, dx, dy, cost in diagonal:
+                    neighbour = index + offset
+                    if (
+                        padded[neighbour]
+                        and padded[index + dx]
+                        and padded[index + dy]
+                        and distance + cost < distances[neighbour]
+                    ):
+                        distances[neighbour] = distance + cost
+                        heapq.heappush(heap, (distance + cost, neighbour))
+        field = np.array(distances, dtype=np.float32).reshape(self.height + 2, self._padded_width)
+        return field[1:-1, 1:-1].copy()
+
+    def distances(self, starts, target: Union[Point2, Point3, Tuple[float, float]]) -> np.ndarray:
+        """ Ground distance from each start to the target, inf for the unreachable ones.
+        Accepts Units, a list of Unit/Point2/Point3 or an N x 2 array as starts. """
+        field = self.distance_field(target)
+        cells, moved = self._snap(self._cells(starts))
+        return field[cells[:, 1], cells[:, 0]] + moved
+
+    def distance(
+        self, start: Union[Point2, Point3, Tuple[float, float]], end: Union[Point2, Point3, Tuple[float, float]]
+    ) -> Optional[float]:
+        """ Ground distance between two points like query_pathing, None if end can't be reached """
+        start_cell, start_moved = self._cell(start)
+        end_cell, end_moved = self._cell(end)
+        for target, other in ((end_cell, start_cell), (start_cell, end_cell)):
+            field = self._fields.get(target)
+            if field is not None:
+                distance = float(field[other[1], other[0]])
+                break
+        else:
+            path = self._a_star(start_cell, end_cell)
+            distance = path[0] if path else math.inf
+        if distance == math.inf:
+            return None
+        return distance + start_moved + end_moved
+
+    def path(
+        self, start: Union[Point2, Point3, Tuple[float, float]], end: Union[Point2, Point3, Tuple[float, float]]
+    ) -> Optional[List[Point2]]:
+        """ Centers of the cells on a shortest path from start to end, both included, None if there is no path """
+        start_cell, _ = self._cell(start)
+        end_cell, _ = self._cell(end)
+        result = self._a_star(start_cell, end_cell)
+        if result is None:
+            return None
+        w = self._padded_width
+        return [Point2((index % w - 0.5, index // w - 0.5)) for index in result[1]]
+
+    def _a_star(self, start_cell: Tuple[int, int], end_cell: Tuple[int, int]) -> Optional[Tuple[float, List[int]]]:
+        """ Returns the length and the padded indices of a shortest path """
+        padded = self._padded
+        start, end = self._index(start_cell), self._index(end_cell)
+        if not (padded[start] and padded[end]):
+            return None
+        w = self._padded_width
+        end_x, end_y = end % w, end // w
+
+        def heuristic(index):
+            # Octile distance, exact on an empty grid
+            dx, dy = abs(index % w - end_x), abs(index // w - end_y)
+            return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+        distances = {start: 0.0}
+        previous = {start: None}
+        heap = [(heuristic(start), 0.0, start)]
+        moves = [(offset, cost, None, None) for offset, cost in self._straight] + [
+            (offset, cost, dx, dy) for offset, dx, dy, cost in self._diagonal
+        ]
+        while heap:
+            _, distance, index = heapq.heappop(heap)
+            if index == end:
+                path = []
+                while index is not None:
+                    path.append(index)
+                    index = previous[index]
+                return distance, path[::-1]
+            if distance > distances[index]:
+                continue
+            for offset, cost, dx, dy in moves:
+                neighbour = index + offset
+                if not padded[neighbour] or (dx is not None and not (padded[index + dx] and padded[index + dy])):
+                    continue
+                new_distance = distance + cost
+                if new_distance < distances.get(neighbour, math.inf):
+                    distances[neighbour] = new_distance
+                    previous[neighbour] = index
+                    heapq.heappush(heap, (new_distance + heuristic(neighbour), new_distance, neighbour))
+        return None
@@ -1,14 +1,31 @@
-from typing import Callable, Set, FrozenSet, List
+from typing import Callable, Dict, Set, FrozenSet, List, Tuple
 
-from .position import Point2
+import numpy as np
+
+from .position import Cell, Point2
+from .spatial_index import points_to_array
 
 
 class PixelMap:
+    """ A grid of the map, e.g. pathing, placement, terrain height, creep or visibility.
+
+    Pixel (x, y) is stored in row (-y % height) of the raw proto data, which is what
+    self[x, y] has always read. The raw rows are available without copying as
+    self.data_numpy (shape height x width), and values_at / is_set_at look up many points at once. """
+
     def __init__(self, proto):
         self._proto = proto
-        assert self.bits_per_pixel % 8 == 0, "Unsupported pixel density"
+        assert self.bits_per_pixel == 1 or self.bits_per_pixel % 8 == 0, "Unsupported pixel density"
         assert self.width * self.height * self.bits_per_pixel / 8 == len(self._proto.data)
-        self.data = bytearray(self._proto.data)
+        if self.bits_per_pixel == 1:
+            # Bit-packed grids are unpacked to one byte per pixel so they can be indexed like the others
+            unpacked = np.unpackbits(np.frombuffer(self._proto.data, dtype=np.uint8))
+            self.data = bytearray(unpacked.tobytes())
+            dtype = np.uint8
+        else:
+            self.data = bytearray(self._proto.data)
+            dtype = np.dtype(f"<u{self.bytes_per_pixel}")
+        self.data_numpy: np.ndarray = np.frombuffer(self.data, dtype=dtype).reshape(self.height, self.width)
 
     @property
     def width(self):
@@ -26,17 +43,17 @@ class PixelMap:
     def bytes_per_pixel(self):
         return self._proto.bits_per_pixel // 8
 
+    def _row(self, y):
+        """ Row of data_numpy that contains pixel row y, works for ints and integer arrays. """
+        return -y % self.height
+
     def __getitem__(self, pos):
         x, y = pos
 
         assert 0 <= x < self.width, f"x is {x}, self.width is {self.width}"
         assert 0 <= y < self.height, f"y is {y}, self.height is {self.height}"
 
-        index = -self.width * y + x
-        # print(f"INDEX IS {index} FOR {pos}")
-        start = index * self.bytes_per_pixel
-        data = self.data[start : start + self.bytes_per_pixel]
-        return int.from_bytes(data, byteorder="little", signed=False)
+        return int(self.data_numpy[self._row(y), x])
 
     def __setitem__(self, pos, val):
         """ Example usage: self._game_info.pathing_grid[Point2((20, 20))] = [255] """
@@ -45,9 +62,31 @@ class PixelMap:
         assert 0 <= x < self.width, f"x is {x}, self.width is {self.width}"
         assert 0 <= y < self.height, f"y is {y}, self.height is {self.height}"
 
-        index = -self.width * y + x
-        start = index * self.bytes_per_pixel
-        self.data[start : start + self.bytes_per_pixel] = val
+        if not isinstance(val, int):
+            val = int.from_bytes(bytes(val), byteorder="little", signed=False)
+        self.data_numpy[self._row(y), x] = val
+
+    @property
+    def grid(self) -> np.ndarray:
+        """ Copy of the map indexed as grid[y, x], so that grid[y, x] == self[x, y]. """
+        return self.data_numpy[self._row(np.arange(self.height))]
+
+    def _indices(self, points) -> Tuple[np.ndarray, np.ndarray]:
+        positions = np.round(points_to_array(points)).astype(int)
+        xs, ys = positions[:, 0], positions[:, 1]
+        assert ((0 <= xs) & (xs < self.width)).all(), f"x out of bounds, self.width is {self.width}"
+        assert ((0 <= ys) & (ys < self.height)).all(), f"y out of bounds, self.height is {self.height}"
+        return xs, ys
+
+    def values_at(self, points) -> np.ndarray:
+        """ Returns the pixel values of many points at once. Points are rounded to the nearest pixel.
+        Accepts Units, a list of Unit/Point2/Point3 or an N x 2 array. """
+        xs, ys = self._indices(points)
+        return self.data_numpy[self._row(ys), xs]
+
+    def is_set_at(self, points) -> np.ndarray:
+        """ Vectorized version of is_set, returns a boolean array. """
+        return self.values_at(points) != 0
 
     def is_set(self, p):
         return self[p] != 0
@@ -58,51 +97,194 @@ class PixelMap:
     def invert(self):
         raise NotImplementedError
 
-    def flood_fill(self, start_point: Point2, pred: Callable[[int], bool]) -> Set[Point2]:
-        nodes: Set[Point2] = set()
-        queue: List[Point2] = [start_point]
+    def label_components(self, pred: Callable[[int], bool], connectivity: int = 8) -> "ComponentLabels":
+        """ Labels all connected groups of pixels for which pred(value) is True.
+        pred is evaluated once per distinct value instead of once per pixel. """
+        grid = self.grid
+        accepted = [value for value in np.unique(grid).tolist() if pred(value)]
+        return label_components(np.isin(grid, accepted), connectivity)
 
+    def flood_fill(self, start_point: Point2, pred: Callable[[int], bool]) -> Set[Point2]:
+        """ The pixels connected to start_point, with 8 neighbours, for which pred(value) is True.
+        Only the component and the pixels around it are visited, and pred is evaluated once per distinct value. """
+        x, y = start_point
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return set()
+        width, height, data = self.width, self.height, self.data_numpy
+        accepted: Dict[int, bool] = {}
+        start = int(y) * width + int(x)
+        seen = {start}
+        queue = [start]
+        nodes = []
         while queue:
-            x, y = queue.pop()
-
-            if not (0 <= x < self.width and 0 <= y < self.height):
-                continue
-
-            if Point2((x, y)) in nodes:
+            index = queue.pop()
+            py, px = divmod(index, width)
+            value = data.item(-py % height, px)
+            is_set = accepted.get(value)
+            if is_set is None:
+                is_set = accepted[value] = bool(pred(value))
+            if not is_set:
                 continue
-
-            if pred(self[x, y]):
-                nodes.add(Point2((x, y)))
-                for a in [-1, 0, 1]:
-                    for b in [-1, 0, 1]:
-                        if not (a == 0 and b == 0):
-                            queue.append(Point2((x + a, y + b)))
-
-        return nodes
+            nodes.append((px, py))
+            for ny in range(max(py - 1, 0), min(py + 2, height)):
+                for nx in range(max(px - 1, 0), min(px + 2, width)):
+                    neighbour = ny * width + nx
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        queue.append(neighbour)
+        return {Point2(node) for node in nodes}
 
     def flood_fill_all(self, pred: Callable[[int], bool]) -> Set[FrozenSet[Point2]]:
-        groups: Set[FrozenSet[Point2]] = set()
-
-        for x in range(self.width):
-            for y in range(self.height):
-                if any((x, y) in g for g in groups):
-                    continue
-
-                if pred(self[x, y]):
-                    groups.add(frozenset(self.flood_fill(Point2((x, y)), pred)))
-
-        return groups
+        return {frozenset(group) for group in self.label_components(pred).point_groups()}
 
     def print(self, wide=False):
+        grid = self.grid
         for y in range(self.height):
             for x in range(self.width):
-                print("#" if self.is_set((x, y)) else " ", end=(" " if wide else ""))
+                print("#" if grid[y, x] != 0 else " ", end=(" " if wide else ""))
             print("")
 
     def save_image(self, filename):
-        data = [(0, 0, self[x, y]) for y in range(self.height) for x in range(self.width)]
+        data = [(0, 0, int(value)) for value in self.grid.flat]
         from PIL import Image
 
         im = Image.new("RGB", (self.width, self.height))
         im.putdata(data)
         im.save(filename)
+
+
+class ComponentLabels:
+    """ Result of label_components.
+    labels[y, x] is the label of the component that contains (x, y), 0 for pixels outside of the mask.
+    Components are numbered from 1 in the order their first pixel appears when scanning row by row. """
+
+    def __init__(self, labels: np.ndarray, sizes: np.ndarray, bounding_boxes: np.ndarray):
+        self.labels: np.ndarray = labels
+        # sizes[label - 1] is the amount of pixels in the component
+        self.sizes: np.ndarray = sizes
+        # bounding_boxes[label - 1] is (x_min, y_min, x_max, y_max), all inclusive
+        self.bounding_boxes: np.ndarray = bounding_boxes
+
+    @property
+    def amount(self) -> int:
+        return len(self.sizes)
+
+    def size(self, label: int) -> int:
+        return int(self.sizes[label - 1])
+
+    def bounding_box(self, label: int) -> Tuple[int, int, int, int]:
+        return tuple(self.bounding_boxes[label - 1].tolist())
+
+    def mask(self, label: int) -> np.ndarray:
+        return self.labels == label
+
+    def cell_array(self, label: int) -> np.ndarray:
+        """ N x 2 integer array of the (x, y) cells of a component, in row by row order """
+        x_min, y_min, x_max, y_max = self.bounding_box(label)
+        ys, xs = np.nonzero(self.labels[y_min : y_max + 1, x_min : x_max + 1] == label)
+        return np.column_stack((xs + x_min, ys + y_min))
+
+    def cells(self, label: int) -> Set[Cell]:
+        return {Cell(cell) for cell in map(tuple, self.cell_array(label).tolist())}
+
+    def points(self, label: int) -> Set[Point2]:
+        return {Point2(cell) for cell in map(tuple, self.cell_array(label).tolist())}
+
+    def cell_arrays(self, minimum_size: int = 1) -> List[np.ndarray]:
+        """ Returns the cells of every component with at least minimum_size pixels as N x 2 integer arrays,
+        ordered by label. """
+        flat = self.labels.ravel()
+        indices = np.nonzero(flat)[0]
+        indices = indices[np.argsort(flat[indices], kind="stable")]
+        ys, xs = np.divmod(indices, self.labels.shape[1])
+        cells = np.column_stack((xs, ys))
+        bounds = np.cumsum(self.sizes)
+        return [
+            cells[end - size : end] for size, end in zip(self.sizes.tolist(), bounds.tolist()) if size >= minimum_size
+        ]
+
+    def point_groups(self, minimum_size: int = 1) -> List[Set[Point2]]:
+        """ Returns the points of every component with at least minimum_size pixels, ordered by label. """
+        return [{Point2(cell) for cell in map(tuple, group.tolist())} for group in self.cell_arrays(minimum_size)]
+
+
+def label_components(mask: np.ndarray, connectivity: int = 8) -> ComponentLabels:
+    """ Connected component labelling of a boolean mask indexed as mask[y, x].
+    Pixels are connected to their 4 or 8 neighbours, depending on connectivity. """
+    assert connectivity in (4, 8), "Connectivity must be 4 or 8"
+    return _label_runs(mask, {1: 1 if connectivity == 8 else 0})
+
+
+def label_clusters(mask: np.ndarray, max_distance: int) -> ComponentLabels:
+    """ Like label_components, but two pixels are connected when their manhattan distance is at most max_distance. """
+    assert max_distance >= 1
+    return _label_runs(mask, {dy: max_distance - dy for dy in range(max_distance + 1)})
+
+
+def _label_runs(mask: np.ndarray, reaches: Dict[int, int]) -> ComponentLabels:
+    """ The mask is split into horizontal runs of set pixels, runs that touch are joined with a union-find,
+    and the run labels are painted back to the pixels. Everything except the union-find iterations is done
+    with numpy, and those only iterate over runs, not pixels.
+    reaches maps a row offset dy >= 0 to how many columns a pixel reaches on the row dy rows below it. """
+    mask = np.asarray(mask, dtype=bool)
+    height, width = mask.shape
+    labels = np.zeros((height, width), dtype=np.int32)
+
+    # Find runs: run i is on row rows[i] and covers columns starts[i] <= x < ends[i]
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    run_count = len(rows)
+    if run_count == 0:
+        return ComponentLabels(labels, np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.int64))
+
+    # Find pairs of touching runs. Runs are sorted by (row, column), so the runs on a row below run a
+    # that touch it form a continuous index range, found with a binary search.
+    stride = width + 2 * max(reaches.values()) + 2
+    start_keys = rows * stride + starts
+    end_keys = rows * stride + ends
+    pairs_upper, pairs_lower = [], []
+    for dy, reach in reaches.items():
+        below = (rows + dy) * stride
+        first = np.searchsorted(end_keys, below + starts - reach, side="right")
+        last = np.searchsorted(start_keys, below + ends + reach, side="left")
+        counts = np.maximum(last - first, 0)
+        pairs_upper.append(np.repeat(np.arange(run_count), counts))
+        pairs_lower.append(np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    upper = np.concatenate(pairs_upper)
+    lower = np.concatenate(pairs_lower)
+
+    # Union-find over the runs: hook roots to the smaller root, then compress paths until stable
+    parent = np.arange(run_count)
+    while len(upper):
+        root_upper, root_lower = parent[upper], parent[lower]
+        if (root_upper == root_lower).all():
+            break
+        smaller = np.minimum(root_upper, root_lower)
+        np.minimum.at(parent, root_upper, smaller)
+        np.minimum.at(parent, root_lower, smaller)
+        while True:
+            grandparent = parent[parent]
+            if (grandparent == parent).all():
+                break
+            parent = grandparent
+
+    # Roots are the first run of each component, so labels follow the row by row scan order
+    roots, run_labels = np.unique(parent, return_inverse=True)
+    run_labels = run_labels.ravel() + 1
+    lengths = ends - starts
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    labels.ravel()[np.repeat(rows * width + starts, lengths) + offsets] = np.repeat(run_labels, lengths)
+
+    component_count = len(roots)
+    sizes = np.bincount(run_labels - 1, weights=lengths, minlength=component_count).astype(np.int64)
+    bounding_boxes = np.empty((component_count, 4), dtype=np.int64)
+    bounding_boxes[:, :2] = np.iinfo(np.int64).max
+    bounding_boxes[:, 2:] = -1
+    np.minimum.at(bounding_boxes[:, 0], run_labels - 1, starts)
+    np.minimum.at(bounding_boxes[:, 1], run_labels - 1, rows)
+    np.maximum.at(bounding_boxes[:, 2], run_labels - 1, ends - 1)
+    np.maximum.at(bounding_boxes[:, 3], run_labels - 1, rows)
+    return ComponentLabels(labels, sizes, bounding_boxes)
@@ -0,0 +1,174 @@
+from itertools import chain
+from typing import Iterator, List, Union, overload
+
+import numpy as np
+
+from .position import Point2, Point3
+from .units import Units
+
+
+class PointArray:
+    """ Many points in one numpy array, for geometry over hundreds of positions per call.
+
+    array is N x 2, or N x 3 when every point has a z coordinate. Distances are 2d, like the distance functions of
+    Pointlike, and ties are broken the same way: closest and furthest return the first point with the smallest or
+    largest distance, and sorting keeps the order of points with equal distance. Indexing with an int returns a
+    Point2 or Point3, indexing with a slice, mask or index array returns a PointArray.
+    Usage:
+    positions = PointArray(self.units(UnitTypeId.MARINE))
+    spread = positions.distances_to(positions.center).max()
+    """
+
+    def __init__(self, points: Union["PointArray", Units, List[Union["Unit", Point2, Point3]], np.ndarray]):
+        """ Accepts Units, a list of Unit/Point2/Point3/tuples, an N x 2 or N x 3 array or another PointArray.
+        Units give their 2d positions, Units from a GameState without looking at every unit. Arrays are copied,
+        so that changing self.array doesn't change the spatial index of the Units or the array that was passed. """
+        if isinstance(points, PointArray):
+            array = points.array.copy()
+        elif isinstance(points, Units):
+            array = points.spatial_index.positions.copy()
+        elif isinstance(points, np.ndarray):
+            array = points.astype(float)
+        else:
+            points = [p if isinstance(p, tuple) else p.position for p in points]
+            lengths = set(map(len, points))
+            if len(lengths) == 1 and lengths <= {2, 3}:
+                dimensions = lengths.pop()
+                array = np.fromiter(chain.from_iterable(points), dtype=float, count=dimensions * len(points))
+                array = array.reshape(-1, dimensions)
+            else:
+                dimensions = 3 if points and min(lengths) >= 3 else 2
+                array = np.array([p[:dimensions] for p in points], dtype=float)
+        if array.size == 0:
+            array = np.zeros((0, 2), dtype=float)
+        assert array.ndim == 2 and array.shape[1] in (2, 3), f"Expected N x 2 or N x 3 points, got shape {array.shape}"
+        self.array: np.ndarray = array
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    @overload
+    def __getitem__(self, index: int) -> Point2:
+        ...
+
+    @overload
+    def __getitem__(self, index: Union[slice, np.ndarray, List[int]]) -> "PointArray":
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self._point(self.array[index])
+        return PointArray(self.array[index])
+
+    def __iter__(self) -> Iterator[Point2]:
+        point_type = Point3 if self.array.shape[1] == 3 else Point2
+        return (point_type(p) for p in map(tuple, self.array.tolist()))
+
+    def __repr__(self) -> str:
+        return f"PointArray({self.array.tolist()})"
+
+    def _point(self, row: np.ndarray) -> Point2:
+        return (Point3 if len(row) == 3 else Point2)(row.tolist())
+
+    @staticmethod
+    def _position(p) -> np.ndarray:
+        p = getattr(p, "position", p)
+        return np.array(p[:2], dtype=float)
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.array[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.array[:, 1]
+
+    @property
+    def z(self) -> np.ndarray:
+        assert self.array.shape[1] == 3, "The points have no z coordinate"
+        return self.array[:, 2]
+
+    @property
+    def to2(self) -> "PointArray":
+        return PointArray(self.array[:, :2])
+
+    def to_points(self) -> List[Point2]:
+        return list(self)
+
+    def distances_squared_to(self, p: Union["Unit", Point2, Point3]) -> np.ndarray:
+        x, y = self._position(p).tolist()
+        return (self.array[:, 0] - x) ** 2 + (self.array[:, 1] - y) ** 2
+
+    def distances_to(self, p: Union["Unit", Point2, Point3]) -> np.ndarray:
+        return np.sqrt(self.distances_squared_to(p))
+
+    def closest_index(self, p: Union["Unit", Point2, Point3]) -> int:
+        assert len(self), "No points"
+        return int(np.argmin(self.distances_squared_to(p)))
+
+    def furthest_index(self, p: Union["Unit", Point2, Point3]) -> int:
+        assert len(self), "No points"
+        return int(np.argmax(self.distances_squared_to(p)))
+
+    def closest(self, p: Union["Unit", Point2, Point3]) -> Point2:
+        return self[self.closest_index(p)]
+
+    def furthest(self, p: Union["Unit", Point2, Point3]) -> Point2:
+        return self[self.furthest_index(p)]
+
+    def distance_to_closest(self, p: Union["Unit", Point2, Point3]) -> float:
+        assert len(self), "No points"
+        return float(self.distances_squared_to(p).min()) ** 0.5
+
+    def distance_to_furthest(self, p: Union["Unit", Point2, Point3]) -> float:
+        assert len(self), "No points"
+        return float(self.distances_squared_to(p).max()) ** 0.5
+
+    def closer_than(self, distance: Union[int, float], p: Union["Unit", Point2, Point3]) -> "PointArray":
+        return PointArray(self.array[self.distances_squared_to(p) < distance ** 2])
+
+    def further_than(self, distance: Union[int, float], p: Union["Unit", Point2, Point3]) -> "PointArray":
+        return PointArray(self.array[self.distances_squared_to(p) > distance ** 2])
+
+    def argsort_by_distance(self, p: Union["Unit", Point2, Point3], reverse: bool = False) -> np.ndarray:
+        """ Indices of the points sorted by distance to p. Points with equal distance keep their order. """
+        d2 = self.distances_squared_to(p)
+        return np.argsort(-d2 if reverse else d2, kind="stable")
+
+    def sorted_by_distance(self, p: Union["Unit", Point2, Point3], reverse: bool = False) -> "PointArray":
+        return PointArray(self.array[self.argsort_by_distance(p, reverse)])
+
+    @property
+    def center(self) -> Point2:
+        """ The centroid of the points, with a z coordinate if the points have one """
+        assert len(self), "No points"
+        return self._point(self.array.mean(axis=0))
+
+    def offset(self, p) -> "PointArray":
+        """ Every point moved by p, which is a Point2/Point3 or an array with one offset per point """
+        offset = np.asarray(p, dtype=float)
+        if offset.ndim == 1:
+            offset = np.pad(offset[: self.array.shape[1]], (0, max(0, self.array.shape[1] - len(offset))))
+        return PointArray(self.array + offset)
+
+    def towards(
+        self, p: Union["Unit", Point2, Point3], distance: Union[int, float] = 1, limit: bool = False
+    ) -> "PointArray":
+        """ Every point moved distance towards p in 2d, like Pointlike.towards. With limit the points don't move
+        past p, and points that are at p stay where they are. """
+        target = self._position(p)
+        differences = target - self.array[:, :2]
+        lengths = np.sqrt((differences ** 2).sum(axis=1))
+        steps = np.minimum(lengths, distance) if limit else np.full(len(self), float(distance))
+        moved = np.divide(steps, lengths, out=np.zeros(len(self)), where=lengths > 0)
+        array = self.array.copy()
+        array[:, :2] += differences * moved[:, None]
+        return PointArray(array)
+
+    def distance_matrix(
+        self, other: Union["PointArray", Units, List[Union["Unit", Point2, Point3]], np.ndarray]
+    ) -> np.ndarray:
+        """ matrix[i, j] is the 2d distance from point i of self to point j of other """
+        other = other if isinstance(other, PointArray) else PointArray(other)
+        differences = self.array[:, None, :2] - other.array[None, :, :2]
+        return np.sqrt((differences ** 2).sum(axis=2))
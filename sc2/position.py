@@ -5,6 +5,8 @@ from typing import Any, Dict, List, Optional, Set, Tuple, Union  # for mypy type
 
 FLOAT_DIGITS = 8
 EPSILON = 10 ** (-FLOAT_DIGITS)
+# From this amount of points the distance functions of Pointlike compute the distances with a PointArray
+VECTORIZE_MIN_POINTS = 64
 
 
 def _sign(num):
@@ -13,6 +15,13 @@ def _sign(num):
     return 1 if num > 0 else -1
 
 
+def _point_array(ps) -> "PointArray":
+    # Imported here, as point_array imports this module
+    from .point_array import PointArray
+
+    return PointArray(ps)
+
+
 class Pointlike(tuple):
     @property
     def rounded(self) -> "Pointlike":
@@ -25,6 +34,11 @@ class Pointlike(tuple):
     def distance_to(self, p: Union["Unit", "Point2", "Point3"]) -> Union[int, float]:
         p = p.position
         assert isinstance(p, Pointlike)
+        if len(self) == 2 and len(p) == 2:
+            dx, dy = p[0] - self[0], p[1] - self[1]
+            if abs(dx) < EPSILON and abs(dy) < EPSILON:
+                return 0
+            return (dx ** 2 + dy ** 2) ** 0.5
         if self == p:
             return 0
         return (sum(self.__class__((b - a) ** 2 for a, b in itertools.zip_longest(self, p, fillvalue=0)))) ** 0.5
@@ -42,8 +56,9 @@ class Pointlike(tuple):
         If you want to sort your units towards a point, use 'units.sorted_by_distance_to(point)' instead. """
         if len(ps) == 1:
             return ps[0]
-        # if ps and all(isinstance(p, Point2) for p in ps):
-        #     return sorted(ps, key=lambda p: self._distance_squared(p))
+        if len(ps) >= VECTORIZE_MIN_POINTS:
+            ps = ps if isinstance(ps, list) else list(ps)
+            return [ps[i] for i in _point_array(ps).argsort_by_distance(self).tolist()]
         return sorted(ps, key=lambda p: self._distance_squared(p.position))
 
     def closest(self, ps: Union["Units", List["Point2"], Set["Point2"]]) -> Union["Unit", "Point2"]:
@@ -51,6 +66,9 @@ class Pointlike(tuple):
         assert ps
         if len(ps) == 1:
             return ps[0]
+        if len(ps) >= VECTORIZE_MIN_POINTS:
+            ps = ps if isinstance(ps, list) else list(ps)
+            return ps[_point_array(ps).closest_index(self)]
         closest_distance_squared = math.inf
         for p2 in ps:
             p2pos = p2
@@ -65,6 +83,8 @@ class Pointlike(tuple):
     def distance_to_closest(self, ps: Union["Units", List["Point2"], Set["Point2"]]) -> Union[int, float]:
         """ This function assumes the 2d distance is meant """
         assert ps
+        if len(ps) >= VECTORIZE_MIN_POINTS:
+            return _point_array(list(ps) if isinstance(ps, (set, frozenset)) else ps).distance_to_closest(self)
         closest_distance_squared = math.inf
         for p2 in ps:
             if not isinstance(p2, Point2):
@@ -79,6 +99,9 @@ class Pointlike(tuple):
         assert ps
         if len(ps) == 1:
             return ps[0]
+        if len(ps) >= VECTORIZE_MIN_POINTS:
+            ps = ps if isinstance(ps, list) else list(ps)
+            return ps[_point_array(ps).furthest_index(self)]
         furthest_distance_squared = -math.inf
         for p2 in ps:
             p2pos = p2
@@ -93,6 +116,8 @@ class Pointlike(tuple):
     def distance_to_furthest(self, ps: Union["Units", List["Point2"], Set["Point2"]]) -> Union[int, float]:
         """ This function assumes the 2d distance is meant """
         assert ps
+        if len(ps) >= VECTORIZE_MIN_POINTS:
+            return _point_array(list(ps) if isinstance(ps, (set, frozenset)) else ps).distance_to_furthest(self)
         furthest_distance_squared = -math.inf
         for p2 in ps:
             if not isinstance(p2, Point2):
@@ -103,15 +128,28 @@ class Pointlike(tuple):
         return furthest_distance_squared ** 0.5
 
     def offset(self, p) -> "Pointlike":
+        if len(self) == 2 and len(p) >= 2:
+            return self.__class__((self[0] + p[0], self[1] + p[1]))
         return self.__class__(a + b for a, b in itertools.zip_longest(self, p[: len(self)], fillvalue=0))
 
     def unit_axes_towards(self, p):
+        if len(self) == 2 and len(p) >= 2:
+            return self.__class__((_sign(p[0] - self[0]), _sign(p[1] - self[1])))
         return self.__class__(_sign(b - a) for a, b in itertools.zip_longest(self, p[: len(self)], fillvalue=0))
 
     def towards(
         self, p: Union["Unit", "Pointlike"], distance: Union[int, float] = 1, limit: bool = False
     ) -> "Pointlike":
         p = p.position
+        if len(self) == 2 and len(p) == 2:
+            x, y = self
+            dx, dy = p[0] - x, p[1] - y
+            if abs(dx) < EPSILON and abs(dy) < EPSILON:
+                return self
+            d = (dx ** 2 + dy ** 2) ** 0.5
+            if limit:
+                distance = min(d, distance)
+            return self.__class__((x + dx / d * distance, y + dy / d * distance))
         # assert self != p, f"self is {self}, p is {p}"
         # TODO test and fix this if statement
         if self == p:
@@ -127,10 +165,14 @@ class Pointlike(tuple):
     def __eq__(self, other):
         if not isinstance(other, tuple):
             return False
+        if len(self) == 2 and len(other) == 2:
+            return abs(self[0] - other[0]) < EPSILON and abs(self[1] - other[1]) < EPSILON
         return all(abs(a - b) < EPSILON for a, b in itertools.zip_longest(self, other, fillvalue=0))
 
     def __hash__(self):
-        return hash(tuple(int(c * FLOAT_DIGITS) for c in self))
+        if len(self) == 2:
+            return hash((round(self[0], FLOAT_DIGITS), round(self[1], FLOAT_DIGITS)))
+        return hash(tuple(round(c, FLOAT_DIGITS) for c in self))
 
 
 class Point2(Pointlike):
@@ -223,49 +265,55 @@ class Point2(Pointlike):
         }
 
     def negative_offset(self, other: "Point2") -> "Point2":
-        return self.__class__((self.x - other.x, self.y - other.y))
+        return self.__class__((self[0] - other[0], self[1] - other[1]))
 
     def __add__(self, other: "Point2") -> "Point2":
+        if len(self) == 2 and len(other) >= 2:
+            return self.__class__((self[0] + other[0], self[1] + other[1]))
         return self.offset(other)
 
     def __sub__(self, other: "Point2") -> "Point2":
-        return self.negative_offset(other)
+        return self.__class__((self[0] - other[0], self[1] - other[1]))
 
     def __neg__(self) -> "Point2":
+        if len(self) == 2:
+            return self.__class__((-self[0], -self[1]))
         return self.__class__(-a for a in self)
 
     def __abs__(self) -> Union[int, float]:
-        return math.hypot(self.x, self.y)
+        return math.hypot(self[0], self[1])
 
     def __bool__(self) -> bool:
-        return self.x != 0 or self.y != 0
+        return self[0] != 0 or self[1] != 0
 
     def __mul__(self, other: Union[int, float, "Point2"]) -> "Point2":
         if isinstance(other, self.__class__):
-            return self.__class__((self.x * other.x, self.y * other.y))
-        return self.__class__((self.x * other, self.y * other))
+            return self.__class__((self[0] * other[0], self[1] * other[1]))
+        return self.__class__((self[0] * other, self[1] * other))
 
     def __rmul__(self, other: Union[int, float, "Point2"]) -> "Point2":
         return self.__mul__(other)
 
     def __truediv__(self, other: Union[int, float, "Point2"]) -> "Point2":
         if isinstance(other, self.__class__):
-            return self.__class__((self.x / other.x, self.y / other.y))
-        return self.__class__((self.x / other, self.y / other))
+            return self.__class__((self[0] / other[0], self[1] / other[1]))
+        return self.__class__((self[0] / other, self[1] / other))
 
     def is_same_as(self, other: "Point2", dist=0.1) -> bool:
         return self._distance_squared(other) <= dist ** 2
 
     def direction_vector(self, other: "Point2") -> "Point2":
         """ Converts a vector to a direction that can face vertically, horizontally or diagonal or be zero, e.g. (0, 0), (1, -1), (1, 0) """
-        return self.__class__((_sign(other.x - self.x), _sign(other.y - self.y)))
+        return self.__class__((_sign(other[0] - self[0]), _sign(other[1] - self[1])))
 
     def manhattan_distance(self, other: "Point2") -> Union[int, float]:
-        return abs(other.x - self.x) + abs(other.y - self.y)
+        return abs(other[0] - self[0]) + abs(other[1] - self[1])
 
     @staticmethod
     def center(a: Union[Set["Point2"], List["Point2"]]) -> "Point2":
         """ Returns the central point for points in list """
+        if len(a) >= VECTORIZE_MIN_POINTS:
+            return _point_array(list(a) if isinstance(a, (set, frozenset)) else a).to2.center
         s = Point2((0, 0))
         for p in a:
             s += p
@@ -296,6 +344,53 @@ class Size(Point2):
         return self[1]
 
 
+class Cell(tuple):
+    """ Integer grid cell (x, y), e.g. a pixel of a PixelMap. Compared and hashed like a plain tuple of ints,
+    so sets and dicts of cells don't pay for the float tolerance of Point2, and equal to the Point2 with the same
+    integer coordinates. A cell can also be packed into the single int y * width + x. """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_point(cls, p: Union["Unit", Point2]) -> "Cell":
+        """ The cell that contains the point """
+        p = p.position
+        return cls((math.floor(p[0]), math.floor(p[1])))
+
+    @classmethod
+    def from_key(cls, key: int, width: int) -> "Cell":
+        y, x = divmod(key, width)
+        return cls((x, y))
+
+    @property
+    def x(self) -> int:
+        return self[0]
+
+    @property
+    def y(self) -> int:
+        return self[1]
+
+    @property
+    def to2(self) -> Point2:
+        return Point2(self)
+
+    def key(self, width: int) -> int:
+        return self[1] * width + self[0]
+
+    def offset(self, p) -> "Cell":
+        return Cell((self[0] + p[0], self[1] + p[1]))
+
+    @property
+    def neighbors4(self) -> Set["Cell"]:
+        x, y = self
+        return {Cell((x - 1, y)), Cell((x + 1, y)), Cell((x, y - 1)), Cell((x, y + 1))}
+
+    @property
+    def neighbors8(self) -> Set["Cell"]:
+        x, y = self
+        return self.neighbors4 | {Cell((x - 1, y - 1)), Cell((x - 1, y + 1)), Cell((x + 1, y - 1)), Cell((x + 1, y + 1))}
+
+
 class Rect(tuple):
     @classmethod
     def from_proto(cls, data):
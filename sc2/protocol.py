@@ -1,4 +1,5 @@
 import sys
+import time
 import aiohttp
 import asyncio
 
@@ -30,6 +31,8 @@ class Protocol:
         assert ws
         self._ws = ws
         self._status = None
+        # StepMetrics that requests are counted and timed in, set by the game loop
+        self._metrics = None
 
     async def __request(self, request):
         logger.debug(f"Sending request: {request !r}")
@@ -53,7 +56,10 @@ class Protocol:
                 sys.exit(2)
             raise
 
+        parse_start = time.perf_counter()
         response.ParseFromString(response_bytes)
+        if self._metrics is not None:
+            self._metrics.add_time("parse", time.perf_counter() - parse_start)
         logger.debug(f"Response received")
         return response
 
@@ -62,7 +68,10 @@ class Protocol:
 
         request = sc_pb.Request(**kwargs)
 
+        start = time.perf_counter()
         response = await self.__request(request)
+        if self._metrics is not None:
+            self._metrics.add_request(next(iter(kwargs)), time.perf_counter() - start)
 
         new_status = Status(response.status)
         if new_status != self._status:
@@ -0,0 +1,124 @@
+import math
+from typing import List, Union
+
+import numpy as np
+
+
+def points_to_array(points) -> np.ndarray:
+    """ Converts Units, a list of Unit/Point2/Point3/tuples or an array into a float N x 2 array of positions. """
+    if isinstance(points, np.ndarray):
+        array = points.astype(float, copy=False)
+    else:
+        array = np.array([getattr(p, "position", p)[:2] for p in points], dtype=float)
+    if array.size == 0:
+        return np.zeros((0, 2), dtype=float)
+    assert array.ndim == 2 and array.shape[1] >= 2, f"Expected N x 2 points, got shape {array.shape}"
+    return array[:, :2]
+
+
+class SpatialIndex:
+    """ Index for distance queries over a fixed set of 2d positions.
+
+    Positions are bucketed into square grid cells and sorted by cell, so that a radius query only
+    has to compute distances to the positions in the cells that the circle overlaps. Small sets are
+    searched with a single vectorized pass, which is faster than the bucket lookups for them.
+    All query results are indices into the positions array. """
+
+    CELL_SIZE = 8
+    # Below this amount of positions radius queries compute the distance to every position
+    BUCKET_MIN_SIZE = 8192
+    # Maximum amount of elements in a distance matrix computed at once by batched queries
+    BATCH_SIZE = 2 ** 18
+
+    def __init__(self, positions: np.ndarray, cell_size: Union[int, float] = CELL_SIZE):
+        self.positions: np.ndarray = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self._xs = self.positions[:, 0]
+        self._ys = self.positions[:, 1]
+        self.cell_size = cell_size
+        self._order = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _build_buckets(self):
+        cells = np.floor(self.positions / self.cell_size).astype(np.int64)
+        self._cell_origin = cells.min(axis=0).tolist()
+        cells -= self._cell_origin
+        self._cell_columns = int(cells[:, 0].max()) + 1
+        self._cell_rows = int(cells[:, 1].max()) + 1
+        keys = cells[:, 1] * self._cell_columns + cells[:, 0]
+        self._order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._order]
+
+    def distances_squared(self, position) -> np.ndarray:
+        return (self._xs - position[0]) ** 2 + (self._ys - position[1]) ** 2
+
+    def _candidates(self, position, distance: Union[int, float]) -> np.ndarray:
+        """ Indices of all positions in the grid cells overlapped by the circle, in no particular order. """
+        if self._order is None:
+            self._build_buckets()
+        origin_x, origin_y = self._cell_origin
+        x0 = max(math.floor((position[0] - distance) / self.cell_size) - origin_x, 0)
+        y0 = max(math.floor((position[1] - distance) / self.cell_size) - origin_y, 0)
+        x1 = min(math.floor((position[0] + distance) / self.cell_size) - origin_x, self._cell_columns - 1)
+        y1 = min(math.floor((position[1] + distance) / self.cell_size) - origin_y, self._cell_rows - 1)
+        if x0 > x1 or y0 > y1:
+            return np.zeros(0, dtype=np.int64)
+        row_keys = np.arange(y0, y1 + 1) * self._cell_columns
+        first = np.searchsorted(self._sorted_keys, row_keys + x0, side="left")
+        last = np.searchsorted(self._sorted_keys, row_keys + x1, side="right")
+        counts = last - first
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self._order[np.repeat(first, counts) + offsets]
+
+    def closer_than(self, distance: Union[int, float], position) -> np.ndarray:
+        """ Sorted indices of the positions with distance strictly less than the given distance. """
+        if len(self) < self.BUCKET_MIN_SIZE:
+            return np.nonzero(self.distances_squared(position) < distance ** 2)[0]
+        candidates = self._candidates(position, distance)
+        d2 = (self._xs[candidates] - position[0]) ** 2 + (self._ys[candidates] - position[1]) ** 2
+        return np.sort(candidates[d2 < distance ** 2])
+
+    def further_than(self, distance: Union[int, float], position) -> np.ndarray:
+        """ Sorted indices of the positions with distance strictly greater than the given distance. """
+        return np.nonzero(self.distances_squared(position) > distance ** 2)[0]
+
+    def closest(self, position) -> int:
+        """ Index of the closest position, the first one if there are several. """
+        return int(np.argmin(self.distances_squared(position)))
+
+    def furthest(self, position) -> int:
+        """ Index of the furthest position, the first one if there are several. """
+        return int(np.argmax(self.distances_squared(position)))
+
+    def sorted_by_distance(self, position, reverse: bool = False) -> np.ndarray:
+        """ Indices sorted by distance to position. Positions with equal distance keep their order. """
+        d2 = self.distances_squared(position)
+        return np.argsort(-d2 if reverse else d2, kind="stable")
+
+    def _batches(self, positions: np.ndarray):
+        """ Yields (start index, squared distance matrix) for slices of the query positions. """
+        step = max(1, self.BATCH_SIZE // max(1, len(self)))
+        for start in range(0, len(positions), step):
+            chunk = positions[start : start + step]
+            d2 = (chunk[:, 0, None] - self._xs[None, :]) ** 2 + (chunk[:, 1, None] - self._ys[None, :]) ** 2
+            yield start, d2
+
+    def closer_than_each(self, distance: Union[int, float], positions: np.ndarray) -> List[np.ndarray]:
+        """ Batched closer_than: returns sorted indices for each of the query positions. """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        result = []
+        for _, d2 in self._batches(positions):
+            result.extend(np.nonzero(row)[0] for row in d2 < distance ** 2)
+        return result
+
+    def closest_n_each(self, positions: np.ndarray, n: int = 1) -> np.ndarray:
+        """ Batched k nearest neighbours: returns an array with one row for each of the query positions,
+        containing the indices of the n closest positions sorted by distance. """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        n = min(n, len(self))
+        result = np.empty((len(positions), n), dtype=np.int64)
+        for start, d2 in self._batches(positions):
+            # Stable sort, so that positions with equal distance are ordered by index
+            result[start : start + len(d2)] = np.argsort(d2, axis=1, kind="stable")[:, :n]
+        return result
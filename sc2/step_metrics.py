@@ -0,0 +1,132 @@
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+class StepMetrics:
+    """ Wall times of the phases of every game step, and the requests sent to SC2 during it.
+
+    The game loop in main.py times these phases, which together make up a step:
+    observation   waiting for and receiving the observation, including parse
+    parse         parsing responses from SC2, for all requests of the step
+    game_state    constructing the GameState
+    prepare_step  BotAI._prepare_step and on the first step _prepare_first_step
+    issue_events  BotAI.issue_events
+    on_step       the bot's on_step, including the requests it makes
+    actions       sending the commands buffered during on_step, see BotAI.buffer_actions
+    step          the step request
+    The Client counts every request by kind and times how long SC2 took to answer it.
+    A bot can add its own phases with self.metrics.phase("name").
+    Usage:
+    def on_end(self, game_result):
+        print(self.metrics.summary())
+        self.metrics.save("metrics.json")
+    """
+
+    PHASES = ["observation", "parse", "game_state", "prepare_step", "issue_events", "on_step", "actions", "step"]
+
+    def __init__(self):
+        # One entry for every finished step
+        self.game_loops: List[int] = []
+        self.times: List[Dict[str, float]] = []
+        self.requests: List[Counter] = []
+        self.request_times: List[Dict[str, float]] = []
+        self._times: Dict[str, float] = defaultdict(float)
+        self._requests: Counter = Counter()
+        self._request_times: Dict[str, float] = defaultdict(float)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._times[name] += time.perf_counter() - start
+
+    def add_time(self, name: str, seconds: float):
+        self._times[name] += seconds
+
+    def add_request(self, kind: str, seconds: float):
+        self._requests[kind] += 1
+        self._request_times[kind] += seconds
+
+    def end_step(self, game_loop: int):
+        self.game_loops.append(game_loop)
+        self.times.append(dict(self._times))
+        self.requests.append(self._requests)
+        self.request_times.append(dict(self._request_times))
+        self._times = defaultdict(float)
+        self._requests = Counter()
+        self._request_times = defaultdict(float)
+
+    @property
+    def phases(self) -> List[str]:
+        """ The built-in phases followed by the ones added by the bot """
+        extra = {name for times in self.times for name in times} - set(self.PHASES)
+        return self.PHASES + sorted(extra)
+
+    def phase_times(self, name: str) -> np.ndarray:
+        """ Seconds spent in the phase on every step """
+        return np.array([times.get(name, 0.0) for times in self.times], dtype=float)
+
+    def step_times(self) -> np.ndarray:
+        """ Seconds of every step, parse time is part of the observation and on_step phases so it is not added """
+        phases = [name for name in self.PHASES if name != "parse"]
+        return sum((self.phase_times(name) for name in phases), np.zeros(len(self)))
+
+    def request_counts(self, kind: str) -> np.ndarray:
+        return np.array([requests[kind] for requests in self.requests], dtype=np.int64)
+
+    @property
+    def request_kinds(self) -> List[str]:
+        return sorted({kind for requests in self.requests for kind in requests})
+
+    def histograms(self, bins: Optional[np.ndarray] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """ Histogram of the time of every phase and of the whole step, as (counts, bin edges in seconds).
+        By default the bins are logarithmic from 10 microseconds to 10 seconds, 4 per factor of 10. """
+        if bins is None:
+            bins = np.logspace(-5, 1, 25)
+        result = {name: np.histogram(self.phase_times(name), bins) for name in self.phases}
+        result["total"] = np.histogram(self.step_times(), bins)
+        return result
+
+    def summary(self) -> str:
+        """ Table of the mean, median, 99th percentile and maximum time of every phase in milliseconds,
+        followed by the average amount of requests per step """
+        lines = [f"{len(self)} steps", f"{'phase':<22} {'mean':>8} {'p50':>8} {'p99':>8} {'max':>8} {'total (s)':>10}"]
+        columns = [(name, self.phase_times(name)) for name in self.phases] + [("total", self.step_times())]
+        for name, times in columns:
+            if not len(times):
+                continue
+            mean, p50, p99, maximum = (times.mean(), *np.percentile(times, [50, 99]), times.max())
+            lines.append(
+                f"{name:<22} {mean * 1000:>8.2f} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f} {maximum * 1000:>8.2f} "
+                f"{times.sum():>10.2f}"
+            )
+        for kind in self.request_kinds:
+            lines.append(f"{kind + ' requests':<22} {self.request_counts(kind).mean():>8.2f} per step")
+        return "\n".join(lines)
+
+    def save(self, path: Union[str, Path]):
+        """ Saves every step and the histograms as json """
+        histograms = {
+            name: {"counts": counts.tolist(), "bin_edges": edges.tolist()}
+            for name, (counts, edges) in self.histograms().items()
+        }
+        data = {
+            "game_loops": self.game_loops,
+            "times": self.times,
+            "requests": [dict(requests) for requests in self.requests],
+            "request_times": self.request_times,
+            "histograms": histograms,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
@@ -452,21 +452,31 @@ class Unit(PassengerUnit):
     def is_selected(self) -> bool:
         return self._proto.is_selected
 
-    @property_mutable_cache
+    @property_immutable_cache
+    def _orders(self) -> Tuple["UnitOrder", ...]:
+        """ The orders decoded once per step, shared by orders and the order based properties """
+        return tuple(UnitOrder.from_proto(o, self._game_data) for o in self._proto.orders)
+
+    @property
     def orders(self) -> List["UnitOrder"]:
-        return [UnitOrder.from_proto(o, self._game_data) for o in self._proto.orders]
+        return list(self._orders)
+
+    @property_immutable_cache
+    def _first_order_ability(self) -> Optional[AbilityId]:
+        """ Id of the ability of the first order after remapping, None if the unit is idle """
+        return self._orders[0].ability.id if self._proto.orders else None
 
     @property_immutable_cache
     def noqueue(self) -> bool:
-        return not self.orders
+        return not self._proto.orders
 
     @property_immutable_cache
     def is_moving(self) -> bool:
-        return self.orders and self.orders[0].ability.id is AbilityId.MOVE
+        return self._first_order_ability is AbilityId.MOVE
 
     @property_immutable_cache
     def is_attacking(self) -> bool:
-        return self.orders and self.orders[0].ability.id in {
+        return self._first_order_ability in {
             AbilityId.ATTACK,
             AbilityId.ATTACK_ATTACK,
             AbilityId.ATTACK_ATTACKTOWARDS,
@@ -477,27 +487,27 @@ class Unit(PassengerUnit):
     @property_immutable_cache
     def is_patrolling(self) -> bool:
         """ Checks if a unit is patrolling. """
-        return self.orders and self.orders[0].ability.id is AbilityId.PATROL
+        return self._first_order_ability is AbilityId.PATROL
 
     @property_immutable_cache
     def is_gathering(self) -> bool:
         """ Checks if a unit is on its way to a mineral field / vespene geyser to mine. """
-        return self.orders and self.orders[0].ability.id is AbilityId.HARVEST_GATHER
+        return self._first_order_ability is AbilityId.HARVEST_GATHER
 
     @property_immutable_cache
     def is_returning(self) -> bool:
         """ Checks if a unit is returning from mineral field / vespene geyser to deliver resources to townhall. """
-        return self.orders and self.orders[0].ability.id is AbilityId.HARVEST_RETURN
+        return self._first_order_ability is AbilityId.HARVEST_RETURN
 
     @property_immutable_cache
     def is_collecting(self) -> bool:
         """ Combines the two properties above. """
-        return self.orders and self.orders[0].ability.id in {AbilityId.HARVEST_GATHER, AbilityId.HARVEST_RETURN}
+        return self._first_order_ability in {AbilityId.HARVEST_GATHER, AbilityId.HARVEST_RETURN}
 
     @property_immutable_cache
     def is_constructing_scv(self) -> bool:
         """ Checks if the unit is an SCV that is currently building. """
-        return self.orders and self.orders[0].ability.id in {
+        return self._first_order_ability in {
             AbilityId.TERRANBUILD_ARMORY,
             AbilityId.TERRANBUILD_BARRACKS,
             AbilityId.TERRANBUILD_BUNKER,
@@ -515,7 +525,7 @@ class Unit(PassengerUnit):
 
     @property_immutable_cache
     def is_repairing(self) -> bool:
-        return self.orders and self.orders[0].ability.id in {
+        return self._first_order_ability in {
             AbilityId.EFFECT_REPAIR,
             AbilityId.EFFECT_REPAIR_MULE,
             AbilityId.EFFECT_REPAIR_SCV,
@@ -525,16 +535,16 @@ class Unit(PassengerUnit):
     def order_target(self) -> Optional[Union[int, Point2]]:
         """ Returns the target tag (if it is a Unit) or Point2 (if it is a Position)
         from the first order, returns None if the unit is idle """
-        if self.orders:
-            if isinstance(self.orders[0].target, int):
-                return self.orders[0].target
+        if self._orders:
+            if isinstance(self._orders[0].target, int):
+                return self._orders[0].target
             else:
-                return Point2.from_proto(self.orders[0].target)
+                return Point2.from_proto(self._orders[0].target)
         return None
 
     @property_immutable_cache
     def is_idle(self) -> bool:
-        return not self.orders
+        return not self._proto.orders
 
     @property_immutable_cache
     def add_on_tag(self) -> int:
@@ -0,0 +1,267 @@
+from operator import attrgetter
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from .cache import property_immutable_cache
+from .data import Alliance, Attribute, CloakState, DisplayType
+from .ids.ability_id import AbilityId
+from .unit import Unit
+
+
+class UnitColumns:
+    """ Structure of arrays view of the raw units of one observation.
+
+    Every column is a numpy array with one entry per raw unit, in the order of observation.raw_data.units.
+    A column is read from the protos the first time it is accessed and cached for the rest of the frame,
+    so only the columns that are actually used cost anything.
+    The snapshot also owns the Unit objects of the frame: unit(row) creates the Unit of a row on
+    first access and returns the same object afterwards, so every proto is wrapped at most once.
+    Usage:
+    columns = self.state.unit_columns
+    hurt_marines = (columns.unit_type == UnitTypeId.MARINE.value) & (columns.health < columns.health_max)
+    """
+
+    def __init__(self, protos, game_data):
+        self._protos = protos
+        self._game_data = game_data
+        self._units = [None] * len(protos)
+        self.cache = {}
+
+    def __len__(self) -> int:
+        return len(self._protos)
+
+    def unit(self, row: int) -> Unit:
+        unit = self._units[row]
+        if unit is None:
+            unit = self._units[row] = Unit(self._protos[row], self._game_data)
+        return unit
+
+    @property_immutable_cache
+    def row_of_tag(self) -> Dict[int, int]:
+        """ Maps the tag of every raw unit to its row """
+        return {tag: row for row, tag in enumerate(self.tag.tolist())}
+
+    def unit_by_tag(self, tag: int) -> Optional[Unit]:
+        row = self.row_of_tag.get(tag)
+        return None if row is None else self.unit(row)
+
+    def _column(self, getter, dtype) -> np.ndarray:
+        return np.fromiter((getter(unit) for unit in self._protos), dtype=dtype, count=len(self._protos))
+
+    @property_immutable_cache
+    def tag(self) -> np.ndarray:
+        return self._column(attrgetter("tag"), np.uint64)
+
+    @property_immutable_cache
+    def unit_type(self) -> np.ndarray:
+        return self._column(attrgetter("unit_type"), np.int32)
+
+    @property_immutable_cache
+    def alliance(self) -> np.ndarray:
+        return self._column(attrgetter("alliance"), np.int8)
+
+    @property_immutable_cache
+    def display_type(self) -> np.ndarray:
+        return self._column(attrgetter("display_type"), np.int8)
+
+    @property_immutable_cache
+    def x(self) -> np.ndarray:
+        return self._column(attrgetter("pos.x"), float)
+
+    @property_immutable_cache
+    def y(self) -> np.ndarray:
+        return self._column(attrgetter("pos.y"), float)
+
+    @property_immutable_cache
+    def z(self) -> np.ndarray:
+        return self._column(attrgetter("pos.z"), float)
+
+    @property_immutable_cache
+    def positions(self) -> np.ndarray:
+        """ N x 2 array of the 2d positions """
+        return np.column_stack((self.x, self.y))
+
+    @property_immutable_cache
+    def facing(self) -> np.ndarray:
+        return self._column(attrgetter("facing"), float)
+
+    @property_immutable_cache
+    def radius(self) -> np.ndarray:
+        return self._column(attrgetter("radius"), float)
+
+    @property_immutable_cache
+    def health(self) -> np.ndarray:
+        return self._column(attrgetter("health"), float)
+
+    @property_immutable_cache
+    def health_max(self) -> np.ndarray:
+        return self._column(attrgetter("health_max"), float)
+
+    @property_immutable_cache
+    def shield(self) -> np.ndarray:
+        return self._column(attrgetter("shield"), float)
+
+    @property_immutable_cache
+    def shield_max(self) -> np.ndarray:
+        return self._column(attrgetter("shield_max"), float)
+
+    @property_immutable_cache
+    def energy(self) -> np.ndarray:
+        return self._column(attrgetter("energy"), float)
+
+    @property_immutable_cache
+    def energy_max(self) -> np.ndarray:
+        return self._column(attrgetter("energy_max"), float)
+
+    @property_immutable_cache
+    def build_progress(self) -> np.ndarray:
+        return self._column(attrgetter("build_progress"), float)
+
+    @property_immutable_cache
+    def order_count(self) -> np.ndarray:
+        return self._column(lambda unit: len(unit.orders), np.int32)
+
+    # The orders of all units, one entry per order, grouped by unit in row order
+
+    @property_immutable_cache
+    def order_row(self) -> np.ndarray:
+        """ Row of the unit that has the order """
+        return np.repeat(np.arange(len(self)), self.order_count)
+
+    @property_immutable_cache
+    def order_ability(self) -> np.ndarray:
+        """ Ability id of the order as sent by SC2, e.g. FORGERESEARCH_PROTOSSGROUNDWEAPONSLEVEL1 """
+        orders = (order.ability_id for unit in self._protos for order in unit.orders)
+        return np.fromiter(orders, dtype=np.int32, count=len(self.order_row))
+
+    @property_immutable_cache
+    def order_ability_id(self) -> np.ndarray:
+        """ Ability id of the order after remapping, like order.ability.id, e.g. RESEARCH_PROTOSSGROUNDWEAPONS """
+        # Only the few distinct abilities are remapped in python
+        abilities, inverse = np.unique(self.order_ability, return_inverse=True)
+        remapped = [self._remap(ability_id) for ability_id in abilities.tolist()]
+        return np.array(remapped, dtype=np.int32)[inverse.ravel()]
+
+    def _remap(self, ability_id: int) -> int:
+        ability = self._game_data.abilities.get(ability_id)
+        return ability_id if ability is None else ability.id.value
+
+    @property_immutable_cache
+    def order_progress(self) -> np.ndarray:
+        orders = (order.progress for unit in self._protos for order in unit.orders)
+        return np.fromiter(orders, dtype=float, count=len(self.order_row))
+
+    @property_immutable_cache
+    def first_order(self) -> np.ndarray:
+        """ Index of the first order of every unit, -1 for idle units """
+        starts = np.cumsum(self.order_count) - self.order_count
+        return np.where(self.order_count > 0, starts, -1)
+
+    @property_immutable_cache
+    def first_order_ability(self) -> np.ndarray:
+        """ Remapped ability id of the first order of every unit, 0 for idle units """
+        has_orders = self.first_order >= 0
+        result = np.zeros(len(self), dtype=np.int32)
+        result[has_orders] = self.order_ability_id[self.first_order[has_orders]]
+        return result
+
+    @staticmethod
+    def _index(values: np.ndarray) -> Dict[int, np.ndarray]:
+        order = np.argsort(values, kind="stable")
+        keys, starts = np.unique(values[order], return_index=True)
+        return dict(zip(keys.tolist(), np.split(order, starts[1:])))
+
+    @property_immutable_cache
+    def orders_by_ability(self) -> Dict[int, np.ndarray]:
+        """ Ability id as sent by SC2 to the indices of the orders with that ability, in row order """
+        return self._index(self.order_ability)
+
+    @property_immutable_cache
+    def orders_by_ability_id(self) -> Dict[int, np.ndarray]:
+        """ Remapped ability id to the indices of the orders with that ability, in row order """
+        return self._index(self.order_ability_id)
+
+    def orders_of(self, ability_id: Union[AbilityId, int], remapped: bool = False) -> np.ndarray:
+        """ Indices of the orders with the ability, compared with the ability id sent by SC2 or, with remapped,
+        with order.ability.id. columns.order_row[indices] are the rows of the units executing it. """
+        index = self.orders_by_ability_id if remapped else self.orders_by_ability
+        if isinstance(ability_id, AbilityId):
+            ability_id = ability_id.value
+        return index.get(ability_id, np.zeros(0, dtype=np.int64))
+
+    @property_immutable_cache
+    def cloak(self) -> np.ndarray:
+        return self._column(attrgetter("cloak"), np.int8)
+
+    @property_immutable_cache
+    def is_flying(self) -> np.ndarray:
+        return self._column(attrgetter("is_flying"), bool)
+
+    @property_immutable_cache
+    def is_burrowed(self) -> np.ndarray:
+        return self._column(attrgetter("is_burrowed"), bool)
+
+    @property_immutable_cache
+    def is_blip(self) -> np.ndarray:
+        return self._column(attrgetter("is_blip"), bool)
+
+    @property_immutable_cache
+    def is_powered(self) -> np.ndarray:
+        return self._column(attrgetter("is_powered"), bool)
+
+    @property_immutable_cache
+    def is_selected(self) -> np.ndarray:
+        return self._column(attrgetter("is_selected"), bool)
+
+    # Flags derived from the columns above, these match the Unit properties with the same name
+
+    @property_immutable_cache
+    def is_ready(self) -> np.ndarray:
+        return self.build_progress == 1
+
+    @property_immutable_cache
+    def is_idle(self) -> np.ndarray:
+        return self.order_count == 0
+
+    @property_immutable_cache
+    def is_gathering(self) -> np.ndarray:
+        return self.first_order_ability == AbilityId.HARVEST_GATHER.value
+
+    @property_immutable_cache
+    def is_returning(self) -> np.ndarray:
+        return self.first_order_ability == AbilityId.HARVEST_RETURN.value
+
+    @property_immutable_cache
+    def is_collecting(self) -> np.ndarray:
+        return self.is_gathering | self.is_returning
+
+    @property_immutable_cache
+    def is_mine(self) -> np.ndarray:
+        return self.alliance == Alliance.Self.value
+
+    @property_immutable_cache
+    def is_enemy(self) -> np.ndarray:
+        return self.alliance == Alliance.Enemy.value
+
+    @property_immutable_cache
+    def is_visible(self) -> np.ndarray:
+        return self.display_type == DisplayType.Visible.value
+
+    @property_immutable_cache
+    def is_snapshot(self) -> np.ndarray:
+        return self.display_type == DisplayType.Snapshot.value
+
+    @property_immutable_cache
+    def is_cloaked(self) -> np.ndarray:
+        return np.isin(self.cloak, [CloakState.Cloaked.value, CloakState.CloakedDetected.value])
+
+    @property_immutable_cache
+    def is_structure(self) -> np.ndarray:
+        unit_types = np.unique(self.unit_type).tolist()
+        structures = [
+            t
+            for t in unit_types
+            if t in self._game_data.units and Attribute.Structure.value in self._game_data.units[t].attributes
+        ]
+        return np.isin(self.unit_type, structures)
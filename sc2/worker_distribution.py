@@ -0,0 +1,234 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from .ids.ability_id import AbilityId
+from .spatial_index import points_to_array
+from .units import Units
+
+
+class WorkerDistribution:
+    """ Keeps track of which worker mines which resource over the whole game, used by BotAI.distribute_workers.
+
+    Every mineral field within BASE_RADIUS of a ready townhall takes MINERAL_FIELD_WORKERS workers, at most the
+    ideal_harvesters the game reports for the townhall, and every ready gas building takes its ideal_harvesters.
+    update is called every step and only looks at what changed: workers that were created, died or became idle, and
+    townhalls, gas buildings and resources that appeared, disappeared, finished or died. Workers the bot gives other
+    orders are noticed by the full check every full_check_interval steps, or right away with release(tag). When a
+    step was skipped, everything is rebuilt from the current orders, and workers that are returning cargo take the
+    closest open places.
+
+    distribute assigns the free workers to the open places, matching the closest pairs first, and returns the
+    gather commands of the workers whose resource changed. Free workers left over are sent to the closest mineral
+    field without counting them, and get a place when one opens. """
+
+    MINERAL_FIELD_WORKERS = 2
+    BASE_RADIUS = 10
+
+    def __init__(self, full_check_interval: int = 16):
+        self.full_check_interval: int = full_check_interval
+        # Worker tag to the tag of the resource it mines
+        self.assignments: Dict[int, int] = {}
+        self.workers_of: Dict[int, Set[int]] = defaultdict(set)
+        # Resource tag to how many workers it takes
+        self.capacity: Dict[int, int] = {}
+        self.free: Set[int] = set()
+        # Free workers that were sent to mine without a place
+        self._overflow: Set[int] = set()
+        self._state = None
+        self._workers: Optional[Units] = None
+        self._townhalls: Optional[Units] = None
+        self._gas_buildings: Optional[Units] = None
+        self._steps_since_full_check = 0
+
+    def assign(self, worker_tag: int, resource_tag: int):
+        self.release(worker_tag)
+        self.assignments[worker_tag] = resource_tag
+        self.workers_of[resource_tag].add(worker_tag)
+
+    def release(self, worker_tag: int):
+        """ Forgets the resource of a worker, e.g. when the bot uses it to build. It is free again when it idles. """
+        resource_tag = self.assignments.pop(worker_tag, None)
+        if resource_tag is not None:
+            self.workers_of[resource_tag].discard(worker_tag)
+            if not self.workers_of[resource_tag]:
+                del self.workers_of[resource_tag]
+        self.free.discard(worker_tag)
+        self._overflow.discard(worker_tag)
+
+    def _free_worker(self, worker_tag: int):
+        self.release(worker_tag)
+        self.free.add(worker_tag)
+
+    def _remove_resource(self, resource_tag: int):
+        self.capacity.pop(resource_tag, None)
+        for worker_tag in list(self.workers_of.get(resource_tag, ())):
+            self._free_worker(worker_tag)
+
+    def update(self, state, workers: Units, townhalls: Units, gas_buildings: Units):
+        consecutive = self._state is not None and state._previous_unit_columns is self._state.unit_columns
+        self._state = state
+        self._workers, self._townhalls, self._gas_buildings = workers, townhalls, gas_buildings
+        if not consecutive:
+            self._rebuild()
+            return
+
+        diff = state.diff
+        changed = diff.appeared | diff.disappeared | diff.completed | state.dead_units
+        bases_changed = bool(changed & (townhalls.tags | gas_buildings.tags | state.dead_units))
+        for tag in state.dead_units:
+            if tag in self.assignments or tag in self.free:
+                self.release(tag)
+        for tag in diff.disappeared & self.capacity.keys():
+            self._remove_resource(tag)
+        for worker in workers.tags_in(diff.appeared):
+            if worker.tag not in self.assignments and worker.tag not in self.free:
+                self._free_worker(worker.tag)
+        for worker in workers.idle:
+            if worker.tag not in self.free or worker.tag in self._overflow:
+                self._free_worker(worker.tag)
+
+        self._steps_since_full_check += 1
+        if self._steps_since_full_check >= self.full_check_interval:
+            self._full_check()
+            bases_changed = True
+        if bases_changed:
+            self._update_capacity()
+
+    def _rebuild(self):
+        """ Forgets everything and takes over the workers that are harvesting or idle """
+        self.assignments.clear()
+        self.workers_of.clear()
+        self.capacity.clear()
+        self.free.clear()
+        self._overflow.clear()
+        self._update_capacity()
+        returning = []
+        for worker in self._workers:
+            target = worker.order_target if worker.is_gathering else None
+            if target in self.capacity:
+                self.assign(worker.tag, target)
+            elif worker.is_returning:
+                # The order has no resource, it mined the closest one most likely
+                returning.append(worker)
+            elif worker.is_idle:
+                self.free.add(worker.tag)
+        self._release_excess()
+        for worker, resource in self._match(returning, self._open_place_units()):
+            self.assign(worker.tag, resource.tag)
+        # The others get a place when they are distributed, after they delivered
+        for worker in returning:
+            if worker.tag not in self.assignments:
+                self.free.add(worker.tag)
+        self._steps_since_full_check = 0
+
+    def _full_check(self):
+        """ Releases the workers that do something else than harvesting, or are gone """
+        workers = {worker.tag: worker for worker in self._workers}
+        for worker_tag in list(self.assignments):
+            worker = workers.get(worker_tag)
+            if worker is None:
+                # Inside a gas building
+                continue
+            if not worker.is_idle and not worker.is_collecting:
+                self.release(worker_tag)
+        self._steps_since_full_check = 0
+
+    def _update_capacity(self):
+        """ Finds the resources the townhalls and gas buildings can take workers at """
+        state = self._state
+        capacity = {}
+        townhalls = self._townhalls.ready
+        minerals = state.mineral_field
+        if townhalls and minerals:
+            offsets = points_to_array(minerals)[:, None, :] - points_to_array(townhalls)[None, :, :]
+            distances = (offsets ** 2).sum(axis=2)
+            nearest = distances.argmin(axis=1)
+            near = distances[np.arange(len(minerals)), nearest] <= self.BASE_RADIUS ** 2
+            for t, townhall in enumerate(townhalls):
+                fields = np.nonzero(near & (nearest == t))[0]
+                if not len(fields):
+                    continue
+                workers = self.MINERAL_FIELD_WORKERS * len(fields)
+                if townhall.ideal_harvesters:
+                    workers = min(workers, townhall.ideal_harvesters)
+                # The closest mineral fields take the remainder
+                fields = fields[np.argsort(distances[fields, t], kind="stable")].tolist()
+                for i, field in enumerate(fields):
+                    amount = workers // len(fields) + (i < workers % len(fields))
+                    if amount:
+                        capacity[minerals[field].tag] = amount
+        for gas_building in self._gas_buildings.ready:
+            if gas_building.ideal_harvesters:
+                capacity[gas_building.tag] = gas_building.ideal_harvesters
+        for resource_tag in list(self.capacity):
+            if resource_tag not in capacity:
+                self._remove_resource(resource_tag)
+        self.capacity = capacity
+        self._release_excess()
+
+    def _release_excess(self):
+        for resource_tag, workers in list(self.workers_of.items()):
+            for worker_tag in sorted(workers)[self.capacity.get(resource_tag, 0) :]:
+                self._free_worker(worker_tag)
+
+    def open_places(self) -> Dict[int, int]:
+        """ Resource tag to how many more workers it takes """
+        return {
+            tag: amount - len(self.workers_of.get(tag, ()))
+            for tag, amount in self.capacity.items()
+            if amount > len(self.workers_of.get(tag, ()))
+        }
+
+    def _open_place_units(self) -> List["Unit"]:
+        """ The resources with open places, each once for every place """
+        columns = self._state.unit_columns
+        return [
+            resource
+            for tag, amount in self.open_places().items()
+            for resource in [columns.unit_by_tag(tag)] * amount
+            if resource is not None
+        ]
+
+    @staticmethod
+    def _match(workers: List["Unit"], places: List["Unit"]) -> List[tuple]:
+        """ Pairs of worker and place, the closest pairs first """
+        if not workers or not places:
+            return []
+        offsets = points_to_array(workers)[:, None, :] - points_to_array(places)[None, :, :]
+        distances = (offsets ** 2).sum(axis=2)
+        used_workers, used_places, pairs = set(), set(), []
+        for index in np.argsort(distances, axis=None, kind="stable").tolist():
+            w, p = divmod(index, len(places))
+            if w in used_workers or p in used_places:
+                continue
+            used_workers.add(w)
+            used_places.add(p)
+            pairs.append((workers[w], places[p]))
+            if len(used_workers) == len(workers) or len(used_places) == len(places):
+                break
+        return pairs
+
+    def distribute(self) -> List["UnitCommand"]:
+        """ Assigns the free workers and returns the commands to send """
+        columns = self._state.unit_columns
+        workers = [columns.unit_by_tag(tag) for tag in sorted(self.free)]
+        workers = [worker for worker in workers if worker is not None]
+        actions = []
+        for worker, resource in self._match(workers, self._open_place_units()):
+            self.assign(worker.tag, resource.tag)
+            actions.append(self._gather(worker, resource))
+
+        minerals = self._state.mineral_field.tags_in(set(self.capacity)) or self._state.mineral_field
+        for worker in workers:
+            if worker.tag in self.free and worker.tag not in self._overflow and minerals:
+                self._overflow.add(worker.tag)
+                actions.append(self._gather(worker, minerals.closest_to(worker)))
+        return actions
+
+    def _gather(self, worker, resource) -> "UnitCommand":
+        if len(worker.orders) == 1 and worker.orders[0].ability.id is AbilityId.HARVEST_RETURN:
+            # Delivers what it carries first
+            return worker.gather(resource, queue=True)
+        return worker.gather(resource)
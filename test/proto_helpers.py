@@ -0,0 +1,163 @@
+"""
+Helpers for tests that need game data, units or observations without a running game.
+"""
+from typing import List
+
+from s2clientprotocol import common_pb2 as common_pb, data_pb2, raw_pb2, sc2api_pb2 as sc_pb
+
+from sc2.data import Alliance, Attribute, Race, Status, TargetType
+from sc2.game_data import GameData
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.unit import Unit
+from sc2.units import Units
+
+UNIT_TYPES = [
+    data_pb2.UnitTypeData(
+        unit_id=UnitTypeId.MARINE.value,
+        name="Marine",
+        available=True,
+        attributes=[Attribute.Light.value, Attribute.Biological.value],
+        weapons=[data_pb2.Weapon(type=TargetType.Any.value, damage=6, attacks=1, range=5, speed=0.61)],
+    ),
+    data_pb2.UnitTypeData(
+        unit_id=UnitTypeId.SCV.value,
+        name="SCV",
+        available=True,
+        attributes=[Attribute.Light.value, Attribute.Biological.value, Attribute.Mechanical.value],
+        weapons=[data_pb2.Weapon(type=TargetType.Ground.value, damage=5, attacks=1, range=0.1, speed=1.07)],
+    ),
+    data_pb2.UnitTypeData(
+        unit_id=UnitTypeId.VIKINGFIGHTER.value,
+        name="VikingFighter",
+        available=True,
+        attributes=[Attribute.Armored.value, Attribute.Mechanical.value],
+        weapons=[data_pb2.Weapon(type=TargetType.Air.value, damage=10, attacks=2, range=9, speed=1.43)],
+    ),
+    data_pb2.UnitTypeData(
+        unit_id=UnitTypeId.COLOSSUS.value,
+        name="Colossus",
+        available=True,
+        attributes=[Attribute.Armored.value, Attribute.Mechanical.value, Attribute.Massive.value],
+        weapons=[data_pb2.Weapon(type=TargetType.Ground.value, damage=10, attacks=2, range=7, speed=1.07)],
+    ),
+    data_pb2.UnitTypeData(
+        unit_id=UnitTypeId.COMMANDCENTER.value,
+        name="CommandCenter",
+        available=True,
+        race=Race.Terran.value,
+        ability_id=AbilityId.TERRANBUILD_COMMANDCENTER.value,
+        attributes=[Attribute.Armored.value, Attribute.Mechanical.value, Attribute.Structure.value],
+    ),
+    data_pb2.UnitTypeData(
+        unit_id=UnitTypeId.BARRACKS.value,
+        name="Barracks",
+        available=True,
+        race=Race.Terran.value,
+        ability_id=AbilityId.TERRANBUILD_BARRACKS.value,
+        attributes=[Attribute.Armored.value, Attribute.Mechanical.value, Attribute.Structure.value],
+    ),
+    data_pb2.UnitTypeData(
+        unit_id=UnitTypeId.MINERALFIELD.value, name="MineralField", available=True, has_minerals=True
+    ),
+    data_pb2.UnitTypeData(
+        unit_id=UnitTypeId.VESPENEGEYSER.value, name="VespeneGeyser", available=True, has_vespene=True
+    ),
+    data_pb2.UnitTypeData(unit_id=UnitTypeId.DESTRUCTIBLEROCK6X6.value, name="DestructibleRock6x6", available=True),
+]
+
+ABILITIES = [
+    data_pb2.AbilityData(ability_id=AbilityId.MOVE.value, link_name="move", button_name="Move", available=True),
+    data_pb2.AbilityData(ability_id=AbilityId.STOP.value, link_name="stop", button_name="Stop", available=True),
+    data_pb2.AbilityData(ability_id=AbilityId.ATTACK.value, link_name="attack", button_name="Attack", available=True),
+    data_pb2.AbilityData(
+        ability_id=AbilityId.HARVEST_GATHER.value, link_name="SCVHarvest", button_name="Gather", available=True
+    ),
+    data_pb2.AbilityData(
+        ability_id=AbilityId.HARVEST_RETURN.value, link_name="SCVHarvest", button_name="Return", available=True
+    ),
+    data_pb2.AbilityData(
+        ability_id=AbilityId.TERRANBUILD_COMMANDCENTER.value,
+        link_name="TerranBuild",
+        button_name="CommandCenter",
+        available=True,
+        is_building=True,
+        footprint_radius=2.5,
+    ),
+    data_pb2.AbilityData(
+        ability_id=AbilityId.TERRANBUILD_BARRACKS.value,
+        link_name="TerranBuild",
+        button_name="Barracks",
+        available=True,
+        is_building=True,
+        footprint_radius=1.5,
+    ),
+]
+
+
+def create_game_data() -> GameData:
+    return GameData(sc_pb.ResponseData(units=UNIT_TYPES, abilities=ABILITIES))
+
+
+def create_unit_proto(
+    unit_type: UnitTypeId, x: float, y: float, tag: int, alliance: Alliance = Alliance.Self, **fields
+) -> raw_pb2.Unit:
+    fields.setdefault("radius", 0.375)
+    fields.setdefault("build_progress", 1)
+    fields.setdefault("display_type", 1)
+    return raw_pb2.Unit(
+        unit_type=unit_type.value, pos=common_pb.Point(x=x, y=y, z=10), tag=tag, alliance=alliance.value, **fields
+    )
+
+
+def create_units(protos, game_data: GameData) -> Units:
+    return Units((Unit(proto, game_data) for proto in protos), game_data)
+
+
+def create_observation(protos, game_loop: int = 0, map_size=(8, 8)) -> sc_pb.ResponseObservation:
+    """ Observation with the given raw units and empty visibility and creep maps. """
+    width, height = map_size
+    response = sc_pb.ResponseObservation()
+    response.observation.game_loop = game_loop
+    raw_data = response.observation.raw_data
+    raw_data.units.extend(protos)
+    for image, bits_per_pixel in ((raw_data.map_state.visibility, 8), (raw_data.map_state.creep, 1)):
+        image.bits_per_pixel = bits_per_pixel
+        image.size.x, image.size.y = width, height
+        image.data = bytes(width * height * bits_per_pixel // 8)
+    return response
+
+
+def create_game_info(map_size=(8, 8), player_races=(Race.Terran, Race.Zerg)) -> sc_pb.ResponseGameInfo:
+    """ Game info of a flat map where everything is pathable and placeable. """
+    width, height = map_size
+    proto = sc_pb.ResponseGameInfo(map_name="Test")
+    for player_id, race in enumerate(player_races, start=1):
+        proto.player_info.add(player_id=player_id, race_requested=race.value)
+    proto.start_raw.map_size.x, proto.start_raw.map_size.y = width, height
+    for image, value in (
+        (proto.start_raw.pathing_grid, 0),
+        (proto.start_raw.placement_grid, 255),
+        (proto.start_raw.terrain_height, 100),
+    ):
+        image.bits_per_pixel = 8
+        image.size.x, image.size.y = width, height
+        image.data = bytes([value]) * (width * height)
+    proto.start_raw.playable_area.p1.x, proto.start_raw.playable_area.p1.y = width, height
+    return proto
+
+
+def create_game_responses(steps: int = 5) -> List[sc_pb.Response]:
+    """ Responses of a short game: an SCV moves and a command center is built, for ObservationRecorder tests. """
+    responses = [
+        sc_pb.Response(join_game=sc_pb.ResponseJoinGame(player_id=1), status=Status.init_game.value),
+        sc_pb.Response(data=sc_pb.ResponseData(units=UNIT_TYPES, abilities=ABILITIES), status=Status.in_game.value),
+        sc_pb.Response(game_info=create_game_info(), status=Status.in_game.value),
+    ]
+    for step in range(steps):
+        units = [create_unit_proto(UnitTypeId.SCV, 1 + step, 1, tag=1)]
+        if step >= 2:
+            units.append(create_unit_proto(UnitTypeId.COMMANDCENTER, 5, 5, tag=2, build_progress=step / 4))
+        observation = create_observation(units, game_loop=step * 8)
+        responses.append(sc_pb.Response(observation=observation, status=Status.in_game.value))
+    return responses
@@ -0,0 +1,100 @@
+import pytest
+
+from sc2.action import combine_actions, compile_actions
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.position import Point2
+
+from proto_helpers import create_game_data, create_unit_proto, create_units
+
+GAME_DATA = create_game_data()
+
+
+def marines(amount):
+    return create_units([create_unit_proto(UnitTypeId.MARINE, i, 1, tag=i + 1) for i in range(amount)], GAME_DATA)
+
+
+def summary(actions):
+    return [
+        (a.unit_command.ability_id, list(a.unit_command.unit_tags), a.unit_command.queue_command)
+        for a in combine_actions(actions)
+    ]
+
+
+def test_same_commands_are_combined_regardless_of_order():
+    m = marines(3)
+    actions = [
+        m[0].move(Point2((5, 5))),
+        m[1].stop(),
+        m[2].move(Point2((5, 5))),
+        m[0].stop(queue=True),
+        m[1].move(Point2((5, 5)), queue=True),
+    ]
+    # Each marine keeps its own order: marine 1 moves before it stops, marine 2 stops before it moves
+    assert summary(actions) == [
+        (AbilityId.MOVE.value, [1, 3], False),
+        (AbilityId.STOP.value, [2], False),
+        (AbilityId.STOP.value, [1], True),
+        (AbilityId.MOVE.value, [2], True),
+    ]
+
+
+def test_commands_keep_their_order():
+    m = marines(2)
+    actions = [
+        m[0].move(Point2((1, 1))),
+        m[0].attack(Point2((2, 2)), queue=True),
+        m[1].move(Point2((3, 3))),
+        m[0].move(Point2((3, 3))),
+        m[1].move(Point2((3, 3))),
+        m[1].attack(Point2((4, 4)), queue=True),
+    ]
+    groups = compile_actions(actions)
+    # The repeated move of marine 2 is dropped, the later move of marine 1 is sent after its attack
+    assert [[(a.unit.tag, a.target) for a in group] for group in groups] == [
+        [(1, Point2((1, 1)))],
+        [(2, Point2((3, 3)))],
+        [(1, Point2((2, 2)))],
+        [(2, Point2((4, 4)))],
+        [(1, Point2((3, 3)))],
+    ]
+
+
+def test_repeated_waypoints_are_kept():
+    m = marines(1)[0]
+    a, b = Point2((1, 1)), Point2((2, 2))
+    actions = [m.move(a), m.move(b, queue=True), m.move(b, queue=True), m.move(a, queue=True), m.move(b, queue=True)]
+    # Only the direct repeat of b is dropped
+    assert [(c.target, c.queue) for (c,) in compile_actions(actions)] == [(a, False), (b, True), (a, True), (b, True)]
+
+
+def test_instant_abilities_are_kept():
+    m = marines(1)[0]
+    attack = m.attack(Point2((2, 2)))
+    assert summary([m(AbilityId.EFFECT_STIM), attack]) == [
+        (AbilityId.EFFECT_STIM.value, [1], False),
+        (AbilityId.ATTACK.value, [1], False),
+    ]
+    assert summary([attack, m(AbilityId.EFFECT_STIM)]) == [
+        (AbilityId.ATTACK.value, [1], False),
+        (AbilityId.EFFECT_STIM.value, [1], False),
+    ]
+    assert [a.unit_command.ability_id for a in combine_actions([m.stop(), attack, m.stop()])] == [
+        AbilityId.STOP.value,
+        AbilityId.ATTACK.value,
+        AbilityId.STOP.value,
+    ]
+
+
+def test_structures_keep_repeated_commands():
+    cc = create_units([create_unit_proto(UnitTypeId.COMMANDCENTER, 1, 1, tag=1)], GAME_DATA)[0]
+    assert summary([cc.stop(), cc.stop()]) == [(AbilityId.STOP.value, [1], False)] * 2
+
+
+def test_close_points_are_separate_targets():
+    m = marines(2)
+    targets = [Point2((5, 5)), Point2((5.05, 5))]
+    actions = combine_actions([m[0].move(targets[0]), m[1].move(targets[1])])
+    assert [a.unit_command.target_world_space_pos.x for a in actions] == pytest.approx([5, 5.05])
+    assert hash(targets[0]) != hash(targets[1])
+    assert hash(Point2((5, 5))) == hash(Point2((5 + 1e-12, 5)))
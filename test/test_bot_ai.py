@@ -0,0 +1,118 @@
+import asyncio
+
+from s2clientprotocol import raw_pb2
+
+from sc2.bot_ai import BotAI
+from sc2.client import Client
+from sc2.data import ActionResult, Alliance, Race
+from sc2.game_state import GameState
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.main import _play_game
+from sc2.observation_recorder import RecordedGame, ReplayConnection
+from sc2.player import Bot
+from sc2.position import Point2
+
+from proto_helpers import create_game_data, create_game_responses, create_observation, create_unit_proto
+
+
+class ActionRecordingGame(RecordedGame):
+    def __init__(self, responses):
+        super().__init__(responses)
+        self.action_requests = []
+
+    def respond(self, request):
+        if request.HasField("action"):
+            self.action_requests.append(request.action)
+        return super().respond(request)
+
+
+class CommandingBot(BotAI):
+    buffer_actions = True
+
+    def __init__(self):
+        self.results = []
+
+    async def on_step(self, iteration):
+        self.results.append(dict(self.action_results))
+        for worker in self.workers:
+            assert await self.do(worker.move(Point2((5, 5)))) is None
+            # The same command twice is only sent once
+            await self.do(worker.move(Point2((5, 5))))
+        await self.do_actions([worker.stop(queue=True) for worker in self.workers])
+
+
+def play(bot, game):
+    client = Client(ReplayConnection(game))
+    return asyncio.get_event_loop().run_until_complete(_play_game(Bot(Race.Terran, bot), client, False, None))
+
+
+def test_buffered_actions():
+    responses = create_game_responses(steps=3)
+    # A second worker
+    for response in responses[3:]:
+        response.observation.observation.raw_data.units.add().CopyFrom(create_unit_proto(UnitTypeId.SCV, 3, 3, tag=3))
+    game = ActionRecordingGame(responses)
+    bot = CommandingBot()
+    play(bot, game)
+
+    # One request per step, with the moves and stops of both workers combined
+    assert len(game.action_requests) == 3
+    for request in game.action_requests:
+        commands = [action.action_raw.unit_command for action in request.actions]
+        assert [(c.ability_id, sorted(c.unit_tags)) for c in commands] == [
+            (AbilityId.MOVE.value, [1, 3]),
+            (AbilityId.STOP.value, [1, 3]),
+        ]
+
+    assert bot.results[0] == {}
+    assert len(bot.results[1]) == 4
+    assert set(bot.results[1].values()) == {ActionResult.Success}
+    assert bot.metrics.request_counts("action").tolist() == [1, 1, 1]
+
+
+def test_unbuffered_actions():
+    class UnbufferedBot(BotAI):
+        async def on_step(self, iteration):
+            for worker in self.workers:
+                await self.do(worker.move(Point2((5, 5))))
+                await self.do(worker.move(Point2((5, 5))))
+            self.results.append(await self.do_actions([worker.stop() for worker in self.workers]))
+
+    # Commands are sent right away unless the bot opts in to buffering
+    assert not BotAI.buffer_actions
+    game = ActionRecordingGame(create_game_responses(steps=2))
+    bot = UnbufferedBot()
+    bot.results = []
+    play(bot, game)
+    # Two moves and one do_actions per step
+    assert len(game.action_requests) == 6
+    # do_actions returns the errors instead of None
+    assert bot.results == [[], []]
+
+
+
+def test_already_pending():
+    def order(ability):
+        return raw_pb2.UnitOrder(ability_id=ability.value)
+
+    build_cc, build_rax = AbilityId.TERRANBUILD_COMMANDCENTER, AbilityId.TERRANBUILD_BARRACKS
+    protos = [
+        create_unit_proto(UnitTypeId.SCV, 1, 1, tag=1, orders=[order(build_cc), order(build_rax), order(build_cc)]),
+        create_unit_proto(UnitTypeId.SCV, 2, 2, tag=2, orders=[order(AbilityId.MOVE), order(build_rax)]),
+        # Not own workers and other units don't count unless all_units is set
+        create_unit_proto(UnitTypeId.SCV, 3, 3, tag=3, alliance=Alliance.Enemy, orders=[order(build_cc)]),
+        create_unit_proto(UnitTypeId.MARINE, 4, 4, tag=4, orders=[order(build_cc)]),
+        create_unit_proto(UnitTypeId.COMMANDCENTER, 5, 5, tag=5, build_progress=0.5),
+    ]
+    bot = BotAI()
+    bot._game_data = create_game_data()
+    bot.race = Race.Terran
+    bot.state = GameState(create_observation(protos), bot._game_data)
+    bot.units = bot.state.own_units
+    bot.workers = bot.units(UnitTypeId.SCV)
+
+    assert bot.already_pending(UnitTypeId.COMMANDCENTER) == 3
+    assert bot.already_pending(UnitTypeId.COMMANDCENTER, all_units=True) == 4
+    assert bot.already_pending(UnitTypeId.BARRACKS) == 2
+    assert bot.already_pending(UnitTypeId.MARINE) == 0
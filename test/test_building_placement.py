@@ -0,0 +1,115 @@
+import asyncio
+
+from sc2.building_placement import BuildingPlacement
+from sc2.client import Client
+from sc2.data import ActionResult
+from sc2.game_info import GameInfo
+from sc2.game_state import GameState
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.observation_recorder import RecordedGame, ReplayConnection
+from sc2.position import Point2
+
+from proto_helpers import create_game_data, create_game_info, create_game_responses, create_observation, create_unit_proto
+
+GAME_DATA = create_game_data()
+MAP_SIZE = (16, 16)
+
+
+class PlacementGame(RecordedGame):
+    """ Allows placing only at x >= 10 and counts the asked positions """
+
+    def __init__(self):
+        super().__init__(create_game_responses())
+        self.asked = []
+
+    def respond(self, request):
+        response = super().respond(request)
+        for placement, answer in zip(request.query.placements, response.query.placements):
+            self.asked.append((placement.target_pos.x, placement.target_pos.y))
+            if placement.target_pos.x < 10:
+                answer.result = ActionResult.CantBuildLocationInvalid.value
+        return response
+
+
+def create_placement(units, previous=None):
+    game = PlacementGame()
+    game_info_proto = create_game_info(MAP_SIZE)
+    # Column 15 is not placeable
+    grid = bytearray(game_info_proto.start_raw.placement_grid.data)
+    for row in range(MAP_SIZE[1]):
+        grid[row * MAP_SIZE[0] + 15] = 0
+    game_info_proto.start_raw.placement_grid.data = bytes(grid)
+    placement = BuildingPlacement(Client(ReplayConnection(game)), GameInfo(game_info_proto), GAME_DATA)
+    placement.update(GameState(create_observation(units, map_size=MAP_SIZE), GAME_DATA))
+    return placement, game
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def test_local_check():
+    placement, game = create_placement([create_unit_proto(UnitTypeId.COMMANDCENTER, 5.5, 5.5, tag=1)])
+    positions = [Point2((5.5, 7.5)), Point2((5.5, 9.5)), Point2((12.5, 12.5)), Point2((14.5, 2.5)), Point2((0.5, 8.5))]
+    # Overlaps the command center, next to it, free, partly on the unplaceable column, partly outside of the map
+    assert placement.local_check(UnitTypeId.BARRACKS, positions).tolist() == [False, True, True, False, False]
+    assert not game.asked
+
+
+def test_answers_are_cached_until_structures_change():
+    units = [create_unit_proto(UnitTypeId.COMMANDCENTER, 5.5, 5.5, tag=1)]
+    placement, game = create_placement(units)
+    positions = [Point2((5.5, 7.5)), Point2((6.5, 12.5)), Point2((12.5, 12.5))]
+    assert run(placement.can_place(UnitTypeId.BARRACKS, positions)) == [False, False, True]
+    assert run(placement.can_place(UnitTypeId.BARRACKS, positions)) == [False, False, True]
+    # The first position was ruled out locally and the answers of the others were cached
+    assert game.asked == [(6.5, 12.5), (12.5, 12.5)]
+
+    placement.update(GameState(create_observation(units, game_loop=8, map_size=MAP_SIZE), GAME_DATA))
+    run(placement.can_place(UnitTypeId.BARRACKS, positions))
+    assert len(game.asked) == 2
+
+    units.append(create_unit_proto(UnitTypeId.BARRACKS, 12.5, 4.5, tag=2))
+    placement.update(GameState(create_observation(units, game_loop=16, map_size=MAP_SIZE), GAME_DATA))
+    assert placement.answers == 0
+    run(placement.can_place(UnitTypeId.BARRACKS, positions))
+    assert len(game.asked) == 4
+
+
+def creep_state(units, creep_rows, game_loop):
+    """ GameState with creep on the given rows y of the map """
+    observation = create_observation(units, game_loop=game_loop, map_size=MAP_SIZE)
+    # One bit per cell, two bytes per row, pixel row y is raw row -y % height
+    data = bytearray(2 * MAP_SIZE[1])
+    for y in creep_rows:
+        raw_row = -y % MAP_SIZE[1]
+        data[2 * raw_row : 2 * raw_row + 2] = b"\xff\xff"
+    observation.observation.raw_data.map_state.creep.data = bytes(data)
+    return GameState(observation, GAME_DATA)
+
+
+def test_answers_are_forgotten_where_creep_changes():
+    units = [create_unit_proto(UnitTypeId.COMMANDCENTER, 5.5, 5.5, tag=1)]
+    placement, game = create_placement(units)
+    positions = [Point2((6.5, 12.5)), Point2((12.5, 12.5)), Point2((12.5, 2.5))]
+    assert run(placement.can_place(UnitTypeId.BARRACKS, positions)) == [False, True, True]
+    assert placement.answers == 3
+
+    # Creep on the first two rows is under the footprint of the last position only
+    placement.update(creep_state(units, [0, 1], game_loop=8))
+    assert placement.answers == 2
+    run(placement.can_place(UnitTypeId.BARRACKS, positions))
+    assert game.asked[3:] == [(12.5, 2.5)]
+
+    placement.update(creep_state(units, range(16), game_loop=16))
+    assert placement.answers == 0
+
+
+def test_find_placement():
+    placement, game = create_placement([create_unit_proto(UnitTypeId.COMMANDCENTER, 5.5, 5.5, tag=1)])
+    near = Point2((5.5, 5.5))
+    found = run(placement.find_placement(UnitTypeId.BARRACKS, near, random_alternative=False, placement_step=1))
+    assert found == Point2((10.5, 5.5))
+    # The squares up to the one where the placement was found have 121 candidates, only a few of each were asked
+    assert len(game.asked) <= 40
+    assert all(x >= 7.5 or y >= 7.5 or x <= 3.5 or y <= 3.5 for x, y in game.asked)
@@ -0,0 +1,110 @@
+import asyncio
+from collections import Counter
+
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+from sc2.client import Client
+from sc2.data import ActionResult
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.observation_recorder import RecordedGame, ReplayConnection
+from sc2.position import Point2
+
+from proto_helpers import create_game_data, create_game_responses, create_unit_proto, create_units
+
+GAME_DATA = create_game_data()
+
+
+class CountingGame(RecordedGame):
+    """ Answers pathing queries with the distance along x, so that results can be told apart """
+
+    def __init__(self):
+        super().__init__(create_game_responses())
+        self.requests = Counter()
+
+    def respond(self, request):
+        self.requests[request.WhichOneof("request")] += 1
+        response = super().respond(request)
+        for pathing, answer in zip(request.query.pathing, response.query.pathing):
+            answer.distance = pathing.end_pos.x - pathing.start_pos.x
+        return response
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def test_concurrent_queries_are_combined():
+    game = CountingGame()
+    client = Client(ReplayConnection(game))
+
+    async def queries():
+        return await asyncio.gather(
+            client.query_pathing(Point2((1, 1)), Point2((5, 1))),
+            client.query_pathings([[Point2((0, 0)), Point2((2, 0))], [Point2((0, 0)), Point2((3, 0))]]),
+            client.query_pathing(Point2((1, 1)), Point2((8, 1))),
+            client.query_building_placement(GAME_DATA.abilities[AbilityId.MOVE.value], [Point2((1, 1))]),
+        )
+
+    assert run(queries()) == [4, [2, 3], 7, [ActionResult.Success]]
+    assert game.requests["query"] == 1
+
+    # Queries with a different ignore_resource_requirements are sent separately
+    async def placements():
+        ability = GAME_DATA.abilities[AbilityId.MOVE.value]
+        return await asyncio.gather(
+            client.query_building_placement(ability, [Point2((1, 1))], ignore_resources=True),
+            client.query_building_placement(ability, [Point2((1, 1)), Point2((2, 2))], ignore_resources=False),
+        )
+
+    assert run(placements()) == [[ActionResult.Success], [ActionResult.Success] * 2]
+    assert game.requests["query"] == 3
+
+
+def test_serial_queries():
+    game = CountingGame()
+    client = Client(ReplayConnection(game))
+
+    async def queries():
+        return [await client.query_pathing(Point2((1, 1)), Point2((x, 1))) for x in (2, 3, 4)]
+
+    assert run(queries()) == [1, 2, 3]
+    assert game.requests["query"] == 3
+
+
+def test_concurrent_actions_are_combined():
+    game = CountingGame()
+    client = Client(ReplayConnection(game))
+    marines = create_units([create_unit_proto(UnitTypeId.MARINE, i, 1, tag=i + 1) for i in range(3)], GAME_DATA)
+
+    async def actions():
+        return await asyncio.gather(
+            client.actions([marines[0].move(Point2((5, 5))), marines[1].move(Point2((6, 6)))], GAME_DATA, True),
+            client.actions(marines[2].move(Point2((5, 5))), GAME_DATA, True),
+            client.chat_send("gl hf", False),
+        )
+
+    assert run(actions()) == [[ActionResult.Success] * 2, ActionResult.Success, None]
+    assert game.requests["action"] == 1
+
+
+def test_errors_reach_every_caller():
+    class BrokenGame(CountingGame):
+        def respond(self, request):
+            response = super().respond(request)
+            if request.HasField("query"):
+                response = sc_pb.Response(error=["Game has already ended"])
+            return response
+
+    client = Client(ReplayConnection(BrokenGame()))
+
+    async def queries():
+        return await asyncio.gather(
+            client.query_pathing(Point2((1, 1)), Point2((5, 1))),
+            client.query_pathing(Point2((1, 1)), Point2((6, 1))),
+            return_exceptions=True,
+        )
+
+    errors = run(queries())
+    assert len(errors) == 2 and all(isinstance(e, Exception) for e in errors)
+    assert client._batch_flush is None and not client._batches
@@ -0,0 +1,61 @@
+import math
+
+import numpy as np
+import pytest
+
+from sc2.distance_fields import DistanceFields
+from sc2.game_info import GameInfo
+from sc2.map_cache import MapCache
+from sc2.pathing import Pathing
+from sc2.position import Point2
+
+from proto_helpers import create_game_info
+
+
+def create_pathing():
+    """ 12 x 12 grid with a wall at x == 6 that has a gap at y == 10, and a 2 x 2 block at (1, 1) """
+    pathable = np.ones((12, 12), dtype=bool)
+    pathable[:, 6] = False
+    pathable[10, 6] = True
+    pathable[1:3, 1:3] = False
+    return Pathing(pathable)
+
+
+LOCATIONS = [Point2((3.5, 5.5)), Point2((9.5, 5.5))]
+
+
+def test_matches_pathing():
+    pathing = create_pathing()
+    fields = DistanceFields.compute(pathing, LOCATIONS)
+    assert fields.fields.dtype == np.uint16 and fields.fields.shape == (2, 12, 12)
+    points = [Point2((x + 0.5, y + 0.5)) for x in range(12) for y in range(12)]
+    for location in LOCATIONS:
+        expected = pathing.distances(points, location)
+        assert fields.distances_to(points, location).tolist() == pytest.approx(expected.tolist(), abs=0.05)
+    assert fields.distance(Point2((9.5, 5.5)), LOCATIONS[0]) > 10
+    assert fields.distances_from(Point2((4, 5))).tolist() == pytest.approx([1, fields.distance(Point2((4, 5)), LOCATIONS[1])])
+    assert fields.closest(Point2((8, 1))) == LOCATIONS[1]
+    # Inside the block
+    assert fields.distance(Point2((1.5, 1.5)), LOCATIONS[0]) < 10
+
+
+def test_unreachable():
+    pathable = np.ones((4, 8), dtype=bool)
+    pathable[:, 3:5] = False
+    fields = DistanceFields.compute(Pathing(pathable), [Point2((0.5, 0.5))])
+    assert fields.distance(Point2((7.5, 0.5)), Point2((0.5, 0.5))) == math.inf
+    assert fields.closest(Point2((7.5, 0.5))) is None
+
+
+def test_map_cache(tmp_path):
+    pathing = create_pathing()
+    cache = MapCache(tmp_path, GameInfo(create_game_info((12, 12))))
+    computed = DistanceFields.load_or_compute(pathing, LOCATIONS, cache)
+    assert cache.path("distances").exists()
+    loaded = DistanceFields.load_or_compute(pathing, LOCATIONS, cache)
+    assert loaded.locations == LOCATIONS and (loaded.fields == computed.fields).all()
+
+    # Different locations are computed again
+    other = DistanceFields.load_or_compute(pathing, LOCATIONS[:1], cache)
+    assert len(other.locations) == 1
+    assert len(cache.load("distances")["locations"]) == 1
@@ -0,0 +1,25 @@
+import numpy as np
+
+from sc2.expansions import expansion_center, group_resources
+from sc2.position import Point2
+
+
+def test_group_resources():
+    positions = np.array([(10, 10), (50, 50), (12, 10), (26, 10), (10, 30), (50, 52), (28, 10)], dtype=float)
+    heights = np.array([1, 1, 1, 1, 1, 2, 1])
+    # (26, 10) is too far from the first resource of the first group, (50, 52) is on another height
+    assert group_resources(positions, heights) == [[0, 2], [1], [3, 6], [4], [5]]
+
+    line = np.array([(x, 0) for x in range(12)], dtype=float)
+    assert group_resources(line, np.zeros(12)) == [list(range(10)), [10, 11]]
+
+
+def test_expansion_center():
+    # Mineral fields in an arc above the townhall and geysers on both sides
+    minerals = [Point2((x, 37.5)) for x in range(26, 35, 2)]
+    geysers = [Point2((23.5, 31.5)), Point2((36.5, 31.5))]
+    positions = np.array(minerals + geysers, dtype=float)
+    center = expansion_center(positions, np.array([False] * len(minerals) + [True] * len(geysers)))
+    assert center.x % 1 == 0.5 and center.y % 1 == 0.5
+    assert all(center.distance_to(m) >= 6 for m in minerals) and all(center.distance_to(g) >= 7 for g in geysers)
+    assert center.y < 37.5 and abs(center.x - 30) <= 1
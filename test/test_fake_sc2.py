@@ -0,0 +1,44 @@
+import asyncio
+
+from sc2.bot_ai import BotAI
+from sc2.client import Client
+from sc2.data import Race, Result
+from sc2.fake_sc2 import FakeSC2Process
+from sc2.main import _play_game
+from sc2.observation_recorder import RecordedGame
+from sc2.player import Bot
+from sc2.position import Point2
+
+from proto_helpers import create_game_responses
+
+
+class MovingBot(BotAI):
+    async def on_step(self, iteration):
+        for worker in self.workers:
+            await self.do(worker.move(Point2((1, 1))))
+        await self._client.query_pathing(Point2((1, 1)), Point2((5, 5)))
+
+
+async def play(game):
+    process = FakeSC2Process(game)
+    async with process as controller:
+        assert controller.running
+        await controller.ping()
+        client = Client(controller._ws)
+        result = await _play_game(Bot(Race.Terran, MovingBot()), client, False, None)
+        await client.quit()
+    return result, process
+
+
+def test_play_over_websocket():
+    result, process = asyncio.get_event_loop().run_until_complete(play(RecordedGame(create_game_responses())))
+    assert result == Result.Tie
+    server = process.server
+    # One more observation than recorded, the one that ends the game
+    assert server.requests["observation"] == 6
+    assert server.requests["step"] == 5
+    assert server.requests["action"] == 5
+    assert server.requests["query"] == 5
+    assert server.actions == 5
+    assert server.requests["ping"] == server.requests["join_game"] == server.requests["quit"] == 1
+    assert process._process is None
@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+
+from sc2.bot_ai import BotAI
+from sc2.data import Race
+from sc2.frame_diff import FrameDiff
+from sc2.game_state import GameState
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.unit_columns import UnitColumns
+
+from proto_helpers import create_game_data, create_observation, create_unit_proto
+
+GAME_DATA = create_game_data()
+
+
+def frame(*units):
+    return [create_unit_proto(unit_type, x, 10, tag, **fields) for unit_type, x, tag, fields in units]
+
+
+PREVIOUS = frame(
+    (UnitTypeId.MARINE, 10, 1, {"health": 45}),
+    (UnitTypeId.MARINE, 20, 2, {"health": 45}),
+    (UnitTypeId.SCV, 30, 3, {"health": 45, "shield": 0}),
+    (UnitTypeId.COMMANDCENTER, 40, 4, {"build_progress": 0.5}),
+    (UnitTypeId.VIKINGFIGHTER, 50, 5, {}),
+    (UnitTypeId.MARINE, 60, 6, {"is_blip": True}),
+)
+CURRENT = frame(
+    (UnitTypeId.COMMANDCENTER, 40, 4, {"build_progress": 1}),
+    (UnitTypeId.MARINE, 11, 1, {"health": 45}),
+    (UnitTypeId.SCV, 30, 3, {"health": 40, "shield": 0}),
+    (UnitTypeId.COLOSSUS, 50, 5, {}),
+    (UnitTypeId.MARINE, 60, 7, {}),
+    (UnitTypeId.COMMANDCENTER, 70, 8, {"build_progress": 0.1}),
+    (UnitTypeId.MARINE, 60, 9, {"is_blip": True}),
+)
+
+
+def test_frame_diff():
+    diff = FrameDiff(UnitColumns(PREVIOUS, GAME_DATA), UnitColumns(CURRENT, GAME_DATA))
+    assert diff.appeared == {7, 8}
+    assert diff.disappeared == {2}
+    assert diff.moved == {1}
+    assert diff.damaged == {3}
+    assert diff.type_changed == {5}
+    assert diff.completed == {4}
+    assert diff
+
+    diff = FrameDiff(UnitColumns(CURRENT, GAME_DATA), UnitColumns(CURRENT, GAME_DATA))
+    assert not diff
+
+
+def test_first_frame():
+    diff = FrameDiff(None, UnitColumns(CURRENT, GAME_DATA))
+    assert diff.appeared == {1, 3, 4, 5, 7, 8}
+    assert not (diff.disappeared or diff.moved or diff.damaged or diff.type_changed or diff.completed)
+
+
+class EventBot(BotAI):
+    def __init__(self):
+        self.events = []
+
+    async def on_unit_created(self, unit):
+        self.events.append(("created", unit.tag))
+
+    async def on_building_construction_started(self, unit):
+        self.events.append(("started", unit.tag))
+
+    async def on_building_construction_complete(self, unit):
+        self.events.append(("complete", unit.tag))
+
+
+def test_events():
+    bot = EventBot()
+    game_info = SimpleNamespace(player_races={1: Race.Terran.value})
+    bot._prepare_start(None, 1, game_info, GAME_DATA)
+
+    previous = GameState(create_observation(PREVIOUS), GAME_DATA)
+    bot._prepare_step(previous)
+    asyncio.get_event_loop().run_until_complete(bot.issue_events())
+    assert bot.events == [("created", 1), ("created", 2), ("created", 3), ("created", 5), ("started", 4)]
+
+    bot.events.clear()
+    bot._prepare_step(GameState(create_observation(CURRENT), GAME_DATA, previous))
+    asyncio.get_event_loop().run_until_complete(bot.issue_events())
+    assert bot.events == [("created", 7), ("started", 8), ("complete", 4)]
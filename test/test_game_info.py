@@ -0,0 +1,22 @@
+from sc2.game_info import GameInfo, Ramp
+from sc2.position import Cell, Point2
+
+from proto_helpers import create_game_info
+
+
+def test_ramp_upper_and_lower():
+    game_info = GameInfo(create_game_info((16, 16)))
+    points = {Point2((x, y)) for x in range(6, 9) for y in range(4, 8)}
+    for y in range(4, 8):
+        for x in range(6, 9):
+            game_info.terrain_height[x, y] = 10 + y
+    ramp = Ramp(points, game_info)
+
+    assert ramp.size == 12 and ramp.points == points
+    assert ramp.cells == {Cell((int(p.x), int(p.y))) for p in points}
+    assert ramp.upper == {p for p in points if p.y == 7}
+    assert ramp.lower == {p for p in points if p.y == 4}
+    assert ramp.top_center == Point2((7, 7)) and ramp.bottom_center == Point2((7, 4))
+    # The cached sets can't be changed through the returned copies
+    ramp.upper.clear()
+    assert len(ramp.upper) == 3
@@ -0,0 +1,87 @@
+from sc2.bot_ai import BotAI
+from sc2.distance_fields import DistanceFields
+from sc2.game_info import GameInfo
+from sc2.main import run_recording
+from sc2.map_cache import MapCache
+from sc2.observation_recorder import ObservationRecorder
+from sc2.position import Point2
+
+from proto_helpers import create_game_info, create_game_responses
+
+
+def create_game_info_with_ramp():
+    proto = create_game_info((16, 16))
+    # Pathable but not placeable cells are ramps
+    grid = bytearray(proto.start_raw.placement_grid.data)
+    for y in range(4, 8):
+        for x in range(6, 9):
+            grid[y * 16 + x] = 0
+    proto.start_raw.placement_grid.data = bytes(grid)
+    return proto
+
+
+def test_map_key():
+    proto = create_game_info_with_ramp()
+    key = MapCache.map_key(GameInfo(proto))
+    assert key.startswith("Test-") and key == MapCache.map_key(GameInfo(proto))
+    proto.start_raw.terrain_height.data = bytes([1]) * len(proto.start_raw.terrain_height.data)
+    assert MapCache.map_key(GameInfo(proto)) != key
+
+
+def test_ramps_are_cached(tmp_path):
+    game_info = GameInfo(create_game_info_with_ramp())
+    cache = MapCache(tmp_path, game_info)
+    ramps = game_info._find_ramps(cache)
+    assert len(ramps) == 1 and ramps[0].size == 12
+    assert cache.path("ramps").exists()
+
+    # Loaded from the cache, even though the grid doesn't have the ramp anymore
+    game_info.placement_grid.data_numpy[:] = 255
+    assert not game_info._find_ramps()
+    loaded = game_info._find_ramps(cache)
+    assert [ramp.points for ramp in loaded] == [ramps[0].points]
+
+
+class ExpandingBot(BotAI):
+    def __init__(self, directory, expect_cached=False):
+        self.map_cache_directory = directory
+        self.expect_cached = expect_cached
+
+    async def on_step(self, iteration):
+        self.expansion_locations
+
+    def _find_expansion_locations(self):
+        assert not self.expect_cached
+        return {Point2((5.5, 5.5)): []}
+
+
+def test_bot_uses_cache(tmp_path, monkeypatch):
+    path = tmp_path / "game.sc2obs"
+    with ObservationRecorder(path) as recorder:
+        for response in create_game_responses(steps=2):
+            recorder.record(response)
+
+    run_recording(path, ExpandingBot(tmp_path / "maps"))
+    names = {path.name for path in (tmp_path / "maps").glob("Test-*/*.npz")}
+    assert names == {"ramps.npz", "expansion_locations.npz", "distances.npz"}
+
+    def compute(*args):
+        raise AssertionError("The distance fields are in the cache")
+
+    monkeypatch.setattr(DistanceFields, "compute", compute)
+    bot = ExpandingBot(tmp_path / "maps", expect_cached=True)
+    run_recording(path, bot)
+    assert bot.expansion_locations == {Point2((5.5, 5.5)): []}
+
+
+def test_base_distances_lazy_without_cache(tmp_path, monkeypatch):
+    path = tmp_path / "game.sc2obs"
+    with ObservationRecorder(path) as recorder:
+        for response in create_game_responses(steps=2):
+            recorder.record(response)
+
+    def compute(*args):
+        raise AssertionError("Computed without being used")
+
+    monkeypatch.setattr(DistanceFields, "compute", compute)
+    run_recording(path, ExpandingBot(None))
@@ -0,0 +1,71 @@
+import pytest
+from s2clientprotocol import sc2api_pb2 as sc_pb
+
+from sc2.bot_ai import BotAI
+from sc2.data import Result, Status
+from sc2.main import run_recording
+from sc2.observation_recorder import ObservationRecorder, RecordedGame, read_responses
+from sc2.position import Point2
+
+from proto_helpers import create_game_responses
+
+
+@pytest.mark.parametrize("filename", ["game.sc2obs", "game.sc2obs.gz"])
+def test_write_and_read(tmp_path, filename):
+    responses = create_game_responses()
+    path = tmp_path / filename
+    with ObservationRecorder(path) as recorder:
+        for response in responses:
+            recorder.record(response)
+    assert recorder.records == len(responses)
+    assert (path.read_bytes()[:2] == b"\x1f\x8b") == filename.endswith(".gz")
+    assert list(read_responses(path)) == responses
+
+
+def test_recorded_game_answers():
+    game = RecordedGame(create_game_responses(steps=2))
+    assert game.player_ids == [1, 2]
+    assert game.respond(sc_pb.Request(game_info=sc_pb.RequestGameInfo())) is game.initial["game_info"]
+    assert game.respond(sc_pb.Request(observation=sc_pb.RequestObservation())).observation.observation.game_loop == 0
+    assert game.respond(sc_pb.Request(observation=sc_pb.RequestObservation())).observation.observation.game_loop == 8
+    last = game.respond(sc_pb.Request(observation=sc_pb.RequestObservation()))
+    assert last.status == Status.ended.value
+    assert [r.result for r in last.observation.player_result] == [Result.Tie.value] * 2
+
+    query = sc_pb.Request()
+    query.query.pathing.add()
+    query.query.pathing.add()
+    query.query.placements.add()
+    response = game.respond(query)
+    assert len(response.query.pathing) == 2 and len(response.query.placements) == 1
+
+
+class RecordingBot(BotAI):
+    def __init__(self):
+        self.game_loops = []
+        self.created = []
+        self.completed = []
+
+    async def on_step(self, iteration):
+        self.game_loops.append(self.state.game_loop)
+        for worker in self.workers:
+            await self.do(worker.move(Point2((1, 1))))
+
+    async def on_unit_created(self, unit):
+        self.created.append(unit.tag)
+
+    async def on_building_construction_complete(self, unit):
+        self.completed.append(unit.tag)
+
+
+def test_run_recording(tmp_path):
+    path = tmp_path / "game.sc2obs.gz"
+    with ObservationRecorder(path) as recorder:
+        for response in create_game_responses():
+            recorder.record(response)
+
+    bot = RecordingBot()
+    assert run_recording(path, bot) == Result.Tie
+    assert bot.game_loops == [0, 8, 16, 24, 32]
+    assert bot.created == [1]
+    assert bot.completed == [2]
@@ -0,0 +1,95 @@
+import math
+
+import numpy as np
+import pytest
+
+from sc2.game_info import GameInfo
+from sc2.pathing import Pathing
+from sc2.position import Point2
+
+from proto_helpers import create_game_info
+
+
+def walled_grid():
+    """ 10 x 10 grid with a wall at x == 5 that has a gap at y == 8 """
+    pathable = np.ones((10, 10), dtype=bool)
+    pathable[:, 5] = False
+    pathable[8, 5] = True
+    return pathable
+
+
+def test_distances_match_a_star():
+    pathing = Pathing(walled_grid())
+    target = Point2((7.5, 2.5))
+    field = pathing.distance_field(target)
+    assert field[2, 7] == 0
+    assert field[2, 8] == 1 and field[3, 8] == pytest.approx(math.sqrt(2))
+    # Around the wall through the gap
+    assert field[2, 2] == pytest.approx(pathing._a_star((2, 2), (7, 2))[0])
+    assert field[2, 2] > 5
+
+    starts = [Point2((x + 0.5, y + 0.5)) for x in range(10) for y in range(10) if x != 5]
+    via_field = pathing.distances(starts, target)
+    fresh = Pathing(walled_grid())
+    via_a_star = [fresh.distance(start, target) for start in starts]
+    assert fresh.cached_fields == 0
+    assert via_field.tolist() == pytest.approx(via_a_star)
+    # Uses the cached field
+    assert pathing.distance(target, starts[0]) == pytest.approx(via_field[0])
+
+
+def test_no_corner_cutting_and_unreachable():
+    pathable = np.ones((4, 4), dtype=bool)
+    pathable[1, 1] = False
+    pathing = Pathing(pathable)
+    assert pathing.distance(Point2((0.5, 0.5)), Point2((1.5, 2.5))) == 3
+    assert pathing.distance(Point2((1.5, 0.5)), Point2((0.5, 1.5))) == 2
+
+    closed = walled_grid()
+    closed[8, 5] = False
+    pathing = Pathing(closed)
+    assert pathing.distance(Point2((1, 1)), Point2((8, 1))) is None
+    assert pathing.path(Point2((1, 1)), Point2((8, 1))) is None
+    assert pathing.distances([Point2((1, 1))], Point2((8, 1))).tolist() == [math.inf]
+
+
+def test_path():
+    pathing = Pathing(walled_grid())
+    path = pathing.path(Point2((2.5, 2.5)), Point2((7.5, 2.5)))
+    assert path[0] == Point2((2.5, 2.5)) and path[-1] == Point2((7.5, 2.5))
+    assert Point2((5.5, 8.5)) in path
+    assert all(max(abs(a.x - b.x), abs(a.y - b.y)) == 1 for a, b in zip(path, path[1:]))
+
+
+def test_unpathable_points_are_moved():
+    pathable = np.ones((6, 6), dtype=bool)
+    pathable[:2, :3] = False
+    pathing = Pathing(pathable)
+    # The closest pathable cell is (0, 2)
+    assert pathing.distance(Point2((0.5, 0.5)), Point2((0.5, 4.5))) == 4
+    assert pathing.distances([Point2((0.5, 0.5))], Point2((0.5, 4.5))).tolist() == [4]
+
+    pathing = Pathing(pathable)
+    field = pathing.distance_field(Point2((0.5, 4.5)), fill_unpathable=True, cache=False)
+    assert field[0, 0] == 4 and field[4, 0] == 0 and not np.isinf(field).any()
+    assert pathing.cached_fields == 0
+    # The cached field keeps inf in the unpathable cells
+    assert np.isinf(pathing.distance_field(Point2((0.5, 4.5)))[0, 0])
+    assert pathing.distance_field(Point2((0.5, 4.5)), fill_unpathable=True)[0, 0] == 4
+
+
+def test_fields_are_cached():
+    pathing = Pathing(walled_grid(), max_cached_fields=2)
+    first = pathing.distance_field(Point2((1, 1)))
+    assert pathing.distance_field(Point2((1.9, 1.2))) is first
+    pathing.distance_field(Point2((2, 2)))
+    pathing.distance_field(Point2((1, 1)))
+    pathing.distance_field(Point2((3, 3)))
+    assert pathing.cached_fields == 2
+    assert (1, 1) in pathing._fields and (2, 2) not in pathing._fields
+
+
+def test_game_info_pathing():
+    game_info = GameInfo(create_game_info((8, 8)))
+    assert game_info.pathing is game_info.pathing
+    assert game_info.pathing.distance(Point2((0.5, 0.5)), Point2((7.5, 0.5))) == 7
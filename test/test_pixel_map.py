@@ -0,0 +1,170 @@
+import numpy as np
+from s2clientprotocol import common_pb2 as common_pb
+
+from sc2.pixel_map import PixelMap, label_clusters, label_components
+from sc2.position import Cell, Point2
+
+
+def create_pixel_map(rows, bits_per_pixel=8):
+    """ Creates a PixelMap from a list of raw rows, as they are stored in the proto """
+    height, width = len(rows), len(rows[0])
+    if bits_per_pixel == 1:
+        data = np.packbits(np.array(rows, dtype=np.uint8).flatten()).tobytes()
+    else:
+        data = bytes(value for row in rows for value in row)
+    proto = common_pb.ImageData(
+        bits_per_pixel=bits_per_pixel, size=common_pb.Size2DI(x=width, y=height), data=data
+    )
+    return PixelMap(proto)
+
+
+ROWS = [
+    [0, 1, 2, 3],
+    [4, 5, 6, 7],
+    [8, 9, 10, 11],
+]
+
+
+def test_getitem_row_order():
+    pm = create_pixel_map(ROWS)
+    assert pm[0, 0] == 0
+    assert pm[3, 0] == 3
+    # Row y is stored in raw row -y % height
+    assert pm[0, 1] == 8
+    assert pm[3, 1] == 11
+    assert pm[1, 2] == 5
+
+
+def test_setitem():
+    pm = create_pixel_map(ROWS)
+    pm[Point2((2, 1))] = [255]
+    assert pm[2, 1] == 255
+    assert pm.data_numpy[2, 2] == 255
+    assert pm.data[2 * 4 + 2] == 255
+    pm[2, 1] = 7
+    assert pm[2, 1] == 7
+
+
+def test_grid():
+    pm = create_pixel_map(ROWS)
+    grid = pm.grid
+    for x in range(pm.width):
+        for y in range(pm.height):
+            assert grid[y, x] == pm[x, y]
+
+
+def test_values_at():
+    pm = create_pixel_map(ROWS)
+    points = [Point2((x, y)) for x in range(pm.width) for y in range(pm.height)]
+    assert list(pm.values_at(points)) == [pm[p] for p in points]
+    assert list(pm.values_at(np.array(points))) == [pm[p] for p in points]
+    assert list(pm.is_set_at([Point2((0, 0)), Point2((0.6, 0.2))])) == [False, True]
+    assert len(pm.values_at([])) == 0
+
+
+def test_one_bit_per_pixel():
+    rows = [[(x + y) % 2 for x in range(16)] for y in range(4)]
+    pm = create_pixel_map(rows, bits_per_pixel=1)
+    assert pm.data_numpy.shape == (4, 16)
+    assert pm[1, 0] == 1
+    assert pm[0, 0] == 0
+    assert pm[0, 1] == rows[3][0]
+    assert list(pm.is_set_at([(1, 0), (2, 0)])) == [True, False]
+
+
+def test_label_components():
+    mask = np.array(
+        [
+            [1, 1, 0, 0, 1],
+            [0, 1, 0, 1, 0],
+            [0, 0, 0, 0, 0],
+            [1, 0, 1, 1, 1],
+        ],
+        dtype=bool,
+    )
+    components = label_components(mask, connectivity=8)
+    assert components.amount == 4
+    assert components.labels[0, 0] == components.labels[1, 1] == 1
+    assert components.labels[0, 4] == components.labels[1, 3] == 2
+    assert list(components.sizes) == [3, 2, 1, 3]
+    assert components.bounding_box(1) == (0, 0, 1, 1)
+    assert components.bounding_box(4) == (2, 3, 4, 3)
+
+    components = label_components(mask, connectivity=4)
+    assert components.amount == 5
+    assert components.labels[0, 4] != components.labels[1, 3]
+
+
+def test_label_components_empty():
+    components = label_components(np.zeros((3, 3), dtype=bool))
+    assert components.amount == 0
+    assert not components.labels.any()
+
+
+def test_flood_fill():
+    rows = [
+        [1, 1, 0, 0],
+        [0, 0, 0, 1],
+        [0, 1, 1, 0],
+        [1, 0, 0, 0],
+    ]
+    pm = create_pixel_map(rows)
+    points = {Point2((x, y)) for x in range(pm.width) for y in range(pm.height) if pm[x, y]}
+
+    groups = pm.flood_fill_all(lambda value: value != 0)
+    assert set().union(*groups) == points
+    for group in groups:
+        for p in group:
+            assert pm.flood_fill(p, lambda value: value != 0) == group
+    assert pm.flood_fill(Point2((2, 0)), lambda value: value != 0) == set()
+
+
+def test_flood_fill_stays_local():
+    rows = [
+        [1, 1, 0, 0, 0],
+        [1, 0, 0, 7, 7],
+        [0, 0, 0, 7, 7],
+    ]
+    pm = create_pixel_map(rows)
+
+    def pred(value):
+        assert value != 7, "flood_fill looked at a pixel far from the component"
+        return value == 1
+
+    # Raw row 1 is pixel row 2, so the 1 there is not connected
+    assert pm.flood_fill(Point2((0, 0)), pred) == {Point2((0, 0)), Point2((1, 0))}
+    assert pm.flood_fill(Point2((0, 2)), pred) == {Point2((0, 2))}
+
+
+def test_cells():
+    cell = Cell.from_point(Point2((3.7, 5.2)))
+    assert cell == (3, 5) and cell == Point2((3, 5)) and hash(cell) == hash(Point2((3, 5)))
+    assert cell.to2 == Point2((3, 5)) and isinstance(cell.to2, Point2)
+    assert Cell.from_key(cell.key(10), 10) == cell
+    assert Cell((0, 0)).neighbors8 == {Cell(p) for p in Point2((0, 0)).neighbors8}
+
+    mask = np.array([[1, 1, 0, 0], [0, 0, 0, 1], [0, 1, 1, 0], [1, 0, 0, 0]], dtype=bool)
+    components = label_components(mask, connectivity=4)
+    groups = components.cell_arrays()
+    assert [len(group) for group in groups] == components.sizes.tolist()
+    for label, group in enumerate(groups, start=1):
+        assert mask[group[:, 1], group[:, 0]].all()
+        assert components.cells(label) == {Cell(cell) for cell in map(tuple, group.tolist())}
+        assert components.points(label) == components.cells(label)
+    assert [len(group) for group in components.cell_arrays(minimum_size=2)] == [2, 2]
+
+
+def test_label_clusters():
+    mask = np.array(
+        [
+            [1, 0, 1, 0, 0, 1],
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 1, 0, 0, 1],
+        ],
+        dtype=bool,
+    )
+    components = label_clusters(mask, max_distance=2)
+    # (0, 0), (2, 0) and (2, 2) are within distance 2 of each other, (5, 0) and (5, 2) as well
+    assert components.amount == 2
+    assert list(components.sizes) == [3, 2]
+    assert label_components(mask).amount == 5
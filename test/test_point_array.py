@@ -0,0 +1,74 @@
+import random
+
+import numpy as np
+
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.point_array import PointArray
+from sc2.position import VECTORIZE_MIN_POINTS, Point2, Point3
+
+from proto_helpers import create_game_data, create_unit_proto, create_units
+
+
+def random_points(amount, seed=1):
+    rng = random.Random(seed)
+    # Integer coordinates, so that there are ties
+    return [Point2((rng.randint(0, 20), rng.randint(0, 20))) for _ in range(amount)]
+
+
+def test_conversions():
+    points = random_points(10)
+    array = PointArray(points)
+    assert array.array.shape == (10, 2)
+    assert array.to_points() == points and array[3] == points[3] and isinstance(array[3], Point2)
+    assert list(array[2:5]) == points[2:5]
+    assert PointArray(array.array).to_points() == points
+
+    points3 = [Point3((1, 2, 3)), Point3((4, 5, 6))]
+    assert PointArray(points3).array.shape == (2, 3) and PointArray(points3)[1] == points3[1]
+    assert PointArray(points3 + [Point2((7, 8))]).array.shape == (3, 2)
+    assert len(PointArray([])) == 0
+
+    protos = [create_unit_proto(UnitTypeId.MARINE, x, 2 * x, tag=x + 1) for x in range(5)]
+    units = create_units(protos, create_game_data())
+    assert PointArray(units).to_points() == [unit.position for unit in units]
+
+    # Changing the array doesn't change what it was created from
+    array = PointArray(units)
+    array.array[0] = (100, 100)
+    raw = np.zeros((3, 2))
+    PointArray(raw).array[0] = (100, 100)
+    PointArray(array).array[1] = (100, 100)
+    assert units.closest_to(Point2((100, 100))) is units[-1] and not raw.any() and array[1] == units[1].position
+
+
+def test_matches_pointlike():
+    points = random_points(200)
+    array = PointArray(points)
+    p = Point2((10, 10))
+    expected = sorted(points, key=lambda q: p._distance_squared(q))
+    assert array.sorted_by_distance(p).to_points() == expected
+    assert array.closest(p) == min(points, key=lambda q: p._distance_squared(q))
+    assert array.furthest(p) == max(points, key=lambda q: p._distance_squared(q))
+    assert array.distance_to_closest(p) == min(p.distance_to(q) for q in points)
+    assert np.allclose(array.distances_to(p), [p.distance_to(q) for q in points])
+    assert array.closer_than(5, p).to_points() == [q for q in points if p.distance_to(q) < 5]
+    assert array.center == Point2((sum(q.x for q in points) / 200, sum(q.y for q in points) / 200))
+    assert array.offset(Point2((1, -1))).to_points() == [q.offset((1, -1)) for q in points]
+    assert array.towards(p, 2).to_points() == [q.towards(p, 2) for q in points]
+    assert array.towards(p, 100, limit=True).to_points() == [q.towards(p, 100, limit=True) for q in points]
+    matrix = array.distance_matrix(points[:3])
+    assert matrix.shape == (200, 3) and np.allclose(matrix[:, 1], array.distances_to(points[1]))
+
+
+def test_pointlike_uses_point_array():
+    points = random_points(VECTORIZE_MIN_POINTS * 2)
+    p = Point2((3, 17))
+    small = points[: VECTORIZE_MIN_POINTS - 1]
+    for ps in (points, small):
+        assert p.closest(ps) is min(ps, key=lambda q: p._distance_squared(q))
+        assert p.furthest(ps) is max(ps, key=lambda q: p._distance_squared(q))
+        assert p.sort_by_distance(ps) == sorted(ps, key=lambda q: p._distance_squared(q))
+        assert p.sort_by_distance(set(ps)) == sorted(set(ps), key=lambda q: p._distance_squared(q))
+        assert p.distance_to_closest(set(ps)) == min(p.distance_to(q) for q in ps)
+        assert p.distance_to_furthest(ps) == max(p.distance_to(q) for q in ps)
+    assert Point2.center(points) == Point2((sum(q.x for q in points) / len(points), sum(q.y for q in points) / len(points)))
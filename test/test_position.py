@@ -0,0 +1,21 @@
+from sc2.position import Point2, Point3
+
+
+def test_mixed_dimensions():
+    # The 2d fast paths only apply when both points are 2d, the other cases keep the previous behaviour
+    p2, p3 = Point2((1, 2)), Point3((4, 6, 12))
+    assert p2.distance_to(p3) == 13
+    assert p2.distance_to(p3.to2) == 5
+    assert p3.offset(p2) == Point3((5, 8, 12)) and type(p3 + p2) is Point3
+    assert p2.offset(p3) == Point2((5, 8)) and type(p2 + p3) is Point2
+    assert p3.towards(p2, 0) == p3 and p2.towards(p3.to2, 10, limit=True) == p3.to2
+    assert p2 == Point3((1, 2, 0)) and p2 != p3.to2
+    assert -p3 == Point3((-4, -6, -12))
+
+
+def test_equal_points():
+    p = Point2((10, 10))
+    close = Point2((10, 10 + 1e-9))
+    assert p == close and hash(p) == hash(close) and p.distance_to(close) == 0
+    assert p.towards(close, 5) is p
+    assert p.unit_axes_towards(Point2((3, 10))) == Point2((-1, 0))
@@ -0,0 +1,63 @@
+import json
+
+from sc2.bot_ai import BotAI
+from sc2.main import run_recording
+from sc2.observation_recorder import ObservationRecorder
+from sc2.position import Point2
+from sc2.step_metrics import StepMetrics
+
+from proto_helpers import create_game_responses
+
+
+class MovingBot(BotAI):
+    async def on_step(self, iteration):
+        await self.do(self.workers.first.move(Point2((1, 1))))
+
+
+def test_step_metrics(tmp_path):
+    metrics = StepMetrics()
+    for step in range(3):
+        with metrics.phase("on_step"):
+            pass
+        metrics.add_time("observation", 0.01 * step)
+        metrics.add_time("parse", 0.001)
+        metrics.add_time("my_phase", 1)
+        metrics.add_request("action", 0.002)
+        metrics.add_request("action", 0.002)
+        metrics.end_step(step * 8)
+
+    assert len(metrics) == 3
+    assert metrics.game_loops == [0, 8, 16]
+    assert metrics.phases == StepMetrics.PHASES + ["my_phase"]
+    assert metrics.phase_times("observation").tolist() == [0, 0.01, 0.02]
+    assert metrics.phase_times("step").tolist() == [0, 0, 0]
+    # parse is part of the other phases and bot phases are part of on_step
+    assert (metrics.step_times() == metrics.phase_times("observation") + metrics.phase_times("on_step")).all()
+    assert metrics.request_counts("action").tolist() == [2, 2, 2]
+    assert metrics.request_kinds == ["action"]
+
+    counts, edges = metrics.histograms()["observation"]
+    assert counts.sum() == 2 and len(edges) == len(counts) + 1
+    assert "action requests" in metrics.summary()
+
+    metrics.save(tmp_path / "metrics.json")
+    data = json.loads((tmp_path / "metrics.json").read_text())
+    assert data["requests"] == [{"action": 2}] * 3
+    assert sum(data["histograms"]["my_phase"]["counts"]) == 3
+
+
+def test_game_loop_metrics(tmp_path):
+    path = tmp_path / "game.sc2obs"
+    with ObservationRecorder(path) as recorder:
+        for response in create_game_responses():
+            recorder.record(response)
+
+    bot = MovingBot()
+    run_recording(path, bot)
+    metrics = bot.metrics
+    # The game ends on the observation of the sixth step
+    assert len(metrics) == 5
+    assert metrics.request_kinds == ["action", "observation", "step"]
+    assert metrics.request_counts("observation").tolist() == [1] * 5
+    assert metrics.request_counts("action").tolist() == [1] * 5
+    assert all((metrics.phase_times(name) > 0).all() for name in StepMetrics.PHASES)
@@ -0,0 +1,248 @@
+import random
+
+from s2clientprotocol import raw_pb2
+
+from sc2.data import Alliance
+from sc2.game_state import GameState
+from sc2.helpers.control_group import ControlGroup
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.position import Point2
+from sc2.unit_columns import UnitColumns
+from sc2.units import Units
+
+from proto_helpers import create_game_data, create_observation, create_unit_proto
+
+GAME_DATA = create_game_data()
+UNIT_TYPES = (UnitTypeId.MARINE, UnitTypeId.SCV, UnitTypeId.COMMANDCENTER, UnitTypeId.VIKINGFIGHTER)
+ORDER_ABILITIES = (
+    AbilityId.MOVE,
+    AbilityId.HARVEST_GATHER,
+    AbilityId.HARVEST_RETURN,
+    AbilityId.TERRANBUILD_BARRACKS,
+    AbilityId.TERRANBUILD_COMMANDCENTER,
+)
+
+
+def random_protos(amount, seed=1):
+    rng = random.Random(seed)
+    protos = []
+    for i in range(amount):
+        orders = [
+            raw_pb2.UnitOrder(ability_id=rng.choice(ORDER_ABILITIES).value, progress=rng.random())
+            for _ in range(rng.choice([0, 0, 1, 2]))
+        ]
+        protos.append(
+            create_unit_proto(
+                rng.choice(UNIT_TYPES),
+                rng.random() * 100,
+                rng.random() * 100,
+                tag=i + 1,
+                alliance=rng.choice([Alliance.Self, Alliance.Enemy, Alliance.Ally]),
+                build_progress=rng.choice([1, 1, 0.5]),
+                display_type=rng.choice([1, 2]),
+                is_flying=rng.random() < 0.3,
+                is_selected=rng.random() < 0.2,
+                health=rng.choice([10, 45]),
+                health_max=45,
+                orders=orders,
+            )
+        )
+    return protos
+
+
+def test_columns():
+    protos = random_protos(50)
+    columns = UnitColumns(protos, GAME_DATA)
+    assert len(columns) == 50
+    assert columns.tag.tolist() == [p.tag for p in protos]
+    assert columns.positions.tolist() == [[p.pos.x, p.pos.y] for p in protos]
+    assert columns.order_count.tolist() == [len(p.orders) for p in protos]
+    assert columns.is_structure.tolist() == [p.unit_type == UnitTypeId.COMMANDCENTER.value for p in protos]
+    assert len(UnitColumns([], GAME_DATA).positions) == 0
+
+
+def test_column_filters_match_unit_filters():
+    protos = random_protos(200)
+    columns = UnitColumns(protos, GAME_DATA)
+    backed = Units.from_columns(columns, list(range(0, 200, 2)), GAME_DATA)
+    plain = Units.from_proto(protos[::2], GAME_DATA)
+    assert backed._has_columns and not plain._has_columns
+
+    for name in (
+        "selected", "ready", "not_ready", "noqueue", "idle", "owned", "enemy",
+        "flying", "not_flying", "structure", "not_structure", "visible", "gathering", "returning", "collecting",
+    ):
+        assert [u.tag for u in getattr(backed, name)] == [u.tag for u in getattr(plain, name)], name
+    # Results stay backed by the snapshot, so filters can be chained
+    assert backed.owned._has_columns
+    assert [u.tag for u in backed.owned.ready.idle] == [u.tag for u in plain.owned.ready.idle]
+
+    types = {UnitTypeId.MARINE, UnitTypeId.SCV}
+    assert [u.tag for u in backed.of_type(types)] == [u.tag for u in plain.of_type(types)]
+    assert [u.tag for u in backed.exclude_type(types)] == [u.tag for u in plain.exclude_type(types)]
+    assert [u.tag for u in backed(UnitTypeId.MARINE)] == [u.tag for u in plain(UnitTypeId.MARINE)]
+    assert [u.tag for u in backed(types)] == [u.tag for u in plain(types)]
+    tags = [1, 5, 7, 9, 1000]
+    assert [u.tag for u in backed.tags_in(tags)] == [u.tag for u in plain.tags_in(tags)]
+    assert [u.tag for u in backed.tags_not_in(tags)] == [u.tag for u in plain.tags_not_in(tags)]
+
+    p = Point2((40, 60))
+    assert [u.tag for u in backed.closer_than(20, p)] == [u.tag for u in plain.closer_than(20, p)]
+
+
+def test_order_columns():
+    protos = random_protos(100)
+    columns = UnitColumns(protos, GAME_DATA)
+    units = [columns.unit(row) for row in range(len(columns))]
+    orders = [(row, order) for row, unit in enumerate(units) for order in unit.orders]
+    assert columns.order_row.tolist() == [row for row, _ in orders]
+    assert columns.order_ability_id.tolist() == [order.ability.id.value for _, order in orders]
+    assert columns.order_progress.tolist() == [order.progress for _, order in orders]
+    assert columns.first_order_ability.tolist() == [u.orders[0].ability.id.value if u.orders else 0 for u in units]
+
+    for ability in ORDER_ABILITIES:
+        expected = [row for row, order in orders if order.ability.id is ability]
+        assert columns.order_row[columns.orders_of(ability)].tolist() == expected
+        assert columns.order_row[columns.orders_of(ability, remapped=True)].tolist() == expected
+    assert len(columns.orders_of(AbilityId.STOP)) == 0
+    assert len(UnitColumns([], GAME_DATA).orders_of(AbilityId.MOVE)) == 0
+
+
+def test_orders_decoded_once():
+    protos = random_protos(10)
+    columns = UnitColumns(protos, GAME_DATA)
+    unit = columns.unit(next(row for row, proto in enumerate(protos) if proto.orders))
+    assert unit.orders is not unit.orders
+    assert unit.orders[0] is unit.orders[0]
+    unit.orders.clear()
+    assert unit.orders and not unit.is_idle
+
+
+def test_tag_index():
+    protos = random_protos(100)
+    columns = UnitColumns(protos, GAME_DATA)
+    backed = Units.from_columns(columns, list(range(0, 100, 2)), GAME_DATA)
+    plain = Units.from_proto(protos[::2], GAME_DATA)
+    assert backed.find_by_tag(protos[10].tag) is columns.unit(10) and backed.find_by_tag(protos[11].tag) is None
+    assert backed.tags == plain.tags
+
+    other = Units.from_columns(columns, list(range(0, 100, 3)), GAME_DATA)
+    plain_other = Units.from_proto(protos[::3], GAME_DATA)
+    for result, expected in (
+        (backed | other, plain | plain_other),
+        (backed & other, plain & plain_other),
+        (backed - other, plain - plain_other),
+    ):
+        assert result._has_columns and [u.tag for u in result] == [u.tag for u in expected]
+    few = [protos[40].tag, protos[4].tag, protos[5].tag]
+    assert [u.tag for u in backed.tags_in(few)] == [protos[4].tag, protos[40].tag]
+    group = ControlGroup(columns.unit(row) for row in (40, 4, 5))
+    assert [u.tag for u in group.select_units(backed)] == [protos[4].tag, protos[40].tag]
+
+
+def test_columns_ignored_after_change():
+    protos = random_protos(20)
+    backed = Units.from_columns(UnitColumns(protos, GAME_DATA), range(10), GAME_DATA)
+    backed.extend(Units.from_proto(protos[10:], GAME_DATA))
+    assert not backed._has_columns
+    assert backed.owned.amount == sum(p.alliance == Alliance.Self.value for p in protos)
+
+
+def test_columns_ignored_after_sort():
+    protos = random_protos(20)
+    columns = UnitColumns(protos, GAME_DATA)
+    backed = Units.from_columns(columns, range(20), GAME_DATA)
+    plain = Units.from_proto(protos, GAME_DATA)
+    for units in (backed, plain):
+        units.sort(key=lambda unit: unit.tag, reverse=True)
+        units[0] = units[-1]
+    assert not backed._has_columns
+    for name in ("ready", "idle", "owned", "not_flying"):
+        assert [u.tag for u in getattr(backed, name)] == [u.tag for u in getattr(plain, name)], name
+    assert [u.tag for u in backed.of_type(UnitTypeId.MARINE)] == [u.tag for u in plain.of_type(UnitTypeId.MARINE)]
+    assert [u.tag for u in backed.tags_in({1, 2, 3})] == [u.tag for u in plain.tags_in({1, 2, 3})]
+    assert [u.tag for u in backed.tags_not_in({1, 2, 3})] == [u.tag for u in plain.tags_not_in({1, 2, 3})]
+    other = Units.from_columns(columns, range(5), GAME_DATA)
+    assert [u.tag for u in backed & other] == [u.tag for u in plain & other]
+    assert [u.tag for u in backed - other] == [u.tag for u in plain - other]
+
+
+def test_game_state_units():
+    protos = random_protos(30)
+    neutral = [
+        (UnitTypeId.MINERALFIELD, 0.75, False),
+        (UnitTypeId.VESPENEGEYSER, 1.5, False),
+        (UnitTypeId.DESTRUCTIBLEROCK6X6, 3, False),
+        (UnitTypeId.MINERALFIELD, 0.75, False),
+        (UnitTypeId.MARINE, 0.375, True),
+    ]
+    for i, (unit_type, radius, is_blip) in enumerate(neutral):
+        alliance = Alliance.Enemy if is_blip else Alliance.Neutral
+        protos.insert(i * 6, create_unit_proto(unit_type, i, i, 100 + i, alliance, radius=radius, is_blip=is_blip))
+    state = GameState(create_observation(protos), GAME_DATA)
+    assert len(state.unit_columns) == 35
+
+    def tags(units):
+        return [u.tag for u in units]
+
+    visible = [p for p in protos if not p.is_blip]
+    assert tags(state.own_units) == [p.tag for p in visible if p.alliance == Alliance.Self.value]
+    assert tags(state.enemy_units) == [p.tag for p in visible if p.alliance == Alliance.Enemy.value]
+    assert tags(state.units) == [p.tag for p in visible]
+    assert tags(state.mineral_field) == [100, 103]
+    assert tags(state.vespene_geyser) == [101]
+    assert tags(state.resources) == [100, 103, 101]
+    assert tags(state.destructables) == [102]
+    assert [b.position for b in state.blips] == [Point2((4, 4))]
+    assert tags(state.own_units.ready) == [u.tag for u in state.own_units if u.is_ready]
+
+    # Collections share the Unit objects and are only built once
+    assert state.units is state.units
+    assert state.mineral_field[0] is state.resources[0]
+    assert all(unit is state.unit_columns.unit_by_tag(unit.tag) for unit in state.own_units)
+    assert state.unit_columns.unit_by_tag(12345) is None
+    assert all(state.unit_by_tag(unit.tag) is unit for unit in state.units)
+    # Blips are not visible units
+    assert state.unit_by_tag(104) is None and state.unit_by_tag(12345) is None
+
+
+def test_query_matches_chained_selectors():
+    protos = random_protos(300)
+    columns = UnitColumns(protos, GAME_DATA)
+    backed = Units.from_columns(columns, list(range(300)), GAME_DATA)
+    plain = Units.from_proto(protos, GAME_DATA)
+    p = Point2((50, 50))
+    tags = {u.tag for u in plain[::3]}
+    chains = [
+        (lambda q: q.ready.idle.closer_than(30, p), lambda u: u.ready.idle.closer_than(30, p)),
+        (
+            lambda q: q.of_type(UnitTypeId.MARINE).owned.further_than(20, p),
+            lambda u: u(UnitTypeId.MARINE).owned.further_than(20, p),
+        ),
+        (
+            lambda q: q.exclude_type([UnitTypeId.SCV]).not_flying.filter(lambda u: u.health > 20).tags_in(tags),
+            lambda u: u.exclude_type([UnitTypeId.SCV]).not_flying.filter(lambda u: u.health > 20).tags_in(tags),
+        ),
+        (lambda q: q.enemy.sorted_by_distance_to(p).limit(5), lambda u: u.enemy.sorted_by_distance_to(p)[:5]),
+        (
+            lambda q: q.collecting.sorted(lambda u: u.tag, reverse=True).tags_not_in(tags).not_structure,
+            lambda u: u.collecting.sorted(lambda u: u.tag, reverse=True).tags_not_in(tags).not_structure,
+        ),
+        (
+            lambda q: q.limit(40).sorted_by_distance_to(p, reverse=True).visible,
+            lambda u: u.subgroup(u[:40]).sorted_by_distance_to(p, reverse=True).visible,
+        ),
+    ]
+    for query_chain, units_chain in chains:
+        expected = [u.tag for u in units_chain(plain)]
+        for units in (backed, plain):
+            result = query_chain(units.query())
+            assert [u.tag for u in result] == expected
+            assert len(result) == len(expected) and result.amount == len(expected)
+        assert query_chain(backed.query()).units._has_columns
+
+    query = backed.query(UnitTypeId.MARINE).ready
+    assert query.exists == bool(backed(UnitTypeId.MARINE).ready)
+    assert query.units is query.units
+    assert query.closest_to(p).tag == backed(UnitTypeId.MARINE).ready.closest_to(p).tag
@@ -0,0 +1,126 @@
+import random
+
+from sc2.data import Alliance
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.position import Point2
+from sc2.spatial_index import SpatialIndex
+
+from proto_helpers import create_game_data, create_unit_proto, create_units
+
+GAME_DATA = create_game_data()
+
+
+def random_units(amount, seed=1, size=100, unit_types=(UnitTypeId.MARINE,)):
+    rng = random.Random(seed)
+    protos = [
+        create_unit_proto(
+            rng.choice(unit_types),
+            # Round some of the coordinates so that there are units with equal distances
+            round(rng.random() * size, rng.choice([0, 2])),
+            round(rng.random() * size, rng.choice([0, 2])),
+            tag=i + 1,
+            is_flying=rng.random() < 0.3,
+            radius=rng.choice([0.375, 0.5, 1]),
+            alliance=Alliance.Enemy,
+        )
+        for i in range(amount)
+    ]
+    return create_units(protos, GAME_DATA)
+
+
+def distance_squared(unit, position):
+    return unit.position._distance_squared(position)
+
+
+def test_distance_selectors():
+    for amount in (1, 10, 300, 600):
+        units = random_units(amount)
+        for p in (Point2((50, 50)), Point2((0, 0)), Point2((99.5, 12.25)), units[0].position):
+            for distance in (0, 5, 12.5, 40):
+                expected = [u for u in units if distance_squared(u, p) < distance ** 2]
+                assert units.closer_than(distance, p) == expected
+                expected = [u for u in units if distance_squared(u, p) > distance ** 2]
+                assert units.further_than(distance, p) == expected
+
+            assert units.closest_to(p) is min(units, key=lambda u: distance_squared(u, p))
+            assert units.furthest_to(p) is max(units, key=lambda u: distance_squared(u, p))
+            assert units.closest_distance_to(p) == min(u.position.distance_to_point2(p) for u in units)
+            assert units.furthest_distance_to(p) == max(u.position.distance_to_point2(p) for u in units)
+            for reverse in (False, True):
+                expected = sorted(units, key=lambda u: distance_squared(u, p), reverse=reverse)
+                assert units.sorted_by_distance_to(p, reverse=reverse) == expected
+
+
+def test_empty_units():
+    units = random_units(0)
+    assert units.closer_than(10, Point2((5, 5))) == []
+    assert units.further_than(10, Point2((5, 5))) == []
+    assert units.closer_than_each(10, [Point2((5, 5))]) == [[]]
+
+
+def test_index_rebuilt_after_change():
+    units = random_units(5)
+    assert units.closer_than(1000, Point2((0, 0))).amount == 5
+    units.extend(random_units(3, seed=2))
+    assert units.closer_than(1000, Point2((0, 0))).amount == 8
+
+    # Changes that keep the length
+    p = Point2((50, 50))
+    units.sort(key=lambda unit: distance_squared(unit, p), reverse=True)
+    assert units.closest_to(p) is units[-1]
+    units[-1] = units[0]
+    assert units.closest_to(p) is min(units, key=lambda unit: distance_squared(unit, p))
+    assert units.sorted_by_distance_to(p)[0] is units.closest_to(p)
+
+
+def test_in_attack_range_of():
+    targets = random_units(200, size=30, unit_types=(UnitTypeId.MARINE, UnitTypeId.COLOSSUS, UnitTypeId.SCV))
+    attackers = random_units(20, seed=3, size=30, unit_types=(UnitTypeId.MARINE, UnitTypeId.VIKINGFIGHTER, UnitTypeId.SCV))
+    for attacker in attackers:
+        for bonus_distance in (0, 1.5):
+            expected = [t for t in targets if attacker.target_in_range(t, bonus_distance=bonus_distance)]
+            assert targets.in_attack_range_of(attacker, bonus_distance=bonus_distance) == expected
+
+
+def test_batched_queries():
+    units = random_units(300)
+    positions = random_units(40, seed=5)
+    for p, nearby in zip(positions, units.closer_than_each(8, positions)):
+        assert nearby == units.closer_than(8, p)
+    for p, closest in zip(positions, units.closest_n_to_each(positions, 3)):
+        assert closest == units.sorted_by_distance_to(p)[:3]
+    assert [c.amount for c in random_units(2).closest_n_to_each(positions, 3)] == [2] * 40
+
+
+def test_spatial_index_buckets():
+    rng = random.Random(0)
+    positions = [(rng.random() * 150, rng.random() * 150) for _ in range(2000)]
+    index = SpatialIndex(positions)
+    # Use the buckets even though there are not that many positions
+    index.BUCKET_MIN_SIZE = 0
+    for _ in range(50):
+        p = (rng.random() * 200 - 25, rng.random() * 200 - 25)
+        distance = rng.random() * 30
+        expected = [i for i, q in enumerate(positions) if (q[0] - p[0]) ** 2 + (q[1] - p[1]) ** 2 < distance ** 2]
+        assert index.closer_than(distance, p).tolist() == expected
+
+
+def test_tag_index():
+    units = random_units(20)
+    assert units.find_by_tag(7) is units[6] and units.by_tag(20) is units[19]
+    assert units.find_by_tag(100) is None
+    assert units.tags == set(range(1, 21))
+    # Rebuilt after units were added, the first unit of a tag is found
+    units.extend(random_units(25, seed=2))
+    assert units.find_by_tag(7) is units[6] and units.find_by_tag(25) is units[44]
+
+    first, second = units.subgroup(units[:10]), units.subgroup(units[5:15])
+    assert [u.tag for u in first | second] == list(range(1, 16))
+    assert [u.tag for u in first & second] == list(range(6, 11))
+    assert [u.tag for u in first - second] == list(range(1, 6))
+    assert [u.tag for u in first - list(second)] == list(range(1, 6))
+
+    # Rebuilt after a unit was replaced
+    replacement = random_units(12, seed=3)[11]
+    replaced, units[0] = units[0], replacement
+    assert units.find_by_tag(12) is replacement and units.find_by_tag(1) is units[20] is not replaced
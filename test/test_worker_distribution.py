@@ -0,0 +1,125 @@
+from s2clientprotocol import raw_pb2
+
+from sc2.data import Alliance
+from sc2.game_state import GameState
+from sc2.ids.ability_id import AbilityId
+from sc2.ids.unit_typeid import UnitTypeId
+from sc2.worker_distribution import WorkerDistribution
+
+from proto_helpers import create_game_data, create_observation, create_unit_proto
+
+GAME_DATA = create_game_data()
+MINERALS = [200, 201, 202, 203]
+
+
+class Game:
+    """ A command center with 4 mineral fields and SCVs that follow the gather commands """
+
+    def __init__(self, workers=10, ideal_harvesters=0):
+        self.workers = {tag: None for tag in range(1, workers + 1)}
+        self.returning = set()
+        self.ideal_harvesters = ideal_harvesters
+        self.minerals = list(MINERALS)
+        self.dead = []
+        self.state = None
+        self.distribution = WorkerDistribution()
+
+    def step(self):
+        protos = [
+            create_unit_proto(UnitTypeId.COMMANDCENTER, 20.5, 20.5, tag=100, ideal_harvesters=self.ideal_harvesters)
+        ]
+        for tag in self.minerals:
+            protos.append(
+                create_unit_proto(UnitTypeId.MINERALFIELD, 14 + 2 * (tag - 200), 27.5, tag=tag, alliance=Alliance.Neutral)
+            )
+        for tag, target in self.workers.items():
+            orders = [raw_pb2.UnitOrder(ability_id=AbilityId.HARVEST_GATHER.value, target_unit_tag=target)] if target else []
+            if tag in self.returning:
+                orders = [raw_pb2.UnitOrder(ability_id=AbilityId.HARVEST_RETURN.value, target_unit_tag=100)]
+            protos.append(create_unit_proto(UnitTypeId.SCV, 10 + tag, 20, tag=tag, orders=orders))
+        observation = create_observation(protos, game_loop=self.state.game_loop + 8 if self.state else 0, map_size=(40, 40))
+        observation.observation.raw_data.event.dead_units.extend(self.dead)
+        self.dead = []
+        self.state = GameState(observation, GAME_DATA, self.state)
+        units = self.state.own_units
+        self.distribution.update(
+            self.state, units(UnitTypeId.SCV), units(UnitTypeId.COMMANDCENTER), units(UnitTypeId.REFINERY)
+        )
+        actions = self.distribution.distribute()
+        for action in actions:
+            assert action.ability == AbilityId.HARVEST_GATHER
+            self.workers[action.unit.tag] = action.target.tag
+        return actions
+
+
+def test_distribution():
+    game = Game()
+    actions = game.step()
+    assert len(actions) == 10
+    distribution = game.distribution
+    assert sorted(distribution.capacity) == MINERALS
+    assert all(len(distribution.workers_of[tag]) == 2 for tag in MINERALS)
+    # Two workers have no place and mine anyway
+    assert len(distribution.free) == 2 and all(game.workers.values())
+
+    # Nothing changed
+    assert game.step() == []
+
+    # A free worker takes the place of a dead one
+    dead = next(iter(distribution.workers_of[200]))
+    del game.workers[dead]
+    game.dead.append(dead)
+    actions = game.step()
+    assert [action.target.tag for action in actions] == [200]
+    assert len(distribution.workers_of[200]) == 2 and len(distribution.free) == 1
+
+    # The workers of a mined out mineral field have no place anymore
+    game.minerals.remove(203)
+    assert len(game.step()) == 2
+    assert 203 not in distribution.capacity and len(distribution.free) == 3
+
+    # An idle worker is sent back
+    worker = next(iter(distribution.workers_of[201]))
+    game.workers[worker] = None
+    assert [action.unit.tag for action in game.step()] == [worker]
+
+
+def test_workers_used_elsewhere():
+    game = Game(workers=8)
+    game.step()
+    worker = next(iter(game.distribution.workers_of[202]))
+    game.distribution.release(worker)
+    # Another worker would take the place, but there is none
+    assert game.step() == []
+    assert len(game.distribution.workers_of[202]) == 1
+
+    # Without the previous step everything is rebuilt from the orders, the released worker still mines
+    game.state = None
+    assert game.step() == []
+    assert len(game.distribution.workers_of[202]) == 2
+
+
+def test_rebuild_with_returning_workers():
+    game = Game()
+    game.step()
+    distribution = game.distribution
+    game.returning = set(distribution.workers_of[200]) | {next(iter(distribution.workers_of[201]))}
+    # Rebuilt from the orders, the returning workers are tracked and their mineral fields are not oversaturated
+    game.state = None
+    actions = game.step()
+    assert distribution.assignments.keys() | distribution.free == game.workers.keys()
+    assert all(len(distribution.workers_of[tag]) == 2 for tag in MINERALS)
+    assert len(distribution.free) == 2 and {action.unit.tag for action in actions} == distribution.free
+    # Free workers that are returning deliver first
+    assert all(action.queue == (action.unit.tag in game.returning) for action in actions)
+    # And the next steps are quiet
+    game.returning = set()
+    assert game.step() == []
+
+
+def test_townhall_ideal_harvesters():
+    game = Game(ideal_harvesters=6)
+    game.step()
+    # The mineral fields closest to the command center take the remainder
+    assert game.distribution.capacity == {200: 1, 201: 1, 202: 2, 203: 2}
+    assert sum(map(len, game.distribution.workers_of.values())) == 6